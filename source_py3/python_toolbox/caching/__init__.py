@@ -7,4 +7,8 @@
 
 from .decorators import cache
 from .cached_type import CachedType
-from .cached_property import CachedProperty
\ No newline at end of file
+from .cached_property import CachedProperty
+from .bounded_cache import BoundedCache
+from .disk_store import DiskStore
+from .shared_cache import create_shared_cache
+from .registry import get_cache_infos
@@ -0,0 +1,173 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+Defines the `BoundedCache` class.
+
+See its documentation for more details.
+'''
+
+import collections
+import sys
+import threading
+
+from python_toolbox import pickle_tools
+
+infinity = float('inf')
+
+
+def get_approximate_size(key, value):
+    '''
+    Get the approximate number of bytes that a cache entry takes.
+
+    This is a shallow size: Objects that the key and value refer to aren't
+    counted, unless the key is a tuple, in which case its items are counted
+    too.
+    '''
+    size = sys.getsizeof(key) + sys.getsizeof(value)
+    if isinstance(key, tuple):
+        size += sum(map(sys.getsizeof, key))
+    return size
+
+
+class BoundedCache(collections.MutableMapping):
+    '''
+    A dict-like cache that throws away its least recently used entries.
+
+    You can limit the number of entries with `max_size`, and the approximate
+    number of bytes they take with `max_bytes`. When either limit is exceeded,
+    the least recently used entries are evicted until it isn't. The size of
+    each entry is computed by `get_size`, which takes a key and a value;
+    the default is `get_approximate_size`.
+
+    Getting an item counts as a hit if it's there and as a miss if it isn't;
+    these counts, along with the number of evictions, are available in
+    `hits`, `misses` and `evictions`, and `info()` returns all of them at
+    once. (Checking `key in cache` doesn't count as either.)
+
+    You can save the contents of the cache to a file with `save` and load it
+    back with `load`, for example to warm up a cache when a process starts.
+
+    The cache can be used from multiple threads at the same time: It has a
+    lock, and every operation on it holds the lock, so it's atomic. Going
+    over the cache with `keys`, `values` or `items` isn't protected, since
+    they're views of the entries; `snapshot` and iterating on the cache are.
+
+    Example:
+
+        >>> bounded_cache = BoundedCache(max_size=2)
+        >>> bounded_cache['a'] = 1
+        >>> bounded_cache['b'] = 2
+        >>> bounded_cache['a']
+        1
+        >>> bounded_cache['c'] = 3
+        >>> sorted(bounded_cache)
+        ['a', 'c']
+
+    '''
+    def __init__(self, max_size=infinity, max_bytes=infinity,
+                 get_size=get_approximate_size):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.get_size = get_size
+        self._dict = collections.OrderedDict()
+        self._sizes = {}
+        self.n_bytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.RLock()
+
+    def __getitem__(self, key):
+        with self._lock:
+            try:
+                value = self._dict[key]
+            except KeyError:
+                self.misses += 1
+                raise
+            self.hits += 1
+            self._dict.move_to_end(key)
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            if key in self._dict:
+                del self[key]
+            self._dict[key] = value
+            if self.max_bytes != infinity:
+                self._sizes[key] = size = self.get_size(key, value)
+                self.n_bytes += size
+            self._evict()
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._dict[key]
+            self.n_bytes -= self._sizes.pop(key, 0)
+
+    def _evict(self):
+        '''Evict the least recently used entries until we're within limits.'''
+        while len(self._dict) > self.max_size or \
+                               (self.n_bytes > self.max_bytes and self._dict):
+            key, _ = self._dict.popitem(last=False)
+            self.n_bytes -= self._sizes.pop(key, 0)
+            self.evictions += 1
+
+    # Checking a key and getting the length of a `dict` are atomic anyway:
+    __contains__ = lambda self, key: key in self._dict
+    __len__ = lambda self: len(self._dict)
+
+    def __iter__(self):
+        with self._lock:
+            keys = list(self._dict)
+        return iter(keys)
+
+    # Going over the entries doesn't count as using them, so these don't
+    # change the order of the entries or the counters:
+    keys = lambda self: self._dict.keys()
+    values = lambda self: self._dict.values()
+    items = lambda self: self._dict.items()
+
+    def clear(self):
+        '''Remove all the entries from the cache. The counters are kept.'''
+        with self._lock:
+            self._dict.clear()
+            self._sizes.clear()
+            self.n_bytes = 0
+
+    def info(self):
+        '''Get a dict with the statistics of this cache.'''
+        with self._lock:
+            return {
+                'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': len(self._dict),
+                'max_size': self.max_size, 'n_bytes': self.n_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def snapshot(self):
+        '''
+        Get a list of the `(key, value)` pairs in the cache.
+
+        They're ordered from least recently used to most recently used, so
+        updating a `BoundedCache` with them restores the same order.
+        '''
+        with self._lock:
+            return list(self._dict.items())
+
+    def save(self, path):
+        '''Save the contents of the cache to a file at `path`.'''
+        with open(str(path), 'wb') as file:
+            file.write(pickle_tools.compickle(self.snapshot()))
+
+    def load(self, path):
+        '''
+        Load the entries that were saved to a file at `path` into the cache.
+
+        The entries are added to the ones already in the cache, and the
+        limits are respected.
+        '''
+        with open(str(path), 'rb') as file:
+            self.update(pickle_tools.decompickle(file.read()))
+
+    def __repr__(self):
+        return '<%s: %s entries, %s hits, %s misses>' % (
+            type(self).__name__, len(self._dict), self.hits, self.misses
+        )
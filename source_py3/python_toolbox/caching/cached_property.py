@@ -7,9 +7,15 @@ Defines the `CachedProperty` class.
 See its documentation for more details.
 '''
 
+import asyncio
+import threading
+import time
+
 from python_toolbox import decorator_tools
 from python_toolbox import misc_tools
 
+from . import registry
+
 
 class CachedProperty(misc_tools.OwnNameDiscoveringDescriptor):
     '''
@@ -32,9 +38,39 @@ class CachedProperty(misc_tools.OwnNameDiscoveringDescriptor):
     returned instead of using a getter. (It can be a totally static value like
     `0`). If this value happens to be a callable but you'd still like it to be
     used as a static value, use `force_value_not_getter=True`.
+    
+    If you pass in `count_statistics=True`, the property counts how many times
+    it was calculated and how long it took, and its `cache_info` method returns
+    these as `misses` and `compute_time`. (Hits aren't counted, because once
+    the value is cached, it's taken from the object without going through the
+    property.)
+    
+    If you pass in `thread_safe=True`, the getter is called only once per
+    object even if several threads get the property at the same time. The
+    property has a few locks, and each object uses one of them according to
+    its `id`, so getting the property on different objects usually doesn't
+    block. (A getter that gets this property on another object, which waits
+    for a thread that's doing the opposite, will deadlock, so don't do that.)
+    
+    If the getter is a coroutine function, the property gives an awaitable,
+    and the getter is run only once per object; every `await` on the property
+    gives the same result. If the getter raises an exception, the result
+    isn't cached, and the next `await` runs the getter again. The getter is
+    run as a task of the event loop that awaits the property, so getting the
+    property doesn't need an event loop, only awaiting it does.
+    
+    Objects of classes with `__slots__` don't have a `__dict__` to cache the
+    value in, so their values are kept in a `dict` that refers to the objects
+    weakly. (So they must have a `__weakref__` slot.) Async tasks are kept
+    there for all objects.
     '''
+    
+    n_locks = 16
+    '''The number of locks that a `thread_safe` property has.'''
+    
     def __init__(self, getter_or_value, doc=None, name=None,
-                 force_value_not_getter=False):
+                 force_value_not_getter=False, count_statistics=False,
+                 thread_safe=False):
         '''
         Construct the cached property.
         
@@ -51,6 +87,17 @@ class CachedProperty(misc_tools.OwnNameDiscoveringDescriptor):
         else:
             self.getter = lambda thing: getter_or_value
         self.__doc__ = doc or getattr(self.getter, '__doc__', None)
+        self.count_statistics = count_statistics
+        if count_statistics:
+            self.misses = 0
+            self.compute_time = 0.0
+            registry.register_cache(self)
+        self.thread_safe = thread_safe
+        if thread_safe:
+            self._locks = tuple(threading.RLock()
+                                for _ in range(self.n_locks))
+        self.is_async = asyncio.iscoroutinefunction(self.getter)
+        self._external_values = None
         
         
     def __get__(self, thing, our_type=None):
@@ -59,11 +106,133 @@ class CachedProperty(misc_tools.OwnNameDiscoveringDescriptor):
             # We're being accessed from the class itself, not from an object
             return self
         
-        value = self.getter(thing)
+        if self.is_async:
+            return self._await_value(thing)
+        
+        name = self.get_our_name(thing, our_type=our_type)
+        uses_external_values = not hasattr(thing, '__dict__')
+        if uses_external_values:
+            # The descriptor is called on every access here, so we check
+            # whether we already have a value:
+            try:
+                return self._get_external_value(thing)
+            except KeyError:
+                pass
+            
+        if not self.thread_safe:
+            return self._compute_value(thing, name, uses_external_values)
+        
+        # Objects are allocated at 16-byte boundaries, so we drop the low
+        # bits of the `id`:
+        with self._locks[(id(thing) >> 4) % self.n_locks]:
+            # Another thread might have computed the value while we were
+            # waiting for the lock:
+            try:
+                if uses_external_values:
+                    return self._get_external_value(thing)
+                else:
+                    return vars(thing)[name]
+            except KeyError:
+                return self._compute_value(thing, name, uses_external_values)
+
         
-        setattr(thing, self.get_our_name(thing, our_type=our_type), value)
+    def _compute_value(self, thing, name, uses_external_values):
+        '''Call the getter on `thing`, cache the value and return it.'''
+        if self.count_statistics:
+            start_time = time.perf_counter()
+            value = self.getter(thing)
+            self.compute_time += time.perf_counter() - start_time
+            self.misses += 1
+        else:
+            value = self.getter(thing)
+        
+        if uses_external_values:
+            self._set_external_value(thing, value)
+        else:
+            setattr(thing, name, value)
         
         return value
+    
+    
+    async def _await_value(self, thing):
+        '''
+        Await the value of the async getter on `thing`.
+        
+        This runs inside the event loop that awaits the property, so if the
+        getter isn't running yet, its task is created in that loop. A task of
+        another event loop is used only if it's already finished, since a
+        task that isn't finished can't be awaited in another loop. We await
+        the task shielded, so that if one awaiter is cancelled, the others
+        still get the result.
+        '''
+        if self.thread_safe:
+            # Objects are allocated at 16-byte boundaries, so we drop the low
+            # bits of the `id`:
+            with self._locks[(id(thing) >> 4) % self.n_locks]:
+                task = self._get_or_create_task(thing)
+        else:
+            task = self._get_or_create_task(thing)
+        return await asyncio.shield(task)
+    
+    
+    def _get_or_create_task(self, thing):
+        loop = asyncio.get_event_loop()
+        try:
+            task_loop, task = self._get_external_value(thing)
+        except KeyError:
+            pass
+        else:
+            if task.done() or task_loop is loop:
+                return task
+        return self._create_task(thing, loop)
+    
+    
+    def _create_task(self, thing, loop):
+        '''
+        Start running the async getter on `thing` in `loop`, and cache its task.
+        
+        The task is cached along with its loop, since `Task.get_loop` is new
+        in Python 3.7.
+        '''
+        start_time = time.perf_counter()
+        task = loop.create_task(self.getter(thing))
+        
+        def finish_task(task):
+            if self.count_statistics:
+                self.compute_time += time.perf_counter() - start_time
+                self.misses += 1
+            if task.cancelled() or task.exception() is not None:
+                # Not caching failures, so the next `await` can try again:
+                try:
+                    if self._external_values[thing][1] is task:
+                        del self._external_values[thing]
+                except KeyError:
+                    pass
+                
+        task.add_done_callback(finish_task)
+        self._set_external_value(thing, (loop, task))
+        return task
+    
+    
+    def _get_external_value(self, thing):
+        if self._external_values is None:
+            raise KeyError(thing)
+        return self._external_values[thing]
+    
+    
+    def _set_external_value(self, thing, value):
+        if self._external_values is None:
+            # Importing here because `nifty_collections` imports `caching`:
+            from python_toolbox.nifty_collections import WeakKeyIdentityDict
+            self._external_values = WeakKeyIdentityDict()
+        try:
+            self._external_values[thing] = value
+        except TypeError:
+            raise TypeError(
+                "Can't cache %s on %r, because it has no `__dict__` and it "
+                "can't be weakreffed. Add `__weakref__` to its `__slots__`." %
+                (self, thing)
+            )
 
     
     def __call__(self, method_function):
@@ -76,6 +245,18 @@ class CachedProperty(misc_tools.OwnNameDiscoveringDescriptor):
         return decorator_tools.decorator(inner, method_function)
 
 
+    def cache_info(self):
+        '''
+        Get a `dict` of the statistics of this property.
+        
+        This works only for properties created with `count_statistics=True`.
+        '''
+        if not self.count_statistics:
+            raise Exception("This `CachedProperty` wasn't created with "
+                            "`count_statistics=True`.")
+        return {'misses': self.misses, 'compute_time': self.compute_time}
+
+    
     def __repr__(self):
         return '<%s: %s>' % (type(self).__name__, self.our_name or self.getter)
         
\ No newline at end of file
@@ -7,13 +7,78 @@ Defines the `CachedType` metaclass.
 See its documentation for more details.
 '''
 
+import collections
+import inspect
+import weakref
+
 from python_toolbox.sleek_reffing import SleekCallArgs
 
+from .decorators import _simple_argument_types
+from . import registry
+
+infinity = float('inf')
+
 
 class SelfPlaceholder:
     '''Placeholder for `self` when storing call-args.''' 
 
 
+def _create_key_builder(init):
+    '''
+    Create a function that builds fast cache keys for calls to `init`.
+    
+    The function we create takes the `args` and `kwargs` of a call to the
+    class, and if all the arguments to `init` are of simple types, it returns
+    a tuple of their values, with the defaults filled in. Otherwise it returns
+    `None`, and the caller should fall back to a `SleekCallArgs`.
+    
+    The signature of `init` is parsed once here, so building a key doesn't
+    involve `inspect`. Only signatures with plain positional-or-keyword
+    arguments get a fast path.
+    '''
+    no_fast_path = lambda args, kwargs: None
+    try:
+        # Dropping `self`:
+        parameters = tuple(inspect.signature(init).parameters.values())[1:]
+    except (TypeError, ValueError):
+        return no_fast_path
+    if any(parameter.kind != inspect.Parameter.POSITIONAL_OR_KEYWORD
+                                                for parameter in parameters):
+        return no_fast_path
+    
+    n_parameters = len(parameters)
+    # Missing arguments without a default get `Parameter.empty`, which isn't
+    # of a simple type, so calls that are missing them fall back to the slow
+    # path, which raises the right `TypeError`:
+    defaults = tuple(parameter.default for parameter in parameters)
+    indices = {parameter.name: i for i, parameter in enumerate(parameters)}
+    
+    def get_key(args, kwargs):
+        n_args = len(args)
+        if n_args > n_parameters:
+            return None
+        if kwargs:
+            values = list(args + defaults[n_args:])
+            for name, value in kwargs.items():
+                i = indices.get(name)
+                if i is None or i < n_args:
+                    return None
+                values[i] = value
+            values = tuple(values)
+        else:
+            values = args + defaults[n_args:]
+        if _simple_argument_types.issuperset(map(type, values)):
+            try:
+                hash(values)
+            except TypeError:
+                return None
+            else:
+                return values
+        return None
+    
+    return get_key
+    
+
 class CachedType(type):
     '''
     A metaclass for sharing instances.
@@ -39,24 +104,77 @@ class CachedType(type):
     you can avoid memory leaks when using weakreffable arguments, but if you
     ever want to use non-weakreffable arguments you are still able to.
     (Assuming you don't mind the memory leaks.)
+    
+    When all the arguments are of simple types like numbers, strings and
+    tuples of these, they're used as the key directly, which makes getting an
+    instance several times faster. (The signature of `__init__` is parsed
+    once for this.)
+    
+    By default the instances are kept forever. You can change that with
+    keyword arguments to the class:
+    
+        class Grokker(object, metaclass=caching.CachedType, weak_values=True):
+            ...
+    
+    With `weak_values=True`, instances are kept only as long as they're used
+    somewhere else, and then they're collected. (They must be weakreffable.)
+    With `max_size=n`, only the `n` most recently used instances are kept.
+    You can't use both.
+    
+    The class has a `cache_info` method that returns a `dict` with the numbers
+    of `hits` and `misses` and the current `size` of the cache.
     '''
     
-    def __new__(mcls, *args, **kwargs):
-        result = super().__new__(mcls, *args, **kwargs)
-        result.__cache = {}
+    def __new__(mcls, name, bases, namespace, *, weak_values=False,
+                max_size=infinity):
+        if weak_values and max_size != infinity:
+            raise TypeError("You can't use both `weak_values` and "
+                            "`max_size`.")
+        result = super().__new__(mcls, name, bases, namespace)
+        if weak_values:
+            result.__cache = weakref.WeakValueDictionary()
+        elif max_size != infinity:
+            result.__cache = collections.OrderedDict()
+        else:
+            result.__cache = {}
+        result.__max_size = max_size
+        result.__hits = result.__misses = 0
+        result.__init_with_key_builder = result.__get_key = None
+        registry.register_cache(result)
         return result
-
+    
+    
+    def __init__(cls, name, bases, namespace, **kwargs):
+        super().__init__(name, bases, namespace)
+        
     
     def __call__(cls, *args, **kwargs):
-        sleek_call_args = SleekCallArgs(
-            cls.__cache,
-            cls.__init__,
-            *((SelfPlaceholder,) + args),
-            **kwargs
-        )
+        cache = cls.__cache
+        init = cls.__init__
+        if init is not cls.__init_with_key_builder:
+            # First call, or `__init__` was replaced since the last one:
+            cls.__get_key = _create_key_builder(init)
+            cls.__init_with_key_builder = init
+        key = cls.__get_key(args, kwargs)
+        if key is None:
+            key = SleekCallArgs(cache, init, *((SelfPlaceholder,) + args),
+                                **kwargs)
         try:
-            return cls.__cache[sleek_call_args]
+            value = cache[key]
         except KeyError:
-            cls.__cache[sleek_call_args] = value = \
-                                              super().__call__(*args, **kwargs)
+            cls.__misses += 1
+            cache[key] = value = super().__call__(*args, **kwargs)
+            if len(cache) > cls.__max_size:
+                cache.popitem(last=False)
             return value
+        else:
+            cls.__hits += 1
+            if cls.__max_size != infinity:
+                cache.move_to_end(key)
+            return value
+        
+        
+    def cache_info(cls):
+        '''Get a `dict` of the statistics of the class's cache.'''
+        return {'hits': cls.__hits, 'misses': cls.__misses,
+                'size': len(cls.__cache)}
@@ -6,15 +6,24 @@ Defines the `cache` decorator.
 
 See its documentation for more details.
 '''
-# todo: examine thread-safety
 
+import asyncio
+import collections
 import datetime as datetime_module
+import functools
+import inspect
+import pickle
+import threading
+import time
 
 from python_toolbox import misc_tools
-from python_toolbox import binary_search
 from python_toolbox import decorator_tools
 from python_toolbox.sleek_reffing import SleekCallArgs
 
+from .bounded_cache import get_approximate_size
+from .disk_store import DiskStore
+from . import registry
+
 infinity = float('inf')
 
 
@@ -22,6 +31,69 @@ class CLEAR_ENTIRE_CACHE(misc_tools.NonInstantiable):
     '''Sentinel object for clearing the entire cache.'''
 
 
+# Arguments of these types can't be weakreffed, so the sleek path would keep
+# strong references to them anyway, and they can be compared and hashed
+# quickly. (We check the exact type rather than use `isinstance` on purpose,
+# since instances of subclasses may be weakreffable.)
+_simple_argument_types = frozenset(
+    (int, float, complex, bool, str, bytes, type(None), tuple)
+)
+
+
+def _is_simple_key(key):
+    '''
+    Check whether `key` is made only of values of simple types.
+    
+    Tuples are checked all the way down, since an `args` key may hold tuples
+    of any hashable objects. Only keys like these are saved to a backing
+    cache, because the `DiskStore` identifies keys by their `repr`, which for
+    other objects might not tell different values apart.
+    '''
+    if type(key) is not tuple:
+        return type(key) in _simple_argument_types
+    return all(map(_is_simple_key, key))
+
+
+def _create_key_builder(function):
+    '''
+    Create a function that builds cache keys for calls to `function`.
+    
+    The function we create takes the containing `dict` of the cache, and the
+    `args` and `kwargs` of a call, and returns a key. The `args` and `kwargs`
+    come from the wrapper made by `decorator_tools.decorator`, which already
+    puts all the named arguments in `args`, with their defaults filled in.
+    
+    So when there are no `kwargs` and all the arguments are of simple types,
+    the `args` tuple itself is used as the key, which makes a hit many times
+    quicker than building a `SleekCallArgs`. (It's still about ten times
+    slower than a hit of `functools.lru_cache`, mostly because of the wrapper
+    that fills in the arguments.) Otherwise we fall back to a
+    `SleekCallArgs`, which sleekrefs the arguments so weakreffable arguments
+    aren't kept alive.
+    '''
+    def get_sleek_key(containing_dict, args, kwargs):
+        return SleekCallArgs(containing_dict, function, *args, **kwargs)
+    
+    parameters = inspect.signature(function).parameters.values()
+    if any(parameter.kind == inspect.Parameter.KEYWORD_ONLY
+                                                for parameter in parameters):
+        # The wrapper always passes keyword-only arguments in `kwargs`, so
+        # there's no fast path for this signature.
+        return get_sleek_key
+    
+    def get_key(containing_dict, args, kwargs):
+        if not kwargs and _simple_argument_types.issuperset(map(type, args)):
+            try:
+                hash(args)
+            except TypeError:
+                pass
+            else:
+                return args
+        return get_sleek_key(containing_dict, args, kwargs)
+    
+    return get_key
+    
+
 def _get_now():
     '''
     Get the current datetime.
@@ -32,7 +104,8 @@ def _get_now():
 
 
 @decorator_tools.helpful_decorator_builder
-def cache(max_size=infinity, time_to_keep=None):
+def cache(max_size=infinity, time_to_keep=None, thread_safe=False,
+          store=None, max_bytes=infinity, shared=None):
     '''
     Cache a function, saving results so they won't have to be computed again.
     
@@ -61,18 +134,58 @@ def cache(max_size=infinity, time_to_keep=None):
     
     You may optionally specific a `time_to_keep`, which is a time period after
     which a cache entry will expire. (Pass in either a `timedelta` object or
-    keyword arguments to create one.)
-    '''
-    # todo idea: figure how how complex the function's argspec is, and then
-    # compile a function accordingly, so functions with a simple argspec won't
-    # have to go through so much shit. update: probably it will help only for
-    # completely argumentless function. so do one for those.
+    keyword arguments to create one.) You may combine it with `max_size`.
+    
+    If the cached function is called from multiple threads, pass in
+    `thread_safe=True`. Then the cache is protected by a lock, and when a few
+    threads call the function with the same arguments at the same time, only
+    one of them computes the result while the others wait for it. Calls with
+    different arguments are computed in parallel.
     
+    If the function is a coroutine function (defined with `async def`), the
+    cached function is a coroutine function too. Concurrent awaiters with the
+    same arguments in the same event loop share a single computation, which
+    runs as a task of that event loop. Its result is cached when it finishes,
+    and then it's used in any event loop, while a computation that raised an
+    exception isn't cached.
+    
+    The cached function has a `cache_clear` function for clearing the cache,
+    and a `cache_info` function that returns a `dict` of statistics: the
+    numbers of `hits`, `misses`, `evictions` (because of `max_size`) and
+    `expirations` (because of `time_to_keep`), the number of seconds spent
+    computing values on misses in `compute_time`, the current `size` of the
+    cache, its `max_size`, and the approximate number of bytes it takes in
+    `n_bytes`. You can get the statistics of all the caches at once with
+    `caching.get_cache_infos`.
+    
+    You may optionally specify a `store`, which is a path to a file in which
+    results are saved, so they'll be available after the process restarts.
+    (See `caching.DiskStore`.) Only results of calls whose arguments are all
+    numbers, strings, bytes, `None` or tuples of these are saved. You may
+    limit the size of the file with `max_bytes`. Results loaded from the file
+    are counted in `cache_info` as `disk_hits`, in addition to `hits`, and
+    `cache_info` also has the `store_size` and `store_n_bytes` of the file.
+    Each cached function should have its own `store`, which shouldn't be used
+    by more than one process at the same time. A `store` can't be combined
+    with `time_to_keep` or used for coroutine functions.
+    
+    Instead of a `store`, you may specify a cache that's `shared` between
+    processes, which you create with `caching.create_shared_cache`. Then
+    results of calls with simple arguments, like the ones that would be saved
+    to a `store`, are also put in the shared cache, and a process that
+    doesn't have a result in memory takes it from the shared cache if it's
+    there. This lets the worker processes of a
+    `future_tools.CuteProcessPoolExecutor` use each other's results. (Define
+    the cached function before the workers are started, so they'll get it
+    when they're forked.) These hits are counted in `cache_info` as
+    `shared_hits`. Clearing the cache with `cache_clear` clears the shared
+    cache too, including results of other functions that share it. Like a
+    `store`, a `shared` cache can't be combined with `time_to_keep` or used
+    for coroutine functions.
+    '''
     from python_toolbox.nifty_collections import OrderedDict
     
     if time_to_keep is not None:
-        if max_size != infinity:
-            raise NotImplementedError
         if not isinstance(time_to_keep, datetime_module.timedelta):
             try:
                 time_to_keep = datetime_module.timedelta(**time_to_keep)
@@ -84,93 +197,374 @@ def cache(max_size=infinity, time_to_keep=None):
                 )
         assert isinstance(time_to_keep, datetime_module.timedelta)
         
+    if store is not None and time_to_keep is not None:
+        raise TypeError("A `store` can't be combined with `time_to_keep`, "
+                        "because the file doesn't keep the times at which "
+                        "its results expire.")
+    if shared is not None:
+        if store is not None:
+            raise TypeError('Specify either a `store` or a `shared` cache, '
+                            'not both.')
+        if time_to_keep is not None:
+            raise TypeError("A `shared` cache can't be combined with "
+                            "`time_to_keep`, because it doesn't keep the "
+                            "times at which its results expire.")
+    if store is None and max_bytes != infinity:
+        raise TypeError('`max_bytes` limits the size of the `store`, so it '
+                        'can only be used with `store`.')
+        
 
     def decorator(function):
         
         # In case we're being given a function that is already cached:
         if getattr(function, 'is_cached', False): return function
         
-        if max_size == infinity:
+        get_key = _create_key_builder(function)
+        
+        statistics = {'hits': 0, 'misses': 0, 'evictions': 0,
+                      'expirations': 0, 'compute_time': 0.0}
+        
+        # For each kind of cache we define `get_value`, which gets the cached
+        # value of a key or raises `KeyError`, and `set_value`, which stores a
+        # value in the cache. The `cached` functions below use them.
+        
+        if time_to_keep:
             
-            if time_to_keep:
-
-                sorting_key_function = lambda sleek_call_args: \
-                                              cached._cache[sleek_call_args][1]
-
-                
-                def remove_expired_entries():
-                    almost_cutting_point = \
-                                          binary_search.binary_search_by_index(
-                        list(cached._cache.keys()),
-                        _get_now(), 
-                        sorting_key_function,
-                        rounding=binary_search.LOW
-                    )
-                    if almost_cutting_point is not None:
-                        cutting_point = almost_cutting_point + 1
-                        for key in list(cached._cache.keys())[:cutting_point]:
-                            del cached._cache[key]
-                            
-                @misc_tools.set_attributes(_cache=OrderedDict())        
-                def cached(function, *args, **kwargs):
-                    remove_expired_entries()
-                    sleek_call_args = \
-                        SleekCallArgs(cached._cache, function, *args, **kwargs)
-                    try:
-                        return cached._cache[sleek_call_args][0]
-                    except KeyError:
-                        value = function(*args, **kwargs)
-                        cached._cache[sleek_call_args] = (
-                            value,
-                            _get_now() + time_to_keep
-                        )
-                        cached._cache.sort(key=sorting_key_function)
-                        return value
+            # Since `time_to_keep` is the same for all entries, entries expire
+            # in the order they were added. So we keep `(expiry, key)` pairs
+            # in a queue, and expired entries are always at its front. An
+            # entry that was removed from the cache (or replaced with a newer
+            # one) leaves a stale pair in the queue, which we skip when we
+            # get to it, and which we throw away when there are too many of
+            # those.
+            
+            def remove_expired_entries():
+                expiry_queue = cached._expiry_queue
+                if not expiry_queue:
+                    return
+                now = _get_now()
+                while expiry_queue and expiry_queue[0][0] <= now:
+                    expiry, key = expiry_queue.popleft()
+                    entry = cached._cache.get(key)
+                    if entry is not None and entry[1] == expiry:
+                        del cached._cache[key]
+                        statistics['expirations'] += 1
+                        
+            def compact_expiry_queue():
+                cached._expiry_queue = collections.deque(
+                    sorted(((expiry, key) for key, (value, expiry)
+                            in cached._cache.items()),
+                           key=lambda pair: pair[0])
+                )
                 
-            else: # not time_to_keep
+            def get_value(key):
+                remove_expired_entries()
+                value = cached._cache[key][0]
+                if max_size != infinity:
+                    cached._cache.move_to_end(key)
+                return value
+            
+            def set_value(key, value):
+                expiry = _get_now() + time_to_keep
+                cached._cache[key] = (value, expiry)
+                cached._expiry_queue.append((expiry, key))
+                if len(cached._cache) > max_size:
+                    cached._cache.popitem(last=False)
+                    statistics['evictions'] += 1
+                if len(cached._expiry_queue) > 2 * len(cached._cache) + 16:
+                    compact_expiry_queue()
+                    
+            cache_attributes = {'_cache': OrderedDict(),
+                                '_expiry_queue': collections.deque()}
+            
+        elif max_size == infinity:
+            
+            get_value = lambda key: cached._cache[key]
+            
+            def set_value(key, value):
+                cached._cache[key] = value
                 
-                @misc_tools.set_attributes(_cache={})        
-                def cached(function, *args, **kwargs):
-                    sleek_call_args = \
-                        SleekCallArgs(cached._cache, function, *args, **kwargs)
-                    try:
-                        return cached._cache[sleek_call_args]
-                    except KeyError:
-                        cached._cache[sleek_call_args] = value = \
-                              function(*args, **kwargs)
-                        return value
+            cache_attributes = {'_cache': {}}
     
         else: # max_size < infinity
             
-            @misc_tools.set_attributes(_cache=OrderedDict())        
+            def get_value(key):
+                value = cached._cache[key]
+                cached._cache.move_to_end(key)
+                return value
+            
+            def set_value(key, value):
+                cached._cache[key] = value
+                if len(cached._cache) > max_size:
+                    cached._cache.popitem(last=False)
+                    statistics['evictions'] += 1
+                    
+            cache_attributes = {'_cache': OrderedDict()}
+            
+        backing_cache = function_name = None
+        if store is not None or shared is not None:
+            
+            # Values of calls with simple arguments, which have the `args`
+            # tuple as their key, are also saved to a backing cache, which is
+            # either a `DiskStore` or a cache shared between processes. When a
+            # value isn't in memory, we try the backing cache before computing
+            # it. The keys there start with the function's name, since it
+            # might be used by other functions too.
+            if asyncio.iscoroutinefunction(function):
+                raise TypeError(
+                    "%s can't be used for coroutine functions, because "
+                    "reading from it would block the event loop." %
+                    ('A `store`' if store is not None else 'A `shared` cache')
+                )
+            if store is not None:
+                backing_cache = DiskStore(store, max_bytes=max_bytes)
+                backing_hits_name = 'disk_hits'
+            else:
+                backing_cache = shared
+                backing_hits_name = 'shared_hits'
+            function_name = (function.__module__, function.__qualname__)
+            get_memory_value, set_memory_value = get_value, set_value
+            statistics[backing_hits_name] = 0
+            
+            def get_value(key):
+                try:
+                    return get_memory_value(key)
+                except KeyError:
+                    if not _is_simple_key(key):
+                        raise
+                    value = backing_cache[function_name + key]
+                    set_memory_value(key, value)
+                    statistics[backing_hits_name] += 1
+                    return value
+                
+            def set_value(key, value):
+                set_memory_value(key, value)
+                if _is_simple_key(key):
+                    try:
+                        backing_cache[function_name + key] = value
+                    except (pickle.PicklingError, TypeError, AttributeError):
+                        # The value can't be pickled, so it's kept only in
+                        # memory.
+                        pass
+            
+        cache_lock = threading.Lock()
+        
+        if not thread_safe:
+            
+            @misc_tools.set_attributes(**cache_attributes)
             def cached(function, *args, **kwargs):
-                sleek_call_args = \
-                    SleekCallArgs(cached._cache, function, *args, **kwargs)
+                key = get_key(cached._cache, args, kwargs)
                 try:
-                    result = cached._cache[sleek_call_args]
-                    cached._cache.move_to_end(sleek_call_args)
-                    return result
+                    value = get_value(key)
                 except KeyError:
-                    cached._cache[sleek_call_args] = value = \
-                        function(*args, **kwargs)
-                    if len(cached._cache) > max_size:
-                        cached._cache.popitem(last=False)
+                    statistics['misses'] += 1
+                    start_time = time.perf_counter()
+                    value = function(*args, **kwargs)
+                    statistics['compute_time'] += \
+                                              time.perf_counter() - start_time
+                    set_value(key, value)
                     return value
+                else:
+                    statistics['hits'] += 1
+                    return value
+                
+        else: # thread_safe
+            
+            # `cache_lock` protects the cache, and it's held only while
+            # looking up or storing values, never while computing them.
+            # Each key that's being computed has its own lock in `key_locks`,
+            # along with the number of threads using it, so threads that ask
+            # for the same key wait for the first one to compute it, while
+            # threads that ask for other keys aren't blocked.
+            key_locks = {}
+            
+            @misc_tools.set_attributes(_lock=cache_lock, **cache_attributes)
+            def cached(function, *args, **kwargs):
+                key = get_key(cached._cache, args, kwargs)
+                with cache_lock:
+                    try:
+                        value = get_value(key)
+                    except KeyError:
+                        pass
+                    else:
+                        statistics['hits'] += 1
+                        return value
+                    try:
+                        key_lock_and_count = key_locks[key]
+                    except KeyError:
+                        key_lock_and_count = key_locks[key] = \
+                                                      [threading.Lock(), 0]
+                    key_lock_and_count[1] += 1
+                key_lock = key_lock_and_count[0]
+                try:
+                    with key_lock:
+                        with cache_lock:
+                            try:
+                                # Another thread might have computed it
+                                # while we were waiting for `key_lock`:
+                                value = get_value(key)
+                            except KeyError:
+                                statistics['misses'] += 1
+                            else:
+                                statistics['hits'] += 1
+                                return value
+                        start_time = time.perf_counter()
+                        value = function(*args, **kwargs)
+                        compute_time = time.perf_counter() - start_time
+                        with cache_lock:
+                            statistics['compute_time'] += compute_time
+                            set_value(key, value)
+                        return value
+                finally:
+                    with cache_lock:
+                        key_lock_and_count[1] -= 1
+                        if not key_lock_and_count[1]:
+                            del key_locks[key]
                     
         
-        result = decorator_tools.decorator(cached, function)
+        if asyncio.iscoroutinefunction(function):
+            
+            # Finished results are cached like the results of any function,
+            # so they're used from any event loop. A computation that's still
+            # running is a task, which can only be awaited in its own event
+            # loop, so `tasks_by_loop` maps each event loop to its running
+            # tasks by key, and all the callers with the same arguments in
+            # that loop await the same task. Each caller awaits the task
+            # shielded, so a caller that's cancelled doesn't cancel it for the
+            # others. When the task finishes, it's removed, and its result is
+            # cached unless it failed.
+            tasks_by_loop = {}
+            
+            def finish_task(loop, key, start_time, task):
+                compute_time = time.perf_counter() - start_time
+                with cache_lock:
+                    statistics['compute_time'] += compute_time
+                    tasks = tasks_by_loop.get(loop, {})
+                    if tasks.get(key) is task:
+                        del tasks[key]
+                        if not tasks:
+                            del tasks_by_loop[loop]
+                    if not task.cancelled() and task.exception() is None:
+                        set_value(key, task.result())
+            
+            def get_value_or_task(function, *args, **kwargs):
+                '''
+                Get `(value, None)` if the value is cached, or `(None, task)`.
+                '''
+                key = get_key(cached._cache, args, kwargs)
+                loop = asyncio.get_event_loop()
+                with cache_lock:
+                    try:
+                        value = get_value(key)
+                    except KeyError:
+                        pass
+                    else:
+                        statistics['hits'] += 1
+                        return (value, None)
+                    tasks = tasks_by_loop.get(loop)
+                    if tasks is None:
+                        # Dropping the tasks of event loops that were closed
+                        # before their tasks finished:
+                        for closed_loop in [other_loop for other_loop
+                                            in tasks_by_loop
+                                            if other_loop.is_closed()]:
+                            del tasks_by_loop[closed_loop]
+                        tasks = tasks_by_loop[loop] = {}
+                    try:
+                        task = tasks[key]
+                    except KeyError:
+                        statistics['misses'] += 1
+                        task = tasks[key] = asyncio.ensure_future(
+                            function(*args, **kwargs)
+                        )
+                        task.add_done_callback(
+                            functools.partial(finish_task, loop, key,
+                                              time.perf_counter())
+                        )
+                    else:
+                        statistics['hits'] += 1
+                    return (None, task)
+            
+            get_value_or_task = decorator_tools.decorator(get_value_or_task,
+                                                          function)
+            
+            @functools.wraps(get_value_or_task)
+            async def result(*args, **kwargs):
+                value, task = get_value_or_task(*args, **kwargs)
+                if task is None:
+                    return value
+                return await asyncio.shield(task)
+            
+        elif not inspect.signature(function).parameters and \
+                                not time_to_keep and backing_cache is None:
+            
+            # A function without arguments has just one value to cache, with
+            # `()` as its key, so a hit takes it straight from the `dict`,
+            # without the wrapper and without building a key. Misses go
+            # through `cached` as usual.
+            cache_dict = cached._cache
+            
+            if not thread_safe:
+                @functools.wraps(function)
+                def result():
+                    try:
+                        value = cache_dict[()]
+                    except KeyError:
+                        return cached(function)
+                    statistics['hits'] += 1
+                    return value
+            else: # thread_safe
+                @functools.wraps(function)
+                def result():
+                    try:
+                        value = cache_dict[()]
+                    except KeyError:
+                        return cached(function)
+                    with cache_lock:
+                        statistics['hits'] += 1
+                    return value
+            
+        else:
+            result = decorator_tools.decorator(cached, function)
         
         def cache_clear(key=CLEAR_ENTIRE_CACHE):
-            if key is CLEAR_ENTIRE_CACHE:
-                cached._cache.clear()
-            else:
-                try:
-                    del cached._cache[key]
-                except KeyError:
-                    pass
+            with cache_lock:
+                if key is CLEAR_ENTIRE_CACHE:
+                    cached._cache.clear()
+                    if time_to_keep:
+                        cached._expiry_queue.clear()
+                    if backing_cache is not None:
+                        backing_cache.clear()
+                else:
+                    try:
+                        del cached._cache[key]
+                    except KeyError:
+                        pass
+                    if backing_cache is not None and _is_simple_key(key):
+                        try:
+                            del backing_cache[function_name + key]
+                        except KeyError:
+                            pass
                 
         result.cache_clear = cache_clear
         
+        def cache_info():
+            with cache_lock:
+                entries = list(cached._cache.items())
+                info = dict(statistics)
+            info.update(
+                size=len(entries), max_size=max_size,
+                n_bytes=sum(get_approximate_size(key, value)
+                            for key, value in entries),
+            )
+            if store is not None:
+                info.update(store_size=len(backing_cache),
+                            store_n_bytes=backing_cache.n_bytes)
+            return info
+        
+        result.cache_info = cache_info
+        registry.register_cache(result)
+        
         result.is_cached = True
         
         return result
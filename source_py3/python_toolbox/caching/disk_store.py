@@ -0,0 +1,190 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+Defines the `DiskStore` class.
+
+See its documentation for more details.
+'''
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+
+from python_toolbox import pickle_tools
+
+infinity = float('inf')
+
+
+# Every record in the file starts with a header of the SHA-256 digest of the
+# key and the length of the value that follows it. A record with this length
+# and no value means that the key was deleted:
+_header_struct = struct.Struct('<32sI')
+_deleted_marker = 2 ** 32 - 1
+
+
+def get_key_digest(key):
+    '''
+    Get a digest of `key` that stays the same between processes.
+
+    The digest is of `repr(key)`, so this works only for keys whose `repr`
+    identifies them, like numbers, strings and tuples of these.
+    '''
+    return hashlib.sha256(repr(key).encode('utf-8')).digest()
+
+
+class DiskStore:
+    '''
+    A persistent key-value store in a single append-only file.
+
+    Values are pickled and compressed with `pickle_tools.compickle`, and keys
+    are identified by a stable digest of their `repr`, so they should be of
+    simple types like numbers, strings and tuples of these. (See
+    `get_key_digest`.)
+
+    Each value is written to the end of the file along with the digest of its
+    key, and the file itself serves as the index: When the store is opened,
+    the headers of the records are scanned to find the offset of the latest
+    value for each key, and values are then read through a memory map of the
+    file. So opening an existing store is quick, and a record that was cut
+    off by a crash is simply dropped.
+
+    When the file gets bigger than `max_bytes`, it's rewritten with only the
+    most recently written values, taking up about half of `max_bytes`.
+    Deleting a key appends a record that marks it as deleted.
+
+    A store is safe to use from multiple threads, but not from multiple
+    processes at the same time.
+    '''
+    def __init__(self, path, max_bytes=infinity):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, 'a+b')
+        self._index = {}
+        self._mmap = None
+        self._load_index()
+
+    def _load_index(self):
+        '''Scan the records in the file and build the index.'''
+        self._remap()
+        file_size = self._mapped_size
+        offset = 0
+        while offset + _header_struct.size <= file_size:
+            digest, value_length = _header_struct.unpack_from(self._mmap,
+                                                              offset)
+            value_offset = offset + _header_struct.size
+            if value_length == _deleted_marker:
+                self._index.pop(digest, None)
+                offset = value_offset
+                continue
+            if value_offset + value_length > file_size:
+                break
+            self._index[digest] = (value_offset, value_length)
+            offset = value_offset + value_length
+        if offset < file_size:
+            # The last record was cut off, probably by a crash while writing
+            # it. We throw it away:
+            self._file.truncate(offset)
+            self._remap()
+        self.n_bytes = offset
+
+    def _remap(self):
+        '''Map the file to memory again, after it has grown.'''
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.flush()
+        file_size = os.fstat(self._file.fileno()).st_size
+        # An empty file can't be mapped:
+        self._mmap = mmap.mmap(self._file.fileno(), file_size,
+                               access=mmap.ACCESS_READ) if file_size else None
+        self._mapped_size = file_size
+
+    def __getitem__(self, key):
+        with self._lock:
+            value_offset, value_length = self._index[get_key_digest(key)]
+            if value_offset + value_length > self._mapped_size:
+                self._remap()
+            return pickle_tools.decompickle(
+                self._mmap[value_offset : value_offset + value_length]
+            )
+
+    def __setitem__(self, key, value):
+        value_bytes = pickle_tools.compickle(value)
+        digest = get_key_digest(key)
+        with self._lock:
+            self._append(_header_struct.pack(digest, len(value_bytes)) +
+                         value_bytes)
+            self._index[digest] = (self.n_bytes - len(value_bytes),
+                                   len(value_bytes))
+            if self.n_bytes > self.max_bytes:
+                self._compact()
+
+    def __delitem__(self, key):
+        digest = get_key_digest(key)
+        with self._lock:
+            del self._index[digest]
+            self._append(_header_struct.pack(digest, _deleted_marker))
+
+    def _append(self, record):
+        self._file.write(record)
+        self._file.flush()
+        self.n_bytes += len(record)
+
+    def __contains__(self, key):
+        return get_key_digest(key) in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def _compact(self):
+        '''Rewrite the file with only the most recently written values.'''
+        self._remap()
+        records = []
+        n_bytes = 0
+        # Going over the values from the most recently written one, keeping
+        # values until they take half of `max_bytes`:
+        for digest, (value_offset, value_length) in sorted(
+                self._index.items(), key=lambda item: item[1][0],
+                reverse=True):
+            n_bytes += _header_struct.size + value_length
+            if n_bytes > self.max_bytes / 2:
+                break
+            records.append(
+                _header_struct.pack(digest, value_length) +
+                self._mmap[value_offset : value_offset + value_length]
+            )
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as temp_file:
+            temp_file.writelines(reversed(records))
+        self._close()
+        os.replace(temp_path, self.path)
+        self._open()
+
+    def clear(self):
+        '''Remove all the values from the store.'''
+        with self._lock:
+            self._close()
+            open(self.path, 'wb').close()
+            self._open()
+
+    def _close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def close(self):
+        '''Close the file of the store.'''
+        with self._lock:
+            self._close()
+
+    def __repr__(self):
+        return '<%s: %s, %s entries, %s bytes>' % (
+            type(self).__name__, self.path, len(self._index), self.n_bytes
+        )
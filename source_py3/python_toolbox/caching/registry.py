@@ -0,0 +1,43 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+A registry of the caches in the process, for getting their statistics.
+
+Functions decorated with `caching.cache`, classes made by `caching.CachedType`
+and `CachedProperty` objects made with `count_statistics=True` register
+themselves here. Each of them has a `cache_info` method that returns a `dict`
+of statistics.
+'''
+
+import threading
+import weakref
+
+
+_caches = weakref.WeakSet()
+_lock = threading.Lock()
+
+
+def register_cache(thing):
+    '''
+    Register an object that has a `cache_info` method.
+
+    Only a weak reference to the object is kept, so it'll be removed from the
+    registry when it's garbage-collected.
+    '''
+    with _lock:
+        _caches.add(thing)
+
+
+def get_cache_infos():
+    '''
+    Get the statistics of all the registered caches.
+
+    Returns a `dict` mapping from each cached function, cached type or cached
+    property to the `dict` returned by its `cache_info` method. This is
+    useful for dumping the statistics of all the caches in a process, to see
+    whether their sizes should be tuned.
+    '''
+    with _lock:
+        caches = list(_caches)
+    return {cache: cache.cache_info() for cache in caches}
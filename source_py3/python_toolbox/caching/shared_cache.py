@@ -0,0 +1,50 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+Defines the `create_shared_cache` function.
+
+See its documentation for more details.
+'''
+
+import multiprocessing.managers
+
+from .bounded_cache import BoundedCache
+
+infinity = float('inf')
+
+
+class SharedCacheManager(multiprocessing.managers.BaseManager):
+    '''A manager that serves `BoundedCache` objects from its own process.'''
+
+# The manager serves each client process in its own thread, which is fine
+# since `BoundedCache` has a lock:
+SharedCacheManager.register(
+    'BoundedCache', BoundedCache,
+    exposed=('__getitem__', '__setitem__', '__delitem__', '__contains__',
+             '__len__', 'clear', 'info')
+)
+
+
+def create_shared_cache(max_size=infinity, max_bytes=infinity):
+    '''
+    Create a `BoundedCache` that's shared between processes.
+
+    This starts a manager process that keeps the cache, and returns a proxy
+    to it. The proxy can be used like a `BoundedCache` from any process that
+    gets it, either by being forked from the process that created it, or by
+    getting it as an argument. Keys and values are pickled on the way to the
+    manager process and back, so they must be picklable.
+
+    `max_size` and `max_bytes` are enforced on the shared cache as a whole,
+    and `info()` returns its statistics. The manager process is shut down
+    when the proxy in the process that created it is garbage-collected.
+
+    This is mostly useful as the `shared` argument of `caching.cache`, so
+    worker processes of a `future_tools.CuteProcessPoolExecutor` can use each
+    other's results.
+    '''
+    shared_cache_manager = SharedCacheManager()
+    shared_cache_manager.start()
+    return shared_cache_manager.BoundedCache(max_size=max_size,
+                                             max_bytes=max_bytes)
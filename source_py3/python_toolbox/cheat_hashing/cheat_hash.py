@@ -7,46 +7,185 @@ Defines the `cheat_hash` function for cheat-hashing mutable objects.
 See its documentation for more details.
 '''
 
-from .cheat_hash_functions import (cheat_hash_dict, cheat_hash_object, 
-                                   cheat_hash_sequence, cheat_hash_set)
+import array
 
-infinity = float('inf')
+from .cheat_hash_functions import (cheat_hash_buffer, cheat_hash_dict,
+                                   cheat_hash_object, cheat_hash_sequence,
+                                   cheat_hash_set, hasher_types)
 
-dispatch_map = {
+
+class _DispatchMap(dict):
+    '''A `dict` that clears the dispatch cache whenever it's changed.'''
+
+    def _clearing_dispatch_cache(method):
+        def inner(self, *args, **kwargs):
+            _dispatch_cache.clear()
+            return method(self, *args, **kwargs)
+        inner.__name__ = method.__name__
+        return inner
+
+    __setitem__ = _clearing_dispatch_cache(dict.__setitem__)
+    __delitem__ = _clearing_dispatch_cache(dict.__delitem__)
+    clear = _clearing_dispatch_cache(dict.clear)
+    pop = _clearing_dispatch_cache(dict.pop)
+    popitem = _clearing_dispatch_cache(dict.popitem)
+    setdefault = _clearing_dispatch_cache(dict.setdefault)
+    update = _clearing_dispatch_cache(dict.update)
+
+    del _clearing_dispatch_cache
+
+
+dispatch_map = _DispatchMap({
     object: cheat_hash_object,
     tuple: cheat_hash_sequence,
     list: cheat_hash_sequence,
     dict: cheat_hash_dict,
-    set: cheat_hash_set
-}
+    set: cheat_hash_set,
+    bytearray: cheat_hash_buffer,
+    array.array: cheat_hash_buffer,
+    memoryview: cheat_hash_buffer,
+})
 '''`dict` mapping from a type to a function that cheat-hashes it.'''
 
+_dispatch_cache = {}
+'''
+Cache mapping from a type to the function in `dispatch_map` that handles it.
+
+This is cleared whenever `dispatch_map` is changed.
+'''
 
-def cheat_hash(thing):
+
+def _get_cheat_hash_function(thing_type):
+    '''Get the function that cheat-hashes objects of type `thing_type`.'''
+    try:
+        return _dispatch_cache[thing_type]
+    except KeyError:
+        # The closest type in the MRO wins:
+        for type_ in thing_type.__mro__:
+            if type_ in dispatch_map:
+                _dispatch_cache[thing_type] = function = dispatch_map[type_]
+                return function
+        raise
+
+
+def cheat_hash(thing, max_n_items=None):
     '''
     Cheat-hash an object. Works on mutable objects.
-    
+
     This is a replacement for `hash` which generates something like an hash for
     an object, even if it is mutable, unhashable and/or refers to
     mutable/unhashable objects.
-    
+
     This is intended for situtations where you have mutable objects that you
     never modify, and you want to be able to hash them despite Python not
     letting you.
-    '''
-    thing_type = type(thing)
-    matching_types = \
-        [type_ for type_ in dispatch_map if issubclass(thing_type, type_)]
-    
-    mro = thing_type.mro()
+
+    Nested containers are traversed without recursion, so deeply nested
+    objects don't hit the recursion limit. If you specify `max_n_items`, a
+    list or tuple with more items than that is hashed by its length and by
+    `max_n_items` of its items, spread evenly over it. This keeps hashing huge
+    lists quick, at the cost of more collisions.
     
-    matching_type = min(
-        matching_types,
-        key=lambda type_: (mro.index(type_) if type_ in mro else infinity)
-    )
+    Objects that support the buffer protocol, like `bytearray`, `array.array`
+    and NumPy arrays, are hashed by the contents of their memory. If you
+    specify `max_n_items`, only a sample of a big buffer is hashed. (For
+    NumPy arrays, this needs `dispatch_map[numpy.ndarray] =
+    cheat_hash_buffer`; otherwise they're hashed whole.)
+    '''
+    function = _get_cheat_hash_function(type(thing))
+    hasher_type = hasher_types.get(function)
+    if hasher_type is None:
+        return function(thing)
+    else:
+        return cheat_hash_container(thing, hasher_type, max_n_items)
+
+
+class _NotSmall(Exception):
+    '''A container is too big or too deeply nested for `_cheat_hash_small`.'''
+
+
+_max_small_depth = 8
+'''How deeply containers may be nested for `_cheat_hash_small`.'''
+
+
+def _cheat_hash_small(container, hasher_type, max_n_items, depth=0):
+    '''
+    Cheat-hash a small container recursively.
+
+    This gives the same hash as `cheat_hash_container`, but it doesn't create
+    a stack and hashers, which makes it quicker for small containers. Raises
+    `_NotSmall` if the container or any container in it is too big for
+    `hash_small` of its hasher type, or if they're nested more than
+    `_max_small_depth` deep, which includes containers that contain
+    themselves.
+    '''
+    if depth > _max_small_depth:
+        raise _NotSmall
     
-    return dispatch_map[matching_type](thing)
+    def hash_item(item):
+        try:
+            return hash(item)
+        except Exception:
+            pass
+        function = _get_cheat_hash_function(type(item))
+        item_hasher_type = hasher_types.get(function)
+        if item_hasher_type is None:
+            return function(item)
+        return _cheat_hash_small(item, item_hasher_type, max_n_items,
+                                 depth + 1)
     
-        
-        
-            
\ No newline at end of file
+    container_hash = hasher_type.hash_small(container, hash_item, max_n_items)
+    if container_hash is None:
+        raise _NotSmall
+    return container_hash
+
+
+def cheat_hash_container(container, hasher_type, max_n_items=None):
+    '''
+    Cheat-hash a container using a hasher of type `hasher_type`.
+
+    Items that can be hashed with `hash` are hashed with it. Items that
+    can't are cheat-hashed. Small containers are hashed recursively with
+    `_cheat_hash_small`; big or deeply nested ones are traversed using a
+    stack of hashers rather than recursion. A container that contains itself
+    is hashed as a constant in the places where it contains itself.
+    '''
+    try:
+        return _cheat_hash_small(container, hasher_type, max_n_items)
+    except _NotSmall:
+        pass
+    stack = [hasher_type.start(container, max_n_items)]
+    ids_on_stack = {id(container)}
+    containers_on_stack = [container]
+    while True:
+        hasher, items = stack[-1]
+        for item in items:
+            try:
+                hasher.add(hash(item))
+                continue
+            except Exception:
+                pass
+            function = _get_cheat_hash_function(type(item))
+            item_hasher_type = hasher_types.get(function)
+            if item_hasher_type is None:
+                hasher.add(function(item))
+            elif id(item) in ids_on_stack:
+                hasher.add(0)
+            else:
+                try:
+                    hasher.add(_cheat_hash_small(item, item_hasher_type,
+                                                 max_n_items))
+                    continue
+                except _NotSmall:
+                    pass
+                stack.append(item_hasher_type.start(item, max_n_items))
+                ids_on_stack.add(id(item))
+                containers_on_stack.append(item)
+                break
+        else:
+            container_hash = hasher.get_hash()
+            stack.pop()
+            ids_on_stack.remove(id(containers_on_stack.pop()))
+            if not stack:
+                return container_hash
+            stack[-1][0].add(container_hash)
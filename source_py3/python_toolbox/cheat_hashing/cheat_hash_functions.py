@@ -6,72 +6,308 @@
 # todo: there are some recommended hash implementations in `_abcoll`, maybe
 # they'll help
 
+import hashlib
+
 
 def cheat_hash_object(thing):
-    '''Cheat-hash an `object`.'''
+    '''
+    Cheat-hash an `object`.
+    
+    Unhashable objects that support the buffer protocol, like NumPy arrays,
+    are hashed by their contents. (See `fingerprint_buffer`.) Other unhashable
+    objects are hashed by their `id`.
+    '''
     try:
         return hash(thing)
     except Exception:
-        return id(thing)
+        try:
+            memoryview(thing)
+        except TypeError:
+            return id(thing)
+        else:
+            return fingerprint_buffer(thing)
+
 
+def fingerprint_buffer(buffer, max_n_items=None):
+    '''
+    Hash an object that supports the buffer protocol by its contents.
     
-def cheat_hash_set(my_set):
-    '''Cheat-hash a `set`.'''
-    hashables = set()
-    unhashables = set()
-    for thing in my_set:
+    This works for `bytes`, `bytearray`, `array.array`, `memoryview`, NumPy
+    arrays and any other object that supports the buffer protocol. The raw
+    memory of the buffer is digested without copying it (unless it's not
+    contiguous), along with its type, format and shape, so objects of the
+    same type and with the same contents get the same hash.
+    
+    If `max_n_items` is specified and the buffer has more items than that,
+    only about `max_n_items` items' worth of bytes, spread evenly over it, are
+    digested.
+    '''
+    view = memoryview(buffer)
+    try:
+        byte_view = view.cast('B')
+    except TypeError:
+        # The buffer isn't C-contiguous, so we have to copy it:
+        byte_view = memoryview(view.tobytes())
+    n_bytes = byte_view.nbytes
+    if max_n_items is not None and \
+                                  n_bytes > max_n_items * view.itemsize > 0:
+        step = -(-n_bytes // (max_n_items * view.itemsize))
+        byte_view = byte_view[::step].tobytes()
+    digest = hashlib.blake2b(byte_view, digest_size=8).digest()
+    return hash((type(buffer), view.format, view.shape, n_bytes,
+                 int.from_bytes(digest, 'little')))
+
+
+### Defining hashers for containers: #########################################
+#                                                                            #
+# A hasher takes the hashes of the items of a container one by one, and then
+# gives the hash of the container. They don't keep the hashes of the items,
+# so hashing a big container doesn't take a lot of memory. `cheat_hash` uses
+# them to go over nested containers without recursion.
+#
+# To save time, the items of big containers are bunched together wherever
+# they can be hashed together with `hash`, which goes over them at C speed.
+# Equal containers are bunched in the same way, so they get the same hash.
+# (Small containers aren't worth it.)
+#
+# Small containers are hashed in one go by `hash_small`, which gives the same
+# hash that going over the items would, without creating a hasher.
+
+_mask = 2 ** 64 - 1
+
+
+def _iterate_bunched(sequence, bunch_size):
+    '''
+    Iterate on the items of `sequence`, bunching hashable ones into tuples.
+
+    Each run of `bunch_size` items is yielded as a tuple if it's hashable, and
+    item by item if it isn't.
+    '''
+    if len(sequence) <= bunch_size:
+        return iter(sequence)
+    return _iterate_bunches(sequence, bunch_size)
+
+
+def _iterate_bunches(sequence, bunch_size):
+    for i in range(0, len(sequence), bunch_size):
+        bunch = tuple(sequence[i : i + bunch_size])
         try:
-            hash(thing)
+            hash(bunch)
         except Exception:
-            unhashables.add(thing)
+            yield from bunch
         else:
-            hashables.add(thing)
-            
-    return hash(
-        (
-            frozenset(hashables),
-            tuple(sorted(cheat_hash(thing) for thing in unhashables))
-        )
-    )    
+            yield bunch
+
+
+def _iterate_bunched_unordered(items, min_n_items_to_bunch=32):
+    '''
+    Iterate on `items`, or yield them as one `frozenset` if it's hashable.
+    '''
+    if len(items) < min_n_items_to_bunch:
+        return iter(items)
+    items = tuple(items)
+    try:
+        bunch = frozenset(items)
+        hash(bunch)
+    except Exception:
+        return iter(items)
+    else:
+        return iter((bunch,))
+
+
+class SequenceHasher:
+    '''
+    Hasher for sequences, where the order of the items matters.
+
+    The hashes of the items are collected in chunks, and each chunk is hashed
+    together with the hash of the chunks before it.
+    '''
+    __slots__ = ('n_items', 'running_hash', 'chunk')
+
+    chunk_size = 256
+
+    def __init__(self, n_items):
+        self.n_items = n_items
+        self.running_hash = 0
+        self.chunk = []
+
+    @classmethod
+    def start(cls, sequence, max_n_items=None):
+        '''
+        Create a hasher for `sequence`, and an iterator of the items to hash.
+
+        If `max_n_items` is specified and `sequence` has more items, only
+        `max_n_items` items spread evenly over it are hashed, along with its
+        length.
+        '''
+        n_items = len(sequence)
+        if max_n_items is not None and n_items > max_n_items:
+            step = n_items / max_n_items
+            sequence = [sequence[int(i * step)] for i in range(max_n_items)]
+        return (cls(n_items), _iterate_bunched(sequence, cls.chunk_size))
+
+    def add(self, item_hash):
+        '''Add the hash of the next item.'''
+        self.chunk.append(item_hash)
+        if len(self.chunk) >= self.chunk_size:
+            self._fold_chunk()
+
+    def _fold_chunk(self):
+        self.running_hash = hash((self.running_hash, tuple(self.chunk)))
+        self.chunk = []
+
+    def get_hash(self):
+        '''Get the hash of the sequence.'''
+        self._fold_chunk()
+        return hash((self.n_items, self.running_hash))
+
+    @classmethod
+    def hash_small(cls, sequence, hash_item, max_n_items=None):
+        '''
+        Hash `sequence` in one go, getting the hashes of its items from
+        `hash_item`.
+
+        Returns `None` if `sequence` has too many items for that.
+        '''
+        n_items = len(sequence)
+        if n_items >= cls.chunk_size or \
+                           (max_n_items is not None and n_items > max_n_items):
+            return None
+        return hash((n_items, hash((0, tuple(map(hash_item, sequence))))))
+
+
+class UnorderedHasher:
+    '''
+    Hasher for sets and dicts, where the order of the items doesn't matter.
+
+    The hashes of the items are combined by their sum and their XOR, which
+    don't depend on the order of the items.
+    '''
+    __slots__ = ('n_items', 'hash_sum', 'hash_xor')
+
+    min_n_items_to_bunch = 32
+
+    def __init__(self, n_items):
+        self.n_items = n_items
+        self.hash_sum = self.hash_xor = 0
+
+    @classmethod
+    def start(cls, container, max_n_items=None):
+        '''
+        Create a hasher for `container`, and an iterator of the items to hash.
+
+        All the items are hashed even if `max_n_items` is specified, because
+        equal sets may iterate on their items in different orders.
+        '''
+        return (cls(len(container)),
+                _iterate_bunched_unordered(container,
+                                           cls.min_n_items_to_bunch))
+
+    def add(self, item_hash):
+        '''Add the hash of another item.'''
+        self.hash_sum = (self.hash_sum + item_hash) & _mask
+        self.hash_xor ^= item_hash
+
+    def get_hash(self):
+        '''Get the hash of the container.'''
+        return hash((self.n_items, self.hash_sum, self.hash_xor))
+
+    @classmethod
+    def _get_items(cls, container):
+        return container
+
+    @classmethod
+    def hash_small(cls, container, hash_item, max_n_items=None):
+        '''
+        Hash `container` in one go, getting the hashes of its items from
+        `hash_item`.
+
+        Returns `None` if `container` has too many items for that.
+        '''
+        if len(container) >= cls.min_n_items_to_bunch:
+            return None
+        hash_sum = hash_xor = 0
+        for item in cls._get_items(container):
+            item_hash = hash_item(item)
+            hash_sum = (hash_sum + item_hash) & _mask
+            hash_xor ^= item_hash
+        return hash((len(container), hash_sum, hash_xor))
+
+
+class DictHasher(UnorderedHasher):
+    '''Hasher for dicts, whose items are their `(key, value)` pairs.'''
+    __slots__ = ()
+
+    @classmethod
+    def start(cls, my_dict, max_n_items=None):
+        '''
+        Create a hasher for `my_dict`, and an iterator of the items to hash.
+        '''
+        return (cls(len(my_dict)),
+                _iterate_bunched_unordered(my_dict.items(),
+                                           cls.min_n_items_to_bunch))
+
+    @classmethod
+    def _get_items(cls, my_dict):
+        return my_dict.items()
+
+
+class BufferHasher:
+    '''
+    Hasher for objects that support the buffer protocol.
+    
+    These are hashed by their contents right away (see `fingerprint_buffer`),
+    so there are no items to go over.
+    '''
+    __slots__ = ('buffer_hash',)
+    
+    def __init__(self, buffer_hash):
+        self.buffer_hash = buffer_hash
+        
+    @classmethod
+    def start(cls, buffer, max_n_items=None):
+        '''Create a hasher for `buffer`, and an empty iterator.'''
+        return (cls(fingerprint_buffer(buffer, max_n_items)), iter(()))
+    
+    def get_hash(self):
+        '''Get the hash of the buffer.'''
+        return self.buffer_hash
+
+    @classmethod
+    def hash_small(cls, buffer, hash_item, max_n_items=None):
+        '''Hash `buffer` by its contents.'''
+        return fingerprint_buffer(buffer, max_n_items)
+
+#                                                                            #
+### Finished defining hashers for containers. ################################
+
+
+def cheat_hash_set(my_set):
+    '''Cheat-hash a `set`.'''
+    return cheat_hash_container(my_set, UnorderedHasher)
 
 
 def cheat_hash_sequence(my_sequence):
     '''Cheat-hash a sequence.'''
-    hashables = []
-    unhashables = []
-    for thing in my_sequence:
-        try:
-            hash(thing)
-        except Exception:
-            unhashables.append(thing)
-        else:
-            hashables.append(thing)
-            
-    return hash(
-        (
-            tuple(hashables),
-            tuple(cheat_hash(thing) for thing in unhashables)
-        )
-    )    
+    return cheat_hash_container(my_sequence, SequenceHasher)
 
 
 def cheat_hash_dict(my_dict):
     '''Cheat-hash a `dict`.'''
-    hashable_items = []
-    unhashable_items = []
-    for key, value in my_dict.items():
-        try:
-            hash((key, value))
-        except Exception:
-            unhashable_items.append((key, value))
-        else:
-            hashable_items.append((key, value))
-            
-    return hash(
-        (
-            tuple(sorted(hashable_items)),
-            tuple(cheat_hash(thing) for thing in sorted(unhashable_items))
-        )
-    )
-
-from .cheat_hash import cheat_hash
\ No newline at end of file
+    return cheat_hash_container(my_dict, DictHasher)
+
+
+def cheat_hash_buffer(buffer):
+    '''Cheat-hash an object that supports the buffer protocol.'''
+    return cheat_hash_container(buffer, BufferHasher)
+
+
+hasher_types = {
+    cheat_hash_buffer: BufferHasher,
+    cheat_hash_set: UnorderedHasher,
+    cheat_hash_sequence: SequenceHasher,
+    cheat_hash_dict: DictHasher,
+}
+'''`dict` mapping from a cheat-hash function of containers to its hasher.'''
+
+from .cheat_hash import cheat_hash, cheat_hash_container
@@ -2,6 +2,8 @@
 # This program is distributed under the MIT license.
 
 import collections
+import itertools
+import numbers
 
 from python_toolbox import binary_search
 from python_toolbox import nifty_collections
@@ -85,6 +87,59 @@ class ChainSpace(sequence_tools.CuteSequenceMixin, collections.Sequence):
         return self.sequences[sequence_index][i - sequence_start]
         
     
+    def get_many(self, indices):
+        '''
+        Get the items at the given indices of this chain space.
+        
+        This is equivalent to `tuple(chain_space[i] for i in indices)`, except
+        the indices are grouped by the sequence they fall in, and if that
+        sequence has a `get_many` method of its own, it's used for fetching
+        all of that sequence's items in one pass.
+        
+        Example:
+        
+            >>> chain_space = ChainSpace(('abc', (1, 2, 3)))
+            >>> chain_space.get_many((4, 0, -1))
+            (2, 'a', 3)
+            
+        '''
+        normalized_indices = []
+        for i in indices:
+            assert isinstance(i, numbers.Integral)
+            if i <= -1:
+                i += self.length
+            if i < 0:
+                raise IndexError
+            normalized_indices.append(i)
+        
+        items = {}
+        sorted_indices = sorted(set(normalized_indices))
+        # Going over the sequences only as far as we need, so we won't exhaust
+        # lazy sequences that we don't have to:
+        sorted_indices_iterator = iter(sorted_indices)
+        i = next(sorted_indices_iterator, None)
+        for sequence, sequence_start, sequence_stop in zip(
+                   self.sequences, self.accumulated_lengths,
+                   itertools.islice(self.accumulated_lengths, 1, None)):
+            if i is None:
+                break
+            sequence_indices = []
+            while i is not None and i < sequence_stop:
+                sequence_indices.append(i - sequence_start)
+                i = next(sorted_indices_iterator, None)
+            if not sequence_indices:
+                continue
+            if hasattr(sequence, 'get_many'):
+                sequence_items = sequence.get_many(sequence_indices)
+            else:
+                sequence_items = [sequence[index] for index in
+                                  sequence_indices]
+            for index, item in zip(sequence_indices, sequence_items):
+                items[index + sequence_start] = item
+        if i is not None:
+            raise IndexError
+        return tuple(items[i] for i in normalized_indices)
+    
     def __iter__(self):
         for sequence in self.sequences:
             yield from sequence
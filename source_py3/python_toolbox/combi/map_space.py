@@ -59,6 +59,21 @@ class MapSpace(sequence_tools.CuteSequenceMixin, collections.Sequence):
         return self.function(self.sequence[i]) # Propagating `IndexError`.
         
     
+    def get_many(self, indices):
+        '''
+        Get the items at the given indices of this map space.
+        
+        This is equivalent to `tuple(map_space[i] for i in indices)`, except
+        that if the underlying sequence has a `get_many` method of its own,
+        it's used for fetching all of the items in one pass.
+        '''
+        if hasattr(self.sequence, 'get_many'):
+            items = self.sequence.get_many(indices)
+        else:
+            items = [self.sequence[i] for i in indices]
+            # (Propagating `IndexError`.)
+        return tuple(map(self.function, items))
+    
     def __iter__(self):
         for item in self.sequence:
             yield self.function(item)
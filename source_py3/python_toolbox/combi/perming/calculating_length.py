@@ -3,10 +3,16 @@
 
 import itertools
 
+from python_toolbox import caching
+from python_toolbox import math_tools
 from python_toolbox import nifty_collections
 
 
-_length_of_recurrent_perm_space_cache = {}
+# The caches below are bounded so they won't grow forever in long-running
+# processes. You can replace them with `BoundedCache` objects with other
+# limits, or warm them up with `BoundedCache.load`.
+
+_length_of_recurrent_perm_space_cache = caching.BoundedCache(max_size=10**5)
 
 def calculate_length_of_recurrent_perm_space(k, fbb):
     '''
@@ -33,11 +39,18 @@ def calculate_length_of_recurrent_perm_space(k, fbb):
         # (Works because `FrozenBagBag` has a functioning `__bool__`, unlike
         # Python's `Counter`.)
         return fbb.n_elements
+    elif set(fbb) == {1}:
+        # No item recurs, so this is a simple falling factorial:
+        n = fbb[1]
+        return math_tools.factorial(n, start=(n - k + 1))
     #                                                                         #
     ### Finished checking for edge cases. #####################################
     
+    # The FBBs are handled in their compact form, `canonical_items`, which is
+    # what the cache is keyed on too, so no bags are created below.
+    canonical_items = fbb.canonical_items
     try:
-        return cache[(k, fbb)]
+        return cache[(k, canonical_items)]
     except KeyError:
         pass
 
@@ -53,20 +66,29 @@ def calculate_length_of_recurrent_perm_space(k, fbb):
     # simplest ones and making our way up to the original FBB. The simplest
     # FBBs will be solved trivially, and then as they get progressively more
     # complex, each FBB will be solved using the solutions of its sub-FBB.
-    # Every solution will be stored in the global cache.
+    # Every solution will be stored in the global cache. Since the cache might
+    # evict solutions while we're adding new ones, we keep the solutions we
+    # need in a local dict too.
 
+    iterate_sub_canonical_items = nifty_collections.FrozenBagBag. \
+                                iterate_sub_canonical_items_for_one_key_removed
     
     ### Doing phase one, getting all sub-FBBs: ################################
     #                                                                         #
+    solutions = {}
     levels = []
-    current_fbbs = {fbb}
+    current_fbbs = {canonical_items}
     while len(levels) < k and current_fbbs:
         k_ = k - len(levels)
-        levels.append(
-            {fbb_: fbb_.get_sub_fbbs_for_one_key_removed()
-             for fbb_ in current_fbbs if (k_, fbb_) not in cache}
-        )
-        current_fbbs = set(itertools.chain(*levels[-1].values()))
+        level = {}
+        for fbb_ in current_fbbs:
+            try:
+                solutions[(k_, fbb_)] = cache[(k_, fbb_)]
+            except KeyError:
+                level[fbb_] = tuple(iterate_sub_canonical_items(fbb_))
+        levels.append(level)
+        current_fbbs = {sub_fbb for sub_fbbs in level.values()
+                        for sub_fbb, factor in sub_fbbs}
     #                                                                         #
     ### Finished doing phase one, getting all sub-FBBs. #######################
     
@@ -74,25 +96,28 @@ def calculate_length_of_recurrent_perm_space(k, fbb):
     #                                                                         #
     for k_, level in enumerate(reversed(levels), (k - len(levels) + 1)):
         if k_ == 1:
-            for fbb_, sub_fbb_bag in level.items():
-                cache[(k_, fbb_)] = fbb_.n_elements
+            for fbb_ in level:
+                # The FBB's `n_elements`, i.e. the number of different items:
+                cache[(k_, fbb_)] = solutions[(k_, fbb_)] = sum(
+                    count for key, count in fbb_
+                )
         else:
-            for fbb_, sub_fbb_bag in level.items():
-                cache[(k_, fbb_)] = sum(
-                    (cache[(k_ - 1, sub_fbb)] * factor for
-                           sub_fbb, factor in sub_fbb_bag.items())
+            for fbb_, sub_fbbs in level.items():
+                cache[(k_, fbb_)] = solutions[(k_, fbb_)] = sum(
+                    (solutions[(k_ - 1, sub_fbb)] * factor for
+                                                   sub_fbb, factor in sub_fbbs)
                 )
     #                                                                         #
     ### Finished doing phase two, solving FBBs from trivial to complex. #######
     
-    return cache[(k, fbb)]
+    return solutions[(k, canonical_items)]
         
     
 
 
 ###############################################################################
 
-_length_of_recurrent_comb_space_cache = {}
+_length_of_recurrent_comb_space_cache = caching.BoundedCache(max_size=10**5)
 
 def calculate_length_of_recurrent_comb_space(k, fbb):
     '''
@@ -118,6 +143,9 @@ def calculate_length_of_recurrent_comb_space(k, fbb):
         # (Works because `FrozenBagBag` has a functioning `__bool__`,
         # unlike Python's `Counter`.)
         return fbb.n_elements
+    elif set(fbb) == {1}:
+        # No item recurs, so this is a simple binomial:
+        return math_tools.binomial(fbb[1], k)
     #                                                                         #
     ### Finished checking for edge cases. #####################################
 
@@ -138,20 +166,27 @@ def calculate_length_of_recurrent_comb_space(k, fbb):
     # simplest ones and making our way up to the original FBB. The simplest
     # FBBs will be solved trivially, and then as they get progressively more
     # complex, each FBB will be solved using the solutions of its sub-FBB.
-    # Every solution will be stored in the global cache.
+    # Every solution will be stored in the global cache. Since the cache might
+    # evict solutions while we're adding new ones, we keep the solutions we
+    # need in a local dict too.
 
     
     ### Doing phase one, getting all sub-FBBs: ################################
     #                                                                         #
+    solutions = {}
     levels = []
     current_fbbs = {fbb}
     while len(levels) < k and current_fbbs:
         k_ = k - len(levels)
-        levels.append(
-            {fbb_: fbb_.get_sub_fbbs_for_one_key_and_previous_piles_removed()
-             for fbb_ in current_fbbs if (k_, fbb_) not in cache}
-        )
-        current_fbbs = set(itertools.chain(*levels[-1].values()))
+        level = {}
+        for fbb_ in current_fbbs:
+            try:
+                solutions[(k_, fbb_)] = cache[(k_, fbb_)]
+            except KeyError:
+                level[fbb_] = \
+                    fbb_.get_sub_fbbs_for_one_key_and_previous_piles_removed()
+        levels.append(level)
+        current_fbbs = set(itertools.chain(*level.values()))
     #                                                                         #
     ### Finished doing phase one, getting all sub-FBBs. #######################
         
@@ -160,16 +195,16 @@ def calculate_length_of_recurrent_comb_space(k, fbb):
     for k_, level in enumerate(reversed(levels), (k - len(levels) + 1)):
         if k_ == 1:
             for fbb_, sub_fbbs in level.items():
-                cache[(k_, fbb_)] = len(sub_fbbs)
+                cache[(k_, fbb_)] = solutions[(k_, fbb_)] = len(sub_fbbs)
         else:
             for fbb_, sub_fbbs in level.items():
-                cache[(k_, fbb_)] = sum(
-                    (cache[(k_ - 1, sub_fbb)] for sub_fbb in sub_fbbs)
+                cache[(k_, fbb_)] = solutions[(k_, fbb_)] = sum(
+                    (solutions[(k_ - 1, sub_fbb)] for sub_fbb in sub_fbbs)
                 )
     #                                                                         #
     ### Finished doing phase two, solving FBBs from trivial to complex. #######
     
-    return cache[(k, fbb)]
+    return solutions[(k, fbb)]
         
     
             
@@ -0,0 +1,143 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+import itertools
+
+
+def _iterate_non_empty_children(children):
+    '''Iterate on `(item, child_state)` of children that have any leaves.'''
+    for item, child_state, n_leaves in children:
+        if n_leaves != 0:
+            yield (item, child_state)
+
+
+def iterate_perm_sequences_from(sequence, n_elements, first_perm_sequence):
+    '''
+    Iterate over k-permutations of `sequence`, starting from a given one.
+
+    The perm sequences are yielded as tuples, in the lexicographic order of
+    the positions of their items in `sequence`, which is the same order that
+    `PermSpace` uses for its indices. The first perm sequence yielded is
+    `first_perm_sequence`.
+
+    It's assumed that `sequence` doesn't have repeating items.
+
+    Example:
+
+        >>> tuple(iterate_perm_sequences_from('abc', 3, ('b', 'c', 'a')))
+        (('b', 'c', 'a'), ('c', 'a', 'b'), ('c', 'b', 'a'))
+
+    '''
+    # We're going over the positions of `first_perm_sequence` from last to
+    # first. For each position, we yield all the perm sequences that share the
+    # prefix before that position, but have a later item in that position. The
+    # suffixes of these perm sequences are generated by `itertools`, which
+    # produces them in lexicographic order at C speed.
+    first_perm_sequence = tuple(first_perm_sequence)
+    yield first_perm_sequence
+    for i in reversed(range(n_elements)):
+        prefix = first_perm_sequence[:i]
+        prefix_set = set(prefix)
+        unused_items = [item for item in sequence if item not in prefix_set]
+        n_items_in_suffix = n_elements - i - 1
+        for j in range(unused_items.index(first_perm_sequence[i]) + 1,
+                       len(unused_items)):
+            head = prefix + (unused_items[j],)
+            for suffix in itertools.permutations(
+                  unused_items[:j] + unused_items[j + 1:], n_items_in_suffix):
+                yield head + suffix
+
+
+def iterate_comb_sequences_from(sequence, n_elements, first_comb_sequence):
+    '''
+    Iterate over combinations of `sequence`, starting from a given one.
+
+    The comb sequences are yielded as tuples, in the lexicographic order of
+    the positions of their items in `sequence`, which is the same order that
+    `CombSpace` uses for its indices. The first comb sequence yielded is
+    `first_comb_sequence`.
+
+    It's assumed that `sequence` doesn't have repeating items.
+
+    Example:
+
+        >>> tuple(iterate_comb_sequences_from('abcd', 2, ('b', 'c')))
+        (('b', 'c'), ('b', 'd'), ('c', 'd'))
+
+    '''
+    # Same idea as `iterate_perm_sequences_from`, except in a combination all
+    # the items after a position must come later in `sequence` than the item
+    # in that position.
+    first_comb_sequence = tuple(first_comb_sequence)
+    sequence = tuple(sequence)
+    yield first_comb_sequence
+    for i in reversed(range(n_elements)):
+        prefix = first_comb_sequence[:i]
+        n_items_in_suffix = n_elements - i - 1
+        for j in range(sequence.index(first_comb_sequence[i]) + 1,
+                       len(sequence) - n_items_in_suffix):
+            head = prefix + (sequence[j],)
+            for suffix in itertools.combinations(sequence[j + 1:],
+                                                 n_items_in_suffix):
+                yield head + suffix
+
+
+def iterate_search_tree_from(first_perm_sequence, root_state, get_children):
+    '''
+    Iterate over the leaves of a search tree, starting from a given leaf.
+
+    This is used for iterating on perm spaces that can't be handled by
+    `itertools`, like recurrent and degreed ones, without unranking each perm
+    from scratch.
+
+    `get_children` is a function that takes a depth and a state, and returns
+    an iterable of `(item, child_state, n_leaves)` triplets, one for each item
+    that could be put in the perm at that depth, in the order of the perm
+    space's indices. `n_leaves` is the number of leaves under that child, or
+    `None` if it's not known but it's known not to be zero. Children without
+    any leaves are skipped. `root_state` is the state at depth zero, and the
+    tree's depth is the length of `first_perm_sequence`, which is the first
+    leaf to be yielded.
+
+    The leaves are yielded as tuples. Each item of a leaf is found by going
+    over the children only once, so getting the next leaf usually takes a
+    constant number of steps regardless of the size of the tree.
+    '''
+    n_levels = len(first_perm_sequence)
+    perm_sequence = list(first_perm_sequence)
+    children_iterators = []
+
+    ### Descending to the first leaf: #########################################
+    #                                                                         #
+    state = root_state
+    for depth, item in enumerate(first_perm_sequence):
+        children_iterator = _iterate_non_empty_children(
+            get_children(depth, state)
+        )
+        for child_item, child_state in children_iterator:
+            if child_item == item:
+                break
+        else:
+            raise RuntimeError
+        children_iterators.append(children_iterator)
+        state = child_state
+    #                                                                         #
+    ### Finished descending to the first leaf. ################################
+
+    yield tuple(perm_sequence)
+
+    depth = n_levels - 1
+    while depth >= 0:
+        try:
+            perm_sequence[depth], state = next(children_iterators[depth])
+        except StopIteration:
+            depth -= 1
+            continue
+        for depth in range(depth + 1, n_levels):
+            children_iterators[depth] = _iterate_non_empty_children(
+                get_children(depth, state)
+            )
+            perm_sequence[depth], state = next(children_iterators[depth])
+        yield tuple(perm_sequence)
+        depth = n_levels - 1
+
@@ -2,8 +2,10 @@
 # This program is distributed under the MIT license.
 
 import collections
+import array
 import abc
 import functools
+import itertools
 import types
 import math
 import numbers
@@ -20,6 +22,10 @@ from python_toolbox import misc_tools
 from .. import misc
 from . import variations
 from .calculating_length import * 
+from .iterating import *
+from .unranking import *
+from .ranking import *
+from .ranking import _count_recurrent_perms, _count_recurrent_combs
 from .variations import UnallowedVariationSelectionException
 from ._variation_removing_mixin import _VariationRemovingMixin
 from ._variation_adding_mixin import _VariationAddingMixin
@@ -407,12 +413,9 @@ class PermSpace(_VariationRemovingMixin, _VariationAddingMixin,
         if self.is_degreed:
             assert not self.is_recurrent and not self.is_partial and \
                                                         not self.is_combination
-            return sum(
-                math_tools.abs_stirling(
-                    self.sequence_length - len(self.fixed_map),
-                    self.sequence_length - degree -
-                                    self._n_cycles_in_fixed_items_of_just_fixed
-                ) for degree in self.degrees
+            return self._get_degreed_unsliced_length(
+                self.sequence_length - len(self.fixed_map),
+                self._n_cycles_in_fixed_items_of_just_fixed
             )
         elif self.is_fixed:
             assert not self.is_degreed and not self.is_combination
@@ -453,6 +456,24 @@ class PermSpace(_VariationRemovingMixin, _VariationAddingMixin,
                 # This division is always without a remainder, because math.
             
             
+    def _get_degreed_unsliced_length(self, n_free_items,
+                                     n_cycles_in_fixed_items):
+        '''
+        Get the number of perms in a degreed space like this one.
+        
+        The space has `n_free_items` items that aren't fixed, and its fixed
+        items make `n_cycles_in_fixed_items` cycles. The result is a sum of
+        unsigned Stirling numbers of the first kind, all from the same row of
+        the table in `math_tools`.
+        '''
+        abs_stirling_row = math_tools.get_abs_stirling_row(n_free_items)
+        return sum(
+            abs_stirling_row[k] for k in (
+                self.sequence_length - degree - n_cycles_in_fixed_items
+                for degree in self.degrees
+            ) if 0 <= k <= n_free_items
+        )
+            
     @caching.CachedProperty
     def variation_selection(self):
         '''
@@ -604,13 +625,11 @@ class PermSpace(_VariationRemovingMixin, _VariationAddingMixin,
                     candidate_n_cycles_in_fixed_items = \
                                      wip_n_cycles_in_fixed_items + closed_cycle
                     
-                    candidate_fixed_perm_space_length = sum(
-                        math_tools.abs_stirling(
-                            self.sequence_length -
+                    candidate_fixed_perm_space_length = \
+                                           self._get_degreed_unsliced_length(
+                        self.sequence_length -
                                              len(candidate_perm_sequence_dict),
-                            self.sequence_length - degree -
-                                              candidate_n_cycles_in_fixed_items
-                        ) for degree in self.degrees
+                        candidate_n_cycles_in_fixed_items
                     )
                     
                     
@@ -693,17 +712,20 @@ class PermSpace(_VariationRemovingMixin, _VariationAddingMixin,
         elif self.is_combination:
             wip_number = self.length - 1 - i
             wip_perm_sequence = []
+            # The `j` we find for each `i` is smaller than the one before it,
+            # so we walk down one column of Pascal's triangle for each `i`,
+            # keeping `binomial` equal to `binomial(j, i)`:
+            j = self.sequence_length
+            binomial = math_tools.binomial(j, self.n_elements)
             for i in range(self.n_elements, 0, -1):
-                for j in range(self.sequence_length, i - 2, -1):
-                    candidate = math_tools.binomial(j, i)
-                    if candidate <= wip_number:
-                        wip_perm_sequence.append(
-                            self.sequence[-(j+1)]
-                        )
-                        wip_number -= candidate
-                        break
-                else:
-                    raise RuntimeError
+                while binomial > wip_number:
+                    binomial = binomial * (j - i) // j
+                    j -= 1
+                wip_perm_sequence.append(self.sequence[-(j+1)])
+                wip_number -= binomial
+                if i >= 2:
+                    binomial = binomial * i // j
+                    j -= 1
             result = tuple(wip_perm_sequence)
             assert len(result) == self.n_elements
             return self.perm_type(result, self)
@@ -712,8 +734,7 @@ class PermSpace(_VariationRemovingMixin, _VariationAddingMixin,
         #######################################################################
         else:
             factoradic_number = math_tools.to_factoradic(
-                i * math.factorial(
-                     self.n_unused_elements),
+                i * math_tools.factorial(self.n_unused_elements),
                 n_digits_pad=self.sequence_length
             )
             if self.is_partial:
@@ -734,8 +755,429 @@ class PermSpace(_VariationRemovingMixin, _VariationAddingMixin,
         '''In partial perm spaces, number of elements that aren't used.'''
     )
     
-    __iter__ = lambda self: (self[i] for i in
-                                         sequence_tools.CuteRange(self.length))
+    def __iter__(self):
+        if self.is_sliced:
+            return itertools.islice(
+                self.unsliced._iterate_from(self.canonical_slice.start),
+                self.length
+            )
+        else:
+            return self._iterate_from(0)
+
+    def _iterate_from(self, i):
+        '''
+        Iterate over the perms in this space, starting from index `i`.
+
+        Instead of fetching each perm by index, which would take a full
+        unranking per perm, we fetch only the first perm by index, and then get
+        each subsequent perm from the one before it. The perms are yielded in
+        the same order as their indices.
+
+        This is used internally by `__iter__`. It's assumed that the space is
+        not sliced.
+        '''
+        assert not self.is_sliced
+        if self.is_dapplied:
+            for perm in self.undapplied._iterate_from(i):
+                yield self.perm_type(perm, perm_space=self)
+        else:
+            for perm_sequence in self._iterate_perm_sequences_from(i):
+                yield self.perm_type(perm_sequence, self)
+
+    def _iterate_perm_sequences_from(self, i):
+        '''
+        Iterate over the sequences of the perms in this space, from index `i`.
+
+        The sequences are yielded as tuples. This is the engine behind
+        `_iterate_from`; it's assumed that the space is not sliced and not
+        dapplied.
+        '''
+        assert not self.is_sliced and not self.is_dapplied
+        if not (0 <= i < self.length):
+            return
+
+        #######################################################################
+        if self.is_degreed:
+            if self.is_rapplied:
+                for perm_sequence in \
+                              self.unrapplied._iterate_perm_sequences_from(i):
+                    yield tuple(map(self.sequence.__getitem__, perm_sequence))
+                return
+
+            root_state = (
+                dict(self.fixed_map), tuple(self.free_values),
+                self._n_cycles_in_fixed_items_of_just_fixed
+            )
+            yield from iterate_search_tree_from(
+                self[i]._perm_sequence, root_state,
+                self._get_degreed_search_tree_children
+            )
+
+        #######################################################################
+        elif self.is_recurrent:
+            root_state = (
+                tuple(self.sequence),
+                nifty_collections.Bag(self.fixed_map.values()),
+                frozenset(), tuple(self.sequence)
+            )
+            yield from iterate_search_tree_from(
+                self[i]._perm_sequence, root_state,
+                self._get_recurrent_search_tree_children
+            )
+
+        #######################################################################
+        elif self.is_fixed:
+            fixed_indices = self.fixed_indices
+            undapplied_fixed_map = self._undapplied_fixed_map
+            free_values_perm_space = \
+                             self._free_values_unsliced_perm_space.undapplied
+            for free_values_perm_sequence in \
+                    free_values_perm_space._iterate_perm_sequences_from(i):
+                free_values_perm_iterator = iter(free_values_perm_sequence)
+                yield tuple(
+                    (undapplied_fixed_map[m] if (m in fixed_indices) else
+                     next(free_values_perm_iterator))
+                                               for m in range(self.n_elements)
+                )
+
+        #######################################################################
+        elif self.is_combination:
+            yield from iterate_comb_sequences_from(
+                self.sequence, self.n_elements, self[i]._perm_sequence
+            )
+
+        #######################################################################
+        else:
+            yield from iterate_perm_sequences_from(
+                self.sequence, self.n_elements, self[i]._perm_sequence
+            )
+
+    def _get_degreed_search_tree_children(self, depth, state):
+        '''
+        Get the children of a search tree node in a degreed space.
+
+        This is used for iterating on the space and for unranking perms in
+        batches. It mirrors the algorithm in the degreed part of
+        `__getitem__`. Yields `(item, child_state, n_leaves)` triplets.
+        '''
+        (wip_perm_sequence_dict, available_values,
+                                           wip_n_cycles_in_fixed_items) = state
+        if depth in wip_perm_sequence_dict:
+            yield (wip_perm_sequence_dict[depth], state, None)
+            return
+        for unused_value in available_values:
+            candidate_perm_sequence_dict = dict(wip_perm_sequence_dict)
+            candidate_perm_sequence_dict[depth] = unused_value
+
+            ### Checking whether we closed a cycle: ###########################
+            #                                                                 #
+            if depth == unused_value:
+                closed_cycle = True
+            else:
+                current = depth
+                while True:
+                    current = candidate_perm_sequence_dict[current]
+                    if current == depth:
+                        closed_cycle = True
+                        break
+                    elif current not in candidate_perm_sequence_dict:
+                        closed_cycle = False
+                        break
+            #                                                                 #
+            ### Finished checking whether we closed a cycle. ##################
+
+            candidate_n_cycles_in_fixed_items = \
+                                     wip_n_cycles_in_fixed_items + closed_cycle
+
+            candidate_fixed_perm_space_length = \
+                                             self._get_degreed_unsliced_length(
+                self.sequence_length - len(candidate_perm_sequence_dict),
+                candidate_n_cycles_in_fixed_items
+            )
+            yield (
+                unused_value,
+                (candidate_perm_sequence_dict,
+                 tuple(value for value in available_values
+                       if value != unused_value),
+                 candidate_n_cycles_in_fixed_items),
+                candidate_fixed_perm_space_length
+            )
+
+    def _get_recurrent_search_tree_children(self, depth, state):
+        '''
+        Get the children of a search tree node when iterating on a recurrent
+        space.
+
+        This mirrors the algorithm in the recurrent part of `__getitem__`,
+        including the order of the candidate values and the way values are
+        ruled out in recurrent combination spaces. Since we're only iterating,
+        we don't calculate the number of perms under each child, we only make
+        sure it isn't zero. Yields `(item, child_state, None)` triplets.
+        '''
+        available_values, reserved_values, shit_set, cut_sequence = state
+        if depth in self.fixed_map:
+            value = self.fixed_map[depth]
+            available_values = list(available_values)
+            available_values.remove(value)
+            reserved_values = nifty_collections.Bag(reserved_values)
+            reserved_values[value] -= 1
+            yield (value, (tuple(available_values), reserved_values, shit_set,
+                           cut_sequence), None)
+            return
+
+        n_elements_left = self.n_elements - depth - 1
+        unused_values = [
+            item for item in
+            nifty_collections.OrderedBag(available_values) - reserved_values
+                                                     if item not in shit_set
+        ]
+        for unused_value in unused_values:
+            candidate_available_values = list(available_values)
+            candidate_available_values.remove(unused_value)
+            if self.is_combination:
+                # A recurrent combination space cuts its sequence after each
+                # value that was used, so we need to check that there are
+                # enough values left after the cut.
+                try:
+                    candidate_cut_sequence = cut_sequence[
+                                      cut_sequence.index(unused_value) + 1:]
+                except ValueError:
+                    is_viable = False
+                else:
+                    is_viable = len(
+                        [item for item in candidate_cut_sequence
+                                                     if item not in shit_set]
+                    ) >= n_elements_left
+                if is_viable:
+                    yield (unused_value,
+                           (tuple(candidate_available_values),
+                            reserved_values, shit_set,
+                            candidate_cut_sequence), None)
+                shit_set |= {unused_value}
+            else:
+                yield (unused_value,
+                       (tuple(candidate_available_values), reserved_values,
+                        shit_set, cut_sequence), None)
+                
+    def _get_recurrent_search_tree_children_with_lengths(self, depth, state):
+        '''
+        Get the children of a search tree node when unranking perms in a
+        recurrent space.
+
+        This mirrors the algorithm in the recurrent part of `__getitem__`, but
+        instead of creating a sub-space for each child to get the number of
+        perms under it, it calculates that number from the counts of the items
+        that are left, like `rank_recurrent_perm_sequence` does. Yields
+        `(item, child_state, n_leaves)` triplets.
+        '''
+        available_values, free_counts, shit_set, cut_sequence = state
+        if depth in self.fixed_map:
+            value = self.fixed_map[depth]
+            available_values = list(available_values)
+            available_values.remove(value)
+            yield (value, (tuple(available_values), free_counts, shit_set,
+                           cut_sequence), None)
+            return
+        
+        n_free_items_left = self.n_elements - depth - 1 - \
+                            sum(1 for i in self.fixed_map if i > depth)
+        unused_values = [
+            item for item in collections.OrderedDict.fromkeys(available_values)
+                             if free_counts[item] > 0 and item not in shit_set
+        ]
+        sub_space_lengths_by_count = {}
+        for unused_value in unused_values:
+            candidate_available_values = list(available_values)
+            candidate_available_values.remove(unused_value)
+            candidate_free_counts = collections.Counter(free_counts)
+            candidate_free_counts[unused_value] -= 1
+            if self.is_combination:
+                candidate_cut_sequence = cut_sequence[
+                                        cut_sequence.index(unused_value) + 1:]
+                n_leaves = _count_recurrent_combs(
+                    n_free_items_left,
+                    [item for item in candidate_cut_sequence
+                                                     if item not in shit_set]
+                )
+            else:
+                candidate_cut_sequence = cut_sequence
+                # Items with the same count leave sub-spaces of the same
+                # length, so we calculate it once per count:
+                count = free_counts[unused_value]
+                try:
+                    n_leaves = sub_space_lengths_by_count[count]
+                except KeyError:
+                    n_leaves = sub_space_lengths_by_count[count] = \
+                        _count_recurrent_perms(n_free_items_left,
+                                               candidate_free_counts.values())
+            yield (unused_value,
+                   (tuple(candidate_available_values), candidate_free_counts,
+                    shit_set, candidate_cut_sequence),
+                   n_leaves)
+            if self.is_combination:
+                shit_set = shit_set | {unused_value}
+                
+    def get_many(self, indices, *, as_array=False):
+        '''
+        Get the perms at the given indices, unranking them in one pass.
+        
+        This is equivalent to `tuple(perm_space[i] for i in indices)`, but it's
+        faster because work that's common to several perms is done only once
+        for the whole batch. The indices don't need to be sorted, but perms
+        that are close to each other share more work.
+        
+        If you specify `as_array=True`, you'll get a flat `array.array` of
+        integers instead of `Perm` objects, with `n_elements` integers per
+        perm, each being the index of an item in the space's sequence. This is
+        much more compact for big batches. (If you use NumPy, you can get a
+        matrix with one perm per row by using `numpy.frombuffer`.)
+        
+        Example:
+        
+            >>> perm_space = PermSpace('meow')
+            >>> perm_space.get_many((0, 7, 23))
+            (<Perm: ('m', 'e', 'o', 'w')>, <Perm: ('e', 'm', 'w', 'o')>,
+             <Perm: ('w', 'o', 'e', 'm')>)
+            >>> perm_space.get_many((0, 7), as_array=True)
+            array('q', [0, 1, 2, 3, 1, 0, 3, 2])
+            
+        '''
+        normalized_indices = []
+        for i in indices:
+            assert isinstance(i, numbers.Integral)
+            if i <= -1:
+                i += self.length
+            if not (0 <= i < self.length):
+                raise IndexError
+            normalized_indices.append(i)
+        sorted_indices = sorted(set(normalized_indices))
+        
+        if as_array:
+            perm_sequences = dict(zip(
+                sorted_indices, self._get_many_perm_sequences(sorted_indices)
+            ))
+            ### Converting the items to their indices in the sequence: ########
+            #                                                                 #
+            if not self.is_rapplied:
+                get_item_indices = lambda perm_sequence: perm_sequence
+            elif not self.is_recurrent:
+                item_to_index = {item: i for i, item in
+                                 enumerate(self.sequence)}
+                get_item_indices = lambda perm_sequence: \
+                                 map(item_to_index.__getitem__, perm_sequence)
+            else:
+                # Like in `Perm.unrapplied`, every time there's a recurrent
+                # item we take the first index we haven't taken already.
+                item_to_indices = collections.defaultdict(list)
+                for i, item in enumerate(self.sequence):
+                    item_to_indices[item].append(i)
+                def get_item_indices(perm_sequence):
+                    item_to_indices_iterators = {
+                        item: iter(indices) for item, indices in
+                                                      item_to_indices.items()
+                    }
+                    return [next(item_to_indices_iterators[item])
+                            for item in perm_sequence]
+            #                                                                 #
+            ### Finished converting the items to their indices in the sequence.
+            return array.array(
+                'q',
+                itertools.chain.from_iterable(
+                    get_item_indices(perm_sequences[i])
+                    for i in normalized_indices
+                )
+            )
+        else:
+            perms = dict(zip(sorted_indices,
+                             self._get_many_sorted(sorted_indices)))
+            return tuple(perms[i] for i in normalized_indices)
+            
+    def _get_many_sorted(self, indices):
+        '''
+        Get the perms at the given sorted indices.
+        
+        This is the engine behind `get_many`. The perms are created exactly
+        like `__getitem__` would create them.
+        '''
+        if self.is_sliced:
+            return self.unsliced._get_many_sorted(
+                [i + self.canonical_slice.start for i in indices]
+            )
+        elif self.is_dapplied:
+            return [self.perm_type(perm, perm_space=self) for perm in
+                    self.undapplied._get_many_sorted(indices)]
+        else:
+            return [self.perm_type(perm_sequence, self) for perm_sequence in
+                    self._get_many_perm_sequences(indices)]
+        
+    def _get_many_perm_sequences(self, indices):
+        '''
+        Get the sequences of the perms at the given sorted indices, as tuples.
+        '''
+        if self.is_sliced:
+            return self.unsliced._get_many_perm_sequences(
+                [i + self.canonical_slice.start for i in indices]
+            )
+        elif self.is_dapplied:
+            return self.undapplied._get_many_perm_sequences(indices)
+        
+        #######################################################################
+        elif self.is_degreed:
+            if self.is_rapplied:
+                return [
+                    tuple(map(self.sequence.__getitem__, perm_sequence))
+                    for perm_sequence in
+                              self.unrapplied._get_many_perm_sequences(indices)
+                ]
+            root_state = (
+                dict(self.fixed_map), tuple(self.free_values),
+                self._n_cycles_in_fixed_items_of_just_fixed
+            )
+            return unrank_many_in_search_tree(
+                indices, self.sequence_length, root_state,
+                self._get_degreed_search_tree_children
+            )
+        
+        #######################################################################
+        elif self.is_recurrent:
+            # The counts of the items that are neither used nor reserved for
+            # the fixed positions that we haven't reached yet:
+            free_counts = collections.Counter(self.sequence)
+            free_counts.subtract(self.fixed_map.values())
+            root_state = (tuple(self.sequence), free_counts, frozenset(),
+                          tuple(self.sequence))
+            return unrank_many_in_search_tree(
+                indices, self.n_elements, root_state,
+                self._get_recurrent_search_tree_children_with_lengths
+            )
+        
+        #######################################################################
+        elif self.is_fixed:
+            fixed_indices = self.fixed_indices
+            undapplied_fixed_map = self._undapplied_fixed_map
+            free_values_perm_sequences = self. \
+                  _free_values_unsliced_perm_space._get_many_perm_sequences(
+                                                                       indices)
+            perm_sequences = []
+            for free_values_perm_sequence in free_values_perm_sequences:
+                free_values_perm_iterator = iter(free_values_perm_sequence)
+                perm_sequences.append(tuple(
+                    (undapplied_fixed_map[m] if (m in fixed_indices) else
+                     next(free_values_perm_iterator))
+                                               for m in range(self.n_elements)
+                ))
+            return perm_sequences
+        
+        #######################################################################
+        elif self.is_combination:
+            return unrank_many_comb_sequences(self.sequence, self.n_elements,
+                                              indices)
+        
+        #######################################################################
+        else:
+            return unrank_many_perm_sequences(self.sequence, self.n_elements,
+                                              indices)
+                
     _reduced = property(
         lambda self: (
             type(self), self.sequence, self.domain, 
@@ -793,73 +1235,18 @@ class PermSpace(_VariationRemovingMixin, _VariationAddingMixin,
         #######################################################################
         elif self.is_degreed:
             if perm.is_rapplied: return self.unrapplied.index(perm.unrapplied)
-            wip_perm_number = 0
-            wip_perm_sequence_dict = dict(self.fixed_map)
-            unused_values = list(self.free_values)
-            for i, value in enumerate(perm._perm_sequence):
-                if i in self.fixed_indices:
-                    continue
-                unused_values.remove(value)
-                lower_values = [j for j in unused_values if j < value]
-                for lower_value in lower_values:
-                    temp_fixed_map = dict(wip_perm_sequence_dict)
-                    temp_fixed_map[i] = lower_value
-                    wip_perm_number += PermSpace(
-                        self.sequence_length, degrees=self.degrees,
-                        fixed_map=temp_fixed_map
-                    ).length
-                    
-                wip_perm_sequence_dict[self.domain[i]] = value
-                
-            perm_number = wip_perm_number
+            perm_number = rank_degreed_perm_sequence(
+                perm._perm_sequence, self.degrees, self.fixed_map,
+                self._n_cycles_in_fixed_items_of_just_fixed
+            )
             
         #######################################################################
         elif self.is_recurrent:
             assert not self.is_degreed and not self.is_dapplied
-
-            wip_perm_number = 0
-            unused_values = list(self.sequence)
-            reserved_values = list(self.fixed_map.values())
-            perm_sequence_list = list(perm._perm_sequence)
-            shit_set = set()
-            for i, value in enumerate(perm._perm_sequence):
-                if i in self.fixed_map:
-                    if self.fixed_map[i] == value:
-                        unused_values.remove(value)
-                        reserved_values.remove(value)
-                        continue
-                    else:
-                        raise ValueError
-                lower_values = [
-                    thing for thing in
-                    nifty_collections.OrderedSet(unused_values) if
-                    (thing not in reserved_values or unused_values.count(thing)
-                     > reserved_values.count(thing)) and 
-                    unused_values.index(thing) < unused_values.index(value) and
-                                                          thing not in shit_set
-                ]
-                unused_values.remove(value)
-                for lower_value in lower_values:
-                    temp_fixed_map = dict(
-                            enumerate(perm_sequence_list[:i] + [lower_value])
-                    )
-                    temp_fixed_map.update(self.fixed_map)
-                    
-                    candidate_sub_perm_space = \
-                                             PermSpace._create_with_cut_prefix(
-                        self.sequence,
-                        n_elements=self.n_elements,
-                        fixed_map=temp_fixed_map,
-                        is_combination=self.is_combination,
-                        shit_set=shit_set, perm_type=self.perm_type
-                    )
-                    
-                    wip_perm_number += candidate_sub_perm_space.length
-                    if self.is_combination:
-                        shit_set.add(lower_value)
-                    
-                
-            perm_number = wip_perm_number
+            perm_number = rank_recurrent_perm_sequence(
+                perm._perm_sequence, self.sequence, self.fixed_map,
+                is_combination=self.is_combination
+            )
             
         #######################################################################
         elif self.is_fixed:
@@ -898,7 +1285,7 @@ class PermSpace(_VariationRemovingMixin, _VariationAddingMixin,
             )
             perm_number = self.unsliced.length - 1 - sum(
                 (math_tools.binomial(item, i) for i, item in
-                                  enumerate(processed_perm_sequence, start=1)),
+                 enumerate(processed_perm_sequence, start=1) if i <= item),
                 0
             )
               
@@ -913,7 +1300,7 @@ class PermSpace(_VariationRemovingMixin, _VariationAddingMixin,
             perm_number = math_tools.from_factoradic(
                 factoradic_number +
                 [0] * self.n_unused_elements
-            ) // math.factorial(self.n_unused_elements)
+            ) // math_tools.factorial(self.n_unused_elements)
             
             
         #######################################################################
@@ -0,0 +1,191 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+import collections
+
+from python_toolbox import caching
+from python_toolbox import math_tools
+from python_toolbox import nifty_collections
+
+from .calculating_length import *
+
+
+_count_recurrent_perms_cache = caching.BoundedCache(max_size=10**5)
+
+def _count_recurrent_perms(n_elements, counts):
+    '''
+    Count the perms of length `n_elements` of items with the given `counts`.
+
+    `counts` is an iterable with the number of recurrences of each item. The
+    results are cached by the sorted counts, so we don't have to create a
+    `FrozenBagBag` every time.
+    '''
+    key = (n_elements, tuple(sorted(count for count in counts if count)))
+    try:
+        return _count_recurrent_perms_cache[key]
+    except KeyError:
+        pass
+    if n_elements > sum(key[1]):
+        result = 0
+    else:
+        result = calculate_length_of_recurrent_perm_space(
+            n_elements, nifty_collections.FrozenBagBag(key[1])
+        )
+    _count_recurrent_perms_cache[key] = result
+    return result
+
+
+def _count_recurrent_combs(n_elements, sequence):
+    '''Count the combs of length `n_elements` of the items in `sequence`.'''
+    if n_elements > len(sequence):
+        return 0
+    return calculate_length_of_recurrent_comb_space(
+        n_elements,
+        nifty_collections.FrozenBagBag(
+            nifty_collections.Bag(sequence).values()
+        )
+    )
+
+
+def _does_close_cycle(perm_sequence_dict, key):
+    '''
+    Check whether the item at `key` closes a cycle in a partial perm.
+
+    `perm_sequence_dict` maps keys to values, and it may be missing some keys.
+    '''
+    current = key
+    while True:
+        current = perm_sequence_dict[current]
+        if current == key:
+            return True
+        elif current not in perm_sequence_dict:
+            return False
+
+
+def rank_degreed_perm_sequence(perm_sequence, degrees, fixed_map,
+                               n_cycles_in_fixed_items):
+    '''
+    Get the index number of `perm_sequence` in a degreed `PermSpace`.
+
+    The space is assumed to be a pure perm space of `range(n)` with the given
+    `degrees` and `fixed_map`, where `n_cycles_in_fixed_items` is the number
+    of cycles made by the fixed items alone. It's assumed that
+    `perm_sequence` is in that space, except that `ValueError` is raised if
+    it doesn't agree with `fixed_map`.
+
+    Instead of creating a sub-space for every value that's lower than the one
+    in each position, like `PermSpace.index` used to do, the number of perms
+    in each sub-space is calculated directly from the unsigned Stirling
+    numbers of the first kind, the same way `PermSpace.__getitem__` does.
+    '''
+    sequence_length = len(perm_sequence)
+    wip_perm_number = 0
+    wip_perm_sequence_dict = dict(fixed_map)
+    wip_n_cycles_in_fixed_items = n_cycles_in_fixed_items
+    # The length of a sub-space depends only on the number of its free items
+    # and the number of cycles in its fixed items, so we cache it by these:
+    sub_space_lengths = {}
+    fixed_values = set(fixed_map.values())
+    unused_values = [value for value in range(sequence_length)
+                     if value not in fixed_values]
+    for i, value in enumerate(perm_sequence):
+        if i in fixed_map:
+            if fixed_map[i] != value:
+                raise ValueError
+            continue
+        for unused_value in unused_values:
+            wip_perm_sequence_dict[i] = unused_value
+            candidate_n_cycles_in_fixed_items = wip_n_cycles_in_fixed_items + \
+                            _does_close_cycle(wip_perm_sequence_dict, i)
+            if unused_value == value:
+                break
+            n_free_items = sequence_length - len(wip_perm_sequence_dict)
+            key = (n_free_items, candidate_n_cycles_in_fixed_items)
+            try:
+                wip_perm_number += sub_space_lengths[key]
+            except KeyError:
+                abs_stirling_row = math_tools.get_abs_stirling_row(
+                    n_free_items
+                )
+                sub_space_lengths[key] = sub_space_length = sum(
+                    abs_stirling_row[k] for k in (
+                        sequence_length - degree -
+                                      candidate_n_cycles_in_fixed_items
+                        for degree in degrees
+                    ) if 0 <= k <= n_free_items
+                )
+                wip_perm_number += sub_space_length
+        else:
+            raise ValueError
+        unused_values.remove(value)
+        wip_n_cycles_in_fixed_items = candidate_n_cycles_in_fixed_items
+    return wip_perm_number
+
+
+def rank_recurrent_perm_sequence(perm_sequence, sequence, fixed_map,
+                                 is_combination=False):
+    '''
+    Get the index number of `perm_sequence` in a recurrent `PermSpace`.
+
+    The space is assumed to be a `PermSpace` (or a `CombSpace` if
+    `is_combination=True`) of `sequence` with the given `fixed_map`, and
+    with perms of the length of `perm_sequence`. `ValueError` is raised if
+    `perm_sequence` doesn't agree with `fixed_map` or if it has items that
+    aren't available.
+
+    Instead of creating a sub-space for every value that's lower than the one
+    in each position, like `PermSpace.index` used to do, the number of perms
+    in each sub-space is calculated directly from the counts of the items
+    that are left, using the `FrozenBagBag` length caches.
+    '''
+    n_elements = len(perm_sequence)
+    wip_perm_number = 0
+    unused_values = list(sequence)
+    # The counts of the items that are neither used nor reserved for the fixed
+    # positions that we haven't reached yet:
+    free_counts = collections.Counter(sequence)
+    free_counts.subtract(fixed_map.values())
+    n_fixed_items_left = len(fixed_map)
+    # The sequence that a `CombSpace` of the remaining items would have:
+    cut_sequence = list(sequence)
+    shit_set = set()
+    for i, value in enumerate(perm_sequence):
+        if i in fixed_map:
+            if fixed_map[i] != value:
+                raise ValueError
+            unused_values.remove(value)
+            n_fixed_items_left -= 1
+            continue
+        n_free_items_left = n_elements - i - 1 - n_fixed_items_left
+        sub_space_lengths_by_count = {}
+        for unused_value in collections.OrderedDict.fromkeys(unused_values):
+            if unused_value == value:
+                break
+            if unused_value in shit_set or free_counts[unused_value] <= 0:
+                continue
+            if is_combination:
+                wip_perm_number += _count_recurrent_combs(
+                    n_free_items_left,
+                    [item for item in
+                     cut_sequence[cut_sequence.index(unused_value) + 1:]
+                     if item not in shit_set]
+                )
+                shit_set.add(unused_value)
+            else:
+                # Items with the same count leave sub-spaces of the same
+                # length, so we calculate it once per count:
+                count = free_counts[unused_value]
+                try:
+                    wip_perm_number += sub_space_lengths_by_count[count]
+                except KeyError:
+                    free_counts[unused_value] -= 1
+                    sub_space_lengths_by_count[count] = sub_space_length = \
+                       _count_recurrent_perms(n_free_items_left,
+                                              free_counts.values())
+                    free_counts[unused_value] += 1
+                    wip_perm_number += sub_space_length
+        unused_values.remove(value) # (Propagating `ValueError`.)
+        free_counts[value] -= 1
+        if is_combination:
+            cut_sequence = cut_sequence[cut_sequence.index(value) + 1:]
+    return wip_perm_number
@@ -0,0 +1,160 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+import bisect
+
+from python_toolbox import math_tools
+
+infinity = float('inf')
+
+
+def unrank_many_perm_sequences(sequence, n_elements, indices):
+    '''
+    Get the k-permutations of `sequence` at the given sorted `indices`.
+
+    The indices are in the lexicographic order of the positions of the items
+    in `sequence`, which is the order `PermSpace` uses. `indices` must be
+    sorted; a list of tuples is returned, one for each index.
+
+    It's assumed that `sequence` doesn't have repeating items.
+
+    This does the same work as `PermSpace.__getitem__`, except the factorials
+    are calculated once for the whole batch, and perms that share a prefix
+    with the previous perm don't recalculate that prefix.
+
+    Example:
+
+        >>> unrank_many_perm_sequences('abc', 3, (0, 3, 5))
+        [('a', 'b', 'c'), ('b', 'c', 'a'), ('c', 'b', 'a')]
+
+    '''
+    sequence_length = len(sequence)
+    radices = [None] * n_elements
+    radix = 1
+    for i in reversed(range(n_elements)):
+        radices[i] = radix
+        radix *= sequence_length - i
+
+    perm_sequences = []
+    unused_items = list(sequence)
+    digits = []
+    perm_sequence = []
+    for index in indices:
+        new_digits = []
+        for radix in radices:
+            digit, index = divmod(index, radix)
+            new_digits.append(digit)
+
+        ### Undoing the part that isn't shared with the previous perm: ########
+        #                                                                     #
+        n_shared_items = 0
+        for digit, new_digit in zip(digits, new_digits):
+            if digit != new_digit:
+                break
+            n_shared_items += 1
+        for i in reversed(range(n_shared_items, len(digits))):
+            unused_items.insert(digits[i], perm_sequence.pop())
+        #                                                                     #
+        ### Finished undoing the part that isn't shared with the previous perm.
+
+        for new_digit in new_digits[n_shared_items:]:
+            perm_sequence.append(unused_items.pop(new_digit))
+        digits = new_digits
+        perm_sequences.append(tuple(perm_sequence))
+    return perm_sequences
+
+
+def unrank_many_comb_sequences(sequence, n_elements, indices):
+    '''
+    Get the combinations of `sequence` at the given sorted `indices`.
+
+    The indices are in the lexicographic order of the positions of the items
+    in `sequence`, which is the order `CombSpace` uses. `indices` must be
+    sorted; a list of tuples is returned, one for each index.
+
+    It's assumed that `sequence` doesn't have repeating items.
+
+    This does the same work as `PermSpace.__getitem__`, except the binomials
+    are calculated once for the whole batch, and each item is found with a
+    binary search instead of a linear one.
+
+    Example:
+
+        >>> unrank_many_comb_sequences('abcd', 2, (0, 2, 5))
+        [('a', 'b'), ('a', 'd'), ('c', 'd')]
+
+    '''
+    sequence_length = len(sequence)
+    length = math_tools.binomial(sequence_length, n_elements)
+
+    # `binomial_rows[i][j]` is the binomial of `j` and `i`:
+    binomial_rows = [[1] * (sequence_length + 1)]
+    for i in range(1, n_elements + 1):
+        previous_binomial_row = binomial_rows[-1]
+        binomial_row = [0] * (sequence_length + 1)
+        for j in range(i, sequence_length + 1):
+            binomial_row[j] = binomial_row[j - 1] + \
+                                                 previous_binomial_row[j - 1]
+        binomial_rows.append(binomial_row)
+
+    comb_sequences = []
+    for index in indices:
+        wip_number = length - 1 - index
+        comb_sequence = []
+        for i in range(n_elements, 0, -1):
+            binomial_row = binomial_rows[i]
+            j = bisect.bisect_right(binomial_row, wip_number) - 1
+            comb_sequence.append(sequence[sequence_length - 1 - j])
+            wip_number -= binomial_row[j]
+        comb_sequences.append(tuple(comb_sequence))
+    return comb_sequences
+
+
+def unrank_many_in_search_tree(indices, n_levels, root_state, get_children):
+    '''
+    Get the leaves at the given sorted `indices` of a search tree.
+
+    This is used for unranking a batch of perms in perm spaces that don't have
+    a closed formula for their perms, like recurrent and degreed ones.
+
+    `get_children` is a function that takes a depth and a state, and returns
+    an iterable of `(item, child_state, n_leaves)` triplets, one for each item
+    that could be put in the perm at that depth, in the order of the perm
+    space's indices. `n_leaves` is the number of leaves under that child, or
+    `None` if it's the only child. `root_state` is the state at depth zero.
+
+    The leaves are returned as a list of tuples, one for each index. Since the
+    indices are sorted, leaves that share a prefix share the work of finding
+    it, and the children of each node are gone over only once for the whole
+    batch.
+    '''
+    leaves = []
+    # Each frame is `[children_iterator, child_start, child_stop, child_item,
+    # child_state]`, describing the child we chose at that depth:
+    frames = []
+    for index in indices:
+        depth = 0
+        while depth < len(frames) and index < frames[depth][2]:
+            depth += 1
+        del frames[depth + 1:]
+        while depth < n_levels:
+            if depth == len(frames):
+                child_start = frames[-1][1] if frames else 0
+                frames.append([
+                    iter(get_children(
+                        depth, frames[-1][4] if frames else root_state
+                    )),
+                    child_start, child_start, None, None
+                ])
+            frame = frames[depth]
+            while index >= frame[2]:
+                item, state, n_leaves = next(frame[0])
+                frame[1] = frame[2]
+                frame[2] = infinity if n_leaves is None else \
+                                                          frame[2] + n_leaves
+                frame[3] = item
+                frame[4] = state
+            depth += 1
+        leaves.append(tuple(frame[3] for frame in frames))
+    return leaves
+
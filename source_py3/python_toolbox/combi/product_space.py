@@ -2,6 +2,9 @@
 # This program is distributed under the MIT license.
 
 import collections
+import numbers
+import array
+import itertools
 
 from python_toolbox import math_tools
 from python_toolbox import sequence_tools
@@ -85,6 +88,72 @@ class ProductSpace(sequence_tools.CuteSequenceMixin, collections.Sequence):
             
         return wip_index
     
+    def get_many(self, indices, *, as_array=False):
+        '''
+        Get the items at the given indices of this product space.
+        
+        This is equivalent to `tuple(product_space[i] for i in indices)`, but
+        every item of every sequence is fetched only once for the whole batch,
+        and if a sequence has a `get_many` method of its own, it's used for
+        fetching these items in one pass.
+        
+        If you specify `as_array=True`, you'll get a flat `array.array` of
+        integers instead of tuples, with one integer per sequence for each
+        item, being the index of the item in that sequence. (If a sequence is
+        too long for its indices to fit in 64-bit integers, you'll get a flat
+        `list` of them instead.)
+        
+        Example:
+        
+            >>> product_space = ProductSpace(('abc', range(4)))
+            >>> product_space.get_many((10, 0))
+            (('c', 2), ('a', 0))
+            >>> product_space.get_many((10, 0), as_array=True)
+            array('q', [2, 2, 0, 0])
+            
+        '''
+        index_tuples = []
+        for i in indices:
+            assert isinstance(i, numbers.Integral)
+            if i < 0:
+                i += self.length
+            if not (0 <= i < self.length):
+                raise IndexError
+            wip_i = i
+            reverse_indices = []
+            for sequence_length in reversed(self.sequence_lengths):
+                wip_i, current_index = divmod(wip_i, sequence_length)
+                reverse_indices.append(current_index)
+            index_tuples.append(tuple(reversed(reverse_indices)))
+            
+        if as_array:
+            flat_indices = itertools.chain.from_iterable(index_tuples)
+            if max(self.sequence_lengths, default=0) > 2 ** 63:
+                return list(flat_indices)
+            return array.array('q', flat_indices)
+        
+        ### Fetching each needed item of each sequence once: ##################
+        #                                                                     #
+        items_by_index_by_sequence = []
+        for sequence, sequence_indices in zip(self.sequences,
+                                              zip(*index_tuples)):
+            sorted_sequence_indices = sorted(set(sequence_indices))
+            if hasattr(sequence, 'get_many'):
+                items = sequence.get_many(sorted_sequence_indices)
+            else:
+                items = [sequence[index] for index in sorted_sequence_indices]
+            items_by_index_by_sequence.append(
+                dict(zip(sorted_sequence_indices, items))
+            )
+        #                                                                     #
+        ### Finished fetching each needed item of each sequence once. #########
+            
+        return tuple(
+            tuple(items_by_index[index] for items_by_index, index in
+                  zip(items_by_index_by_sequence, index_tuple))
+            for index_tuple in index_tuples
+        )
+    
     
     __bool__ = lambda self: bool(self.length)
         
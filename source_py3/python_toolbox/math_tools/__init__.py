@@ -5,4 +5,5 @@ from .factorials import *
 from .misc import *
 from .sequences import *
 from .statistics import *
+from .tables import *
 from .types import *
\ No newline at end of file
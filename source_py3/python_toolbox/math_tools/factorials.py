@@ -6,10 +6,20 @@ import collections
 import itertools
 import numbers
 
+from . import tables
+
 infinity = float('inf')
 infinities = (infinity, -infinity)
 
 
+def _get_factorial(x):
+    '''Get the factorial of `x`, from the table of factorials if it's in it.'''
+    if x <= tables.max_n_in_tables:
+        return tables.get_factorial(x)
+    else:
+        return math.factorial(x)
+
+
 def factorial(x, start=1):
     '''
     Calculate a factorial.
@@ -25,6 +35,8 @@ def factorial(x, start=1):
         60
 
     '''
+    if 1 <= start <= x <= tables.max_n_in_tables:
+        return tables.get_factorial(x) // tables.get_factorial(start - 1)
     from python_toolbox import misc_tools
     return misc_tools.general_product(range(start, x+1), start=1)
 
@@ -82,7 +94,7 @@ def from_factoradic(factoradic_number):
     number = 0
     for i, value in enumerate(reversed(factoradic_number)):
         assert 0 <= value <= i
-        number += value * math.factorial(i)
+        number += value * _get_factorial(i)
     return number
         
 
@@ -112,7 +124,7 @@ def to_factoradic(number, n_digits_pad=0):
     digits = [None] * n_digits
     current_number = number
     for i in range(n_digits)[::-1]:
-        unit = math.factorial(i)
+        unit = _get_factorial(i)
         digits[n_digits - i - 1], current_number = divmod(current_number, unit)
     result = tuple(digits)
     if (len(result) < n_digits_pad):
@@ -7,6 +7,8 @@ import random
 
 import python_toolbox.cute_enum
 
+from . import tables
+
 
 infinity = float('inf')
 infinities = (infinity, -infinity)
@@ -127,11 +129,18 @@ def binomial(big, small):
     
     This is used in combinatorical calculations. More information:
     http://en.wikipedia.org/wiki/Binomial_coefficient
+    
+    If row `big` of Pascal's triangle is already in the table in
+    `math_tools.tables`, the coefficient is taken from there. Otherwise it's
+    calculated directly. (Use `get_binomial_row` to put a row in the table.)
     '''
     if big == small:
         return 1
     if big < small:
         return 0
+    binomial_row = tables._binomial_table.get_cached_row(big)
+    if binomial_row is not None and small >= 0:
+        return binomial_row[small]
     else:
         return (math.factorial(big) // math.factorial(big - small)
                                                       // math.factorial(small))
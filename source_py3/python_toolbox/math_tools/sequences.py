@@ -5,17 +5,25 @@ import numbers
 import collections
 import itertools
 
+from . import tables
+
 infinity = float('inf')
 
 
-_stirling_caches = []
-_n_highest_cache_completed = -1
 def stirling(n, k, skip_calculation=False):
     '''
-    Calculate Stirling number of the second kind of `n` and `k`.
+    Calculate Stirling number of the first kind of `n` and `k`.
     
     More information about these numbers:
-    https://en.wikipedia.org/wiki/Stirling_numbers_of_the_second_kind
+    https://en.wikipedia.org/wiki/Stirling_numbers_of_the_first_kind
+    
+    If the row of `n` is already in the table in `math_tools.tables`, the
+    number is taken from there. Otherwise it's calculated directly, which is
+    quick for small `k`. Use `get_stirling_row` to get all the numbers for one
+    `n`, which also puts them in the table.
+    
+    If `skip_calculation=True` is given, the number is only taken from the
+    table, and `LookupError` is raised if its row isn't there.
     
     Example:
     
@@ -23,43 +31,16 @@ def stirling(n, k, skip_calculation=False):
         -3
     
     '''
-    global _n_highest_cache_completed
     if k not in range(n + 1):
         return 0
-    if n == k == 0:
-        return 1
-    if not skip_calculation:
-        for current_n in range(_n_highest_cache_completed + 1, n+1):
-            try:
-                cache = _stirling_caches[current_n]
-            except IndexError:
-                cache = []
-                _stirling_caches.append(cache)
-            calculate_up_to = min(k, current_n)
-            current_index = len(cache)
-            while current_index < calculate_up_to + 1:
-                if current_index == 0:
-                    cache.append(0)
-                elif current_index == current_n:
-                    cache.append(1)
-                else:
-                    cache.append(
-                        - (current_n - 1) * stirling(current_n - 1,
-                                                     current_index,
-                                                     skip_calculation=True) +
-                        stirling(current_n - 1, current_index - 1,
-                                 skip_calculation=True)
-                    )
-                
-                current_index += 1
-            if calculate_up_to == current_n:
-                _n_highest_cache_completed = max(
-                    _n_highest_cache_completed,
-                    current_n
-                )
-                
-                
-    return _stirling_caches[n][k]
+    row = tables._stirling_table.get_cached_row(n)
+    if row is not None:
+        return row[k]
+    elif skip_calculation:
+        raise LookupError('Row %s of the Stirling numbers of the first kind '
+                          "isn't in the table." % n)
+    else:
+        return tables._calculate_stirling(n, k, signed=True)
 
 
 def abs_stirling(n, k):
@@ -75,5 +56,10 @@ def abs_stirling(n, k):
         3
     
     '''
-    return abs(stirling(n, k))
+    if k not in range(n + 1):
+        return 0
+    row = tables._abs_stirling_table.get_cached_row(n)
+    if row is not None:
+        return row[k]
+    return tables._calculate_stirling(n, k, signed=False)
     
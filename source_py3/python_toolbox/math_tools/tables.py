@@ -0,0 +1,248 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+Tables of combinatorial numbers, computed a row at a time and cached.
+
+Every row is a tuple, so a repeated query of a number is a tuple lookup. The
+rows are kept in a bounded, thread-safe least-recently-used cache. A missing
+row is computed from the closest lower row that's still cached.
+'''
+
+import collections
+import functools
+import threading
+
+
+class RowTable:
+    '''
+    A cached table of rows, where each row is computed from the previous one.
+
+    `get_first_row` is a function that returns row number zero, and
+    `get_next_row` is a function that takes a row number `n` and row number
+    `n - 1` and returns row number `n`. At most `max_size` rows are kept in
+    the cache; when it's full, the least recently used rows are thrown away.
+
+    When a row is computed, the rows before it that are multiples of
+    `checkpoint_interval` are cached as checkpoints, and the rows between them
+    aren't. This way the rows below a row that was thrown away are usually
+    only a few rows away, without filling the cache with all of them.
+    Checkpoints are thrown away like any other row.
+    '''
+    def __init__(self, get_first_row, get_next_row, max_size=200,
+                 checkpoint_interval=32):
+        assert max_size >= 1
+        assert checkpoint_interval >= 1
+        self.get_first_row = get_first_row
+        self.get_next_row = get_next_row
+        self.max_size = max_size
+        self.checkpoint_interval = checkpoint_interval
+        self._rows = collections.OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get_cached_row(self, n):
+        '''
+        Get row number `n` of the table if it's cached, otherwise `None`.
+        
+        This never computes any rows, so it's always quick.
+        '''
+        try:
+            row = self._rows[n]
+        except KeyError:
+            return None
+        else:
+            # This is enough for a least-recently-used order. If another
+            # thread changed the cache in the meantime, the worst that could
+            # happen is a `KeyError` that we ignore, and then the row might
+            # be thrown away a bit too early.
+            try:
+                self._rows.move_to_end(n)
+            except KeyError:
+                pass
+            return row
+    
+    def get_row(self, n):
+        '''Get row number `n` of the table as a tuple.'''
+        row = self.get_cached_row(n)
+        if row is not None:
+            return row
+
+        with self._lock:
+            for current_n in range(n, -1, -1):
+                row = self._rows.get(current_n)
+                if row is not None:
+                    break
+            else:
+                current_n, row = 0, tuple(self.get_first_row())
+                self._store_row(0, row)
+            while current_n < n:
+                current_n += 1
+                row = tuple(self.get_next_row(current_n, row))
+                if current_n == n or \
+                                  current_n % self.checkpoint_interval == 0:
+                    self._store_row(current_n, row)
+            return row
+    
+    def _store_row(self, n, row):
+        self._rows[n] = row
+        self._rows.move_to_end(n)
+        while len(self._rows) > self.max_size:
+            self._rows.popitem(last=False)
+    
+    def clear(self):
+        '''Throw away all the cached rows.'''
+        with self._lock:
+            self._rows.clear()
+    
+    def __repr__(self):
+        return '<%s: %s/%s rows cached>' % (
+            type(self).__name__, len(self._rows), self.max_size
+        )
+
+
+def _get_next_stirling_row(n, previous_row):
+    # s(n, k) = s(n - 1, k - 1) - (n - 1) * s(n - 1, k)
+    previous_row = previous_row + (0,)
+    return (0,) + tuple(
+        previous_row[k - 1] - (n - 1) * previous_row[k]
+        for k in range(1, n + 1)
+    )
+
+_stirling_table = RowTable(lambda: (1,), _get_next_stirling_row)
+
+def _get_next_abs_stirling_row(n, previous_row):
+    # |s(n, k)| = |s(n - 1, k - 1)| + (n - 1) * |s(n - 1, k)|
+    previous_row = previous_row + (0,)
+    return (0,) + tuple(
+        previous_row[k - 1] + (n - 1) * previous_row[k]
+        for k in range(1, n + 1)
+    )
+
+_abs_stirling_table = RowTable(lambda: (1,), _get_next_abs_stirling_row)
+
+def get_stirling_row(n):
+    '''
+    Get the Stirling numbers of the first kind of `n`, for every `k`.
+
+    The result is a tuple of length `n + 1` where item `k` is equal to
+    `stirling(n, k)`.
+
+    Example:
+
+        >>> get_stirling_row(4)
+        (0, -6, 11, -6, 1)
+
+    '''
+    return _stirling_table.get_row(n)
+
+def get_abs_stirling_row(n):
+    '''
+    Get the unsigned Stirling numbers of the first kind of `n`, for every `k`.
+
+    The result is a tuple of length `n + 1` where item `k` is equal to
+    `abs_stirling(n, k)`.
+
+    Example:
+
+        >>> get_abs_stirling_row(4)
+        (0, 6, 11, 6, 1)
+
+    '''
+    return _abs_stirling_table.get_row(n)
+
+@functools.lru_cache(maxsize=1024)
+def _calculate_stirling(n, k, signed):
+    '''
+    Calculate one Stirling number of the first kind without the tables.
+    
+    Only the first `k + 1` numbers of each row are needed for it, so this
+    takes `O(n * k)` steps, which is much quicker than computing whole rows
+    when `k` is small.
+    '''
+    sign = -1 if signed else 1
+    partial_row = [1] + [0] * k
+    for current_n in range(1, n + 1):
+        factor = sign * (current_n - 1)
+        partial_row = [0] + [
+            partial_row[i - 1] + factor * partial_row[i]
+            for i in range(1, k + 1)
+        ]
+    return partial_row[k]
+
+
+def _get_next_binomial_row(n, previous_row):
+    return (1,) + tuple(previous_row[k - 1] + previous_row[k]
+                        for k in range(1, n)) + (1,)
+
+_binomial_table = RowTable(lambda: (1,), _get_next_binomial_row)
+
+def get_binomial_row(n):
+    '''
+    Get the binomial coefficients of `n`, i.e. row `n` of Pascal's triangle.
+
+    The result is a tuple of length `n + 1` where item `k` is equal to
+    `binomial(n, k)`.
+
+    Example:
+
+        >>> get_binomial_row(4)
+        (1, 4, 6, 4, 1)
+
+    '''
+    return _binomial_table.get_row(n)
+
+
+# Numbers bigger than this are too big to keep a table of factorials for, so
+# functions like `factorial` compute them directly instead:
+max_n_in_tables = 1000
+
+_factorials = [1]
+_factorials_lock = threading.Lock()
+
+def get_factorial(n):
+    '''
+    Get the factorial of `n` from a table of factorials.
+
+    The table is extended up to `n` if needed, so this should only be used
+    for `n` that's not bigger than `max_n_in_tables`.
+
+    Example:
+
+        >>> get_factorial(5)
+        120
+
+    '''
+    assert n >= 0
+    try:
+        return _factorials[n]
+    except IndexError:
+        with _factorials_lock:
+            for i in range(len(_factorials), n + 1):
+                _factorials.append(_factorials[-1] * i)
+        return _factorials[n]
+
+def get_factorials(n):
+    '''
+    Get the factorials of all the numbers from zero to `n`.
+
+    The result is a tuple of length `n + 1` where item `i` is equal to the
+    factorial of `i`.
+
+    Example:
+
+        >>> get_factorials(5)
+        (1, 1, 2, 6, 24, 120)
+
+    '''
+    get_factorial(n)
+    return tuple(_factorials[:n + 1])
+
+
+def clear_tables():
+    '''Throw away all the cached rows of the tables in this module.'''
+    _stirling_table.clear()
+    _abs_stirling_table.clear()
+    _binomial_table.clear()
+    _calculate_stirling.cache_clear()
+    with _factorials_lock:
+        del _factorials[1:]
@@ -4,13 +4,17 @@
 '''Defines various data types, similarly to the stdlib's `collections`.'''
 
 from .ordered_dict import OrderedDict
-from .various_ordered_sets import OrderedSet, FrozenOrderedSet, EmittingOrderedSet
+from .various_ordered_sets import (OrderedSet, FrozenOrderedSet,
+                                   EmittingOrderedSet, CompactOrderedSet,
+                                   FrozenCompactOrderedSet)
 from .weak_key_default_dict import WeakKeyDefaultDict
 from .weak_key_identity_dict import WeakKeyIdentityDict
 from .lazy_tuple import LazyTuple
 from .various_frozen_dicts import FrozenDict, FrozenOrderedDict
-from .bagging import Bag, OrderedBag, FrozenBag, FrozenOrderedBag
+from .bagging import (Bag, OrderedBag, FrozenBag, FrozenOrderedBag,
+                      SpaceSavingBag, CountMinBag)
 from .frozen_bag_bag import FrozenBagBag
+from .dense_bag import DenseBag
 from ..cute_enum import CuteEnum
 
 from .emitting_weak_key_default_dict import EmittingWeakKeyDefaultDict
@@ -8,6 +8,11 @@ import numbers
 import collections
 import functools
 import copy
+import array
+import pickle
+import struct
+import sys
+import os
 
 from python_toolbox import misc_tools
 from python_toolbox import math_tools
@@ -61,6 +66,125 @@ def _process_count(count):
     return int(count)
     
     
+### Defining the wire format of bags: #######################################
+#                                                                            #
+# A bag is packed into `bytes` as a header, followed by its keys, followed by
+# its counts. If all the keys are `int`s that fit in 64 bits, they're packed
+# into an `array` of the smallest signed type that fits them, otherwise
+# they're pickled as a `tuple`. The counts are packed into an `array` of the
+# smallest unsigned type that fits them, unless they're too big for 64 bits
+# and have to be pickled too. Arrays are little-endian.
+
+_wire_header = struct.Struct('<4sccQ')
+'''Magic, type code of the keys, type code of the counts, size of the keys.'''
+
+_wire_magic = b'BAG1'
+
+_pickled_typecode = 'p'
+
+
+def _pack_array(typecode, items):
+    '''Pack `items` into little-endian `bytes` of an `array`.'''
+    packed_array = array.array(typecode, items)
+    if sys.byteorder == 'big':
+        packed_array.byteswap()
+    return packed_array.tobytes()
+
+
+def _unpack_array(typecode, data):
+    '''Unpack little-endian `bytes` made by `_pack_array` into an `array`.'''
+    packed_array = array.array(typecode)
+    packed_array.frombytes(data)
+    if sys.byteorder == 'big':
+        packed_array.byteswap()
+    return packed_array
+
+
+def _pack_items(items, low, high, typecodes):
+    '''
+    Pack `items` into the first of `typecodes` that fits `low` and `high`.
+
+    Returns the type code and the `bytes`. If none of the type codes fit,
+    `items` are pickled.
+    '''
+    for typecode in typecodes:
+        n_bits = 8 * array.array(typecode).itemsize
+        min_item = -2 ** (n_bits - 1) if typecode.islower() else 0
+        if min_item <= low and high < min_item + 2 ** n_bits:
+            return (typecode, _pack_array(typecode, items))
+    return (_pickled_typecode,
+            pickle.dumps(tuple(items), protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _pack_bag(bag_dict):
+    '''Pack the keys and counts of a bag's `dict` into `bytes`.'''
+    keys = bag_dict.keys()
+    if set(map(type, keys)) == {int}:
+        keys_typecode, packed_keys = _pack_items(keys, min(keys), max(keys),
+                                                 'bhiq')
+    else:
+        keys_typecode, packed_keys = _pack_items(keys, 0, 0, '')
+    counts = bag_dict.values()
+    counts_typecode, packed_counts = _pack_items(
+        counts, 0, max(counts, default=0), 'BHIQ'
+    )
+    return b''.join((
+        _wire_header.pack(_wire_magic, keys_typecode.encode(),
+                          counts_typecode.encode(), len(packed_keys)),
+        packed_keys,
+        packed_counts
+    ))
+
+
+def _unpack_items(typecode, data):
+    '''Unpack items packed by `_pack_items`.'''
+    if typecode == _pickled_typecode:
+        return pickle.loads(data)
+    return _unpack_array(typecode, data)
+
+
+def _unpack_bag(data):
+    '''Unpack `bytes` made by `_pack_bag` to an iterator of `(key, count)`.'''
+    data = memoryview(data)
+    magic, keys_typecode, counts_typecode, keys_size = \
+                                               _wire_header.unpack_from(data)
+    if magic != _wire_magic:
+        raise ValueError("This data isn't a packed bag.")
+    keys_start = _wire_header.size
+    counts_start = keys_start + keys_size
+    keys = _unpack_items(keys_typecode.decode(),
+                         data[keys_start:counts_start])
+    counts = _unpack_items(counts_typecode.decode(), data[counts_start:])
+    if len(keys) != len(counts):
+        raise ValueError("This packed bag is corrupt.")
+    return zip(keys, counts)
+
+#                                                                            #
+### Finished defining the wire format of bags. ###############################
+
+
+_mask = 2 ** 64 - 1
+
+
+def _hash_item(key, count):
+    '''Hash an item of a bag for its running hash. A count of 0 adds 0.'''
+    return hash((key, count)) if count else 0
+
+
+def _count_shard(bag_type, elements, function):
+    '''Count `elements` into a packed bag. Used in worker processes.'''
+    if function is not None:
+        elements = map(function, elements)
+    return bag_type(elements).to_bytes()
+
+
+def _merge_shards(bag_type, data, other_data):
+    '''Merge two packed bags into one. Used in worker processes.'''
+    bag = bag_type.from_bytes(data)
+    bag += bag_type.from_bytes(other_data)
+    return bag.to_bytes()
+
+
 class _BootstrappedCachedProperty(misc_tools.OwnNameDiscoveringDescriptor):
     '''
     A property that is calculated only once for an object, and then cached.
@@ -193,12 +317,35 @@ class _BaseBagMixin:
     
     def __contains__(self, item):
         return (self[item] >= 1)
-    
-    n_elements = property(
-        lambda self: sum(self.values()), 
-        doc='''Number of total elements in the bag.'''
-    )
-    
+
+    ### Defining running totals: ##############################################
+    #                                                                         #
+    # The number of elements, the running hash of the items and the
+    # `FrozenBagBag` of a frozen bag are calculated the first time they're
+    # needed. Mutable bags calculate the first two when they're created, and
+    # keep them up to date on every change of a count (see
+    # `_MutableBagMixin._note_count_change`,) so they cost O(1), and they
+    # throw away the `FrozenBagBag`. The running hash is the sum of the hashes
+    # of the `(key, count)` items, so it doesn't depend on order.
+
+    _n_elements = None
+    _items_hash = None
+    _frozen_bag_bag = None
+    _running_total_names = ('_n_elements', '_items_hash', '_frozen_bag_bag')
+
+    @property
+    def n_elements(self):
+        '''Number of total elements in the bag.'''
+        if self._n_elements is None:
+            self._n_elements = sum(self._dict.values())
+        return self._n_elements
+
+    def _get_items_hash(self):
+        '''Get the running hash of the items of this bag.'''
+        if self._items_hash is None:
+            self._items_hash = sum(map(hash, self._dict.items())) & _mask
+        return self._items_hash
+
     @property
     def frozen_bag_bag(self):
         '''
@@ -216,8 +363,45 @@ class _BaseBagMixin:
             FrozenBagBag({1: 2, 2: 2, 5: 1})
         
         '''
-        from .frozen_bag_bag import FrozenBagBag
-        return FrozenBagBag(self.values())
+        if self._frozen_bag_bag is None:
+            from .frozen_bag_bag import FrozenBagBag
+            self._frozen_bag_bag = FrozenBagBag(self._dict.values())
+        return self._frozen_bag_bag
+
+    def _may_be_equal(self, other):
+        '''
+        Check quickly whether this bag may be equal to the bag `other`.
+
+        This compares the lengths of the bags, and their numbers of elements
+        and running hashes if both bags already have them.
+        '''
+        if len(self._dict) != len(other._dict):
+            return False
+        for name in ('_n_elements', '_items_hash'):
+            value, other_value = getattr(self, name), getattr(other, name)
+            if value is not None and other_value is not None and \
+                                                         value != other_value:
+                return False
+        return True
+
+    def __eq__(self, other):
+        if not isinstance(other, _BaseBagMixin):
+            return collections.Mapping.__eq__(self, other)
+        return self._may_be_equal(other) and \
+                                           dict.__eq__(self._dict, other._dict)
+
+    __hash__ = None # Overridden by frozen bags; setting `__eq__` resets it.
+
+    def __getstate__(self):
+        # The running totals aren't pickled: The running hash depends on the
+        # hashes of the keys, which may be different in another process.
+        state = self.__dict__.copy()
+        for name in self._running_total_names:
+            state.pop(name, None)
+        return state
+
+    #                                                                         #
+    ### Finished defining running totals. #####################################
 
     def __or__(self, other):
         '''
@@ -437,14 +621,10 @@ class _BaseBagMixin:
         '''
         if not isinstance(other, _BaseBagMixin):
             return NotImplemented
-        found_strict_difference = False # Until challenged.
-        all_elements = set(other) | set(self)
-        for element in all_elements:
-            if self[element] > other[element]:
-                return False
-            elif self[element] < other[element]:
-                found_strict_difference = True
-        return found_strict_difference
+        # A strictly smaller bag is a smaller-or-equal bag with fewer
+        # elements:
+        return self.n_elements < other.n_elements and \
+                                              _BaseBagMixin.__le__(self, other)
     
     def __gt__(self, other):
         '''
@@ -458,14 +638,9 @@ class _BaseBagMixin:
         '''        
         if not isinstance(other, _BaseBagMixin):
             return NotImplemented
-        found_strict_difference = False # Until challenged.
-        all_elements = set(other) | set(self)
-        for element in all_elements:
-            if self[element] < other[element]:
-                return False
-            elif self[element] > other[element]:
-                found_strict_difference = True
-        return found_strict_difference
+        # A strictly bigger bag is a bigger-or-equal bag with more elements:
+        return self.n_elements > other.n_elements and \
+                                              _BaseBagMixin.__ge__(self, other)
   
     def __le__(self, other):
         '''
@@ -478,6 +653,8 @@ class _BaseBagMixin:
         '''
         if not isinstance(other, _BaseBagMixin):
             return NotImplemented
+        if len(self._dict) > len(other._dict):
+            return False
         for element, count in self.items():
             if count > other[element]:
                 return False
@@ -494,9 +671,10 @@ class _BaseBagMixin:
         '''        
         if not isinstance(other, _BaseBagMixin):
             return NotImplemented
-        all_elements = set(other) | set(self)
-        for element in all_elements:
-            if self[element] < other[element]:
+        if len(self._dict) < len(other._dict):
+            return False
+        for element, other_count in other.items():
+            if self[element] < other_count:
                 return False
         return True
     #                                                                         #
@@ -517,6 +695,122 @@ class _BaseBagMixin:
     def __reversed__(self):
         # Gets overridden in `_OrderedBagMixin`.
         raise TypeError("Can't reverse an unordered bag.")
+
+    @classmethod
+    def _from_valid_items(cls, items):
+        '''
+        Create a bag from `(key, count)` pairs without checking the counts.
+
+        Use this only when the counts are already known to be positive
+        `int`s, e.g. when they come from another bag.
+        '''
+        bag = cls()
+        bag._dict.update(items)
+        return bag
+
+    def to_bytes(self):
+        '''
+        Pack this bag into compact `bytes`, which `from_bytes` can unpack.
+
+        The keys are packed into an array if they're all 64-bit `int`s, and
+        pickled otherwise. The counts are packed into an array of the smallest
+        integer type that fits them. This is meant for sending bags between
+        processes, like in `from_iterable_parallel`.
+
+        Since `from_bytes` unpickles keys that aren't `int`s, only unpack
+        bytes you packed yourself or got from a source you trust.
+        '''
+        return _pack_bag(self._dict)
+
+    @classmethod
+    def from_bytes(cls, data):
+        '''
+        Unpack a bag from `bytes` made by `to_bytes`.
+
+        Warning: Keys that aren't `int`s are unpickled, and unpickling can run
+        arbitrary code, so never unpack data that you got from an untrusted
+        source.
+        '''
+        return cls._from_valid_items(_unpack_bag(data))
+
+    @classmethod
+    def from_iterable_parallel(cls, iterable, executor=None,
+                               chunk_size=2 ** 18, function=None):
+        '''
+        Count the elements of `iterable` in parallel, in worker processes.
+
+        `iterable` is cut into chunks of `chunk_size` elements, each of which
+        is counted into a shard in a worker process. Shards are merged in
+        pairs in the worker processes as they're counted, and the merged
+        shards are merged again, until only one is left. Only about twice as
+        many chunks as the executor has workers are read ahead of the
+        counting, so `iterable` may be much bigger than memory. Shards are
+        sent between processes in the compact format of `to_bytes`. For an
+        ordered bag, adjacent shards are merged, so the keys keep the order in
+        which they first appear in `iterable`.
+
+        If `function` is given, `function(element)` is counted instead of each
+        element, and it's called in the worker processes. This is where
+        counting in parallel pays off; if you just count elements that are
+        already in memory, sending them to the worker processes takes about as
+        long as counting them. `function` must be picklable.
+
+        `executor` is a `future_tools.CuteProcessPoolExecutor` or any other
+        `concurrent.futures.Executor`; if you don't give one, a
+        `CuteProcessPoolExecutor` is created for the job and then shut down.
+        '''
+        if executor is None:
+            from python_toolbox import future_tools
+            with future_tools.CuteProcessPoolExecutor() as executor:
+                return cls.from_iterable_parallel(
+                    iterable, executor=executor, chunk_size=chunk_size,
+                    function=function
+                )
+        shard_type = getattr(cls, '_mutable_type', cls)
+        max_in_flight = 2 * (getattr(executor, '_max_workers', None) or
+                             os.cpu_count() or 1)
+        iterator = iter(iterable)
+        # Counting futures in the order of their chunks. We wait for the
+        # oldest one before reading another chunk, so we never hold more than
+        # `max_in_flight` chunks in memory:
+        in_flight = collections.deque()
+        # Shards that are counted, or being merged, as `(level, future)` in
+        # the order of their chunks, where a shard of level `n` has `2 ** n`
+        # chunks. Like carrying in a binary counter, shards of equal level are
+        # merged as soon as they're adjacent, so at most one shard per level
+        # is kept:
+        stack = []
+        
+        def push_shard(future):
+            future.result() # Waiting, so we don't read too far ahead.
+            level = 0
+            while stack and stack[-1][0] == level:
+                _, previous_future = stack.pop()
+                future = executor.submit(_merge_shards, shard_type,
+                                         previous_future.result(),
+                                         future.result())
+                level += 1
+            stack.append((level, future))
+        
+        while True:
+            chunk = list(itertools.islice(iterator, chunk_size))
+            if not chunk:
+                break
+            if len(in_flight) >= max_in_flight:
+                push_shard(in_flight.popleft())
+            in_flight.append(executor.submit(_count_shard, shard_type, chunk,
+                                             function))
+        while in_flight:
+            push_shard(in_flight.popleft())
+        if not stack:
+            return cls()
+        _, future = stack.pop()
+        while stack:
+            _, previous_future = stack.pop()
+            future = executor.submit(_merge_shards, shard_type,
+                                     previous_future.result(),
+                                     future.result())
+        return cls.from_bytes(future.result())
     
 
     def get_contained_bags(self):
@@ -539,12 +833,50 @@ class _BaseBagMixin:
     
 class _MutableBagMixin(_BaseBagMixin):
     '''Mixin for a bag that's mutable. (i.e. not frozen.)'''
+
+    def __init__(self, iterable={}):
+        super().__init__(iterable)
+        self._calculate_running_totals()
+
+    @classmethod
+    def _from_valid_items(cls, items):
+        bag = super()._from_valid_items(items)
+        bag._calculate_running_totals()
+        return bag
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._calculate_running_totals()
+
+    def _calculate_running_totals(self):
+        '''
+        Calculate the running totals of this bag from scratch.
+        
+        This is done when the bag is created, and from then on they're kept
+        up to date by `_note_count_change`.
+        '''
+        self._n_elements = sum(self._dict.values())
+        self._items_hash = sum(map(hash, self._dict.items())) & _mask
+        self._frozen_bag_bag = None
+
+    def _note_count_change(self, key, old_count, new_count):
+        '''Update the running totals after the count of `key` changed.'''
+        if self._n_elements is not None:
+            self._n_elements += new_count - old_count
+        if self._items_hash is not None:
+            self._items_hash = (self._items_hash - _hash_item(key, old_count) +
+                                _hash_item(key, new_count)) & _mask
+        self._frozen_bag_bag = None
     
     def __setitem__(self, i, count):
         try:
-            super().__setitem__(i, _process_count(count))
+            count = _process_count(count)
         except _ZeroCountAttempted:
             del self[i]
+        else:
+            old_count = self._dict.get(i, 0)
+            super().__setitem__(i, count)
+            self._note_count_change(i, old_count, count)
     
     
     def setdefault(self, key, default=None):
@@ -564,10 +896,9 @@ class _MutableBagMixin(_BaseBagMixin):
         # elements even though they seem to exist from the outside, so we're
         # avoiding raising exceptions where someone would try to explicitly
         # delete them.
-        try:
-            del self._dict[key]
-        except KeyError:
-            pass
+        old_count = self._dict.pop(key, 0)
+        if old_count:
+            self._note_count_change(key, old_count, 0)
         
     def pop(self, key, default=_NO_DEFAULT):
         '''
@@ -639,8 +970,24 @@ class _MutableBagMixin(_BaseBagMixin):
         '''        
         if not isinstance(other, _BaseBagMixin):
             return NotImplemented
-        for key, other_count in tuple(other.items()):
-            self[key] += other_count
+        # The counts of `other` are already positive `int`s, so we can add
+        # them to our `dict` directly:
+        my_dict = self._dict
+        get_count = my_dict.get
+        if self._n_elements is not None:
+            self._n_elements += other.n_elements
+        if self._items_hash is None:
+            for key, other_count in tuple(other._dict.items()):
+                my_dict[key] = get_count(key, 0) + other_count
+        else:
+            items_hash = self._items_hash
+            for key, other_count in tuple(other._dict.items()):
+                old_count = get_count(key, 0)
+                my_dict[key] = count = old_count + other_count
+                items_hash += _hash_item(key, count) - \
+                                                    _hash_item(key, old_count)
+            self._items_hash = items_hash & _mask
+        self._frozen_bag_bag = None
         return self
             
 
@@ -735,11 +1082,27 @@ class _MutableBagMixin(_BaseBagMixin):
         '''
         Pop an item from this bag, returning `(key, count)` and removing it.
         '''
-        return self._dict.popitem()
+        key, count = self._dict.popitem()
+        self._note_count_change(key, count, 0)
+        return (key, count)
+
+    def clear(self):
+        '''Remove all items from this bag.'''
+        self._dict.clear()
+        self._n_elements = self._items_hash = 0
+        self._frozen_bag_bag = None
     
     def get_frozen(self):
-        '''Get a frozen version of this bag.'''
-        return self._frozen_type(self)
+        '''
+        Get a frozen version of this bag.
+
+        The frozen bag gets the running totals of this bag, which are always
+        up to date, so hashing it takes O(1) time.
+        '''
+        frozen_bag = self._frozen_type._from_valid_items(self._dict.items())
+        frozen_bag._n_elements = self._n_elements
+        frozen_bag._items_hash = self._items_hash
+        return frozen_bag
      
 
 class _OrderedBagMixin(Ordered):
@@ -759,7 +1122,7 @@ class _OrderedBagMixin(Ordered):
         Order *does* count, so if `other` has a different order, the result
         will be `False`.
         '''
-        if type(self) != type(other):
+        if type(self) != type(other) or not self._may_be_equal(other):
             return False
         for item, other_item in itertools.zip_longest(self.items(),
                                                       other.items()):
@@ -777,33 +1140,11 @@ class _OrderedBagMixin(Ordered):
 class _FrozenBagMixin:
     '''Mixin for a bag that's frozen. (i.e. can't be changed, is hashable.)'''
     
-    # Some properties are redefined here to be cached, since the bag is frozen
-    # and they can't change anyway, so why not cache them.
+    # `n_elements` and `frozen_bag_bag` are cached in `_BaseBagMixin`, and
+    # since the bag is frozen, they're never thrown away.
     
-    n_elements = _BootstrappedCachedProperty(
-        lambda self: sum(self.values()),
-        doc='''Number of total elements in the bag.'''
-    )
-    
-    @_BootstrappedCachedProperty
-    def frozen_bag_bag(self):
-        '''
-        A `FrozenBagBag` of this bag.
-        
-        This means, a bag where `3: 4` means "The original bag has 4 different
-        keys with a value of 3."
-
-        Example:
-        
-            >>> bag = Bag('abracadabra')
-            >>> bag
-            Bag({'b': 2, 'r': 2, 'a': 5, 'd': 1, 'c': 1})
-            >>> bag.frozen_bag_bag
-            FrozenBagBag({1: 2, 2: 2, 5: 1})
-        
-        '''
-        from .frozen_bag_bag import FrozenBagBag
-        return FrozenBagBag(self.values())
+    def __hash__(self):
+        return hash((type(self), self._get_items_hash()))
         
     def get_mutable(self):
         '''Get a mutable version of this bag.'''
@@ -954,7 +1295,9 @@ class OrderedBag(_OrderedBagMixin, _MutableBagMixin, _OrderedDictDelegator):
         By default, the item will be popped from the end. Pass `last=False` to
         pop from the start.
         '''        
-        return self._dict.popitem(last=last)
+        key, count = self._dict.popitem(last=last)
+        self._note_count_change(key, count, 0)
+        return (key, count)
     move_to_end = misc_tools.ProxyProperty(
         '._dict.move_to_end',
         doc='Move a key to the end (or start by passing `last=False`.)'
@@ -991,8 +1334,7 @@ class FrozenBag(_BaseBagMixin, _FrozenBagMixin, FrozenDict):
     Also, unlike `collections.Counter`, it's immutable, therefore it's also
     hashable, and thus it can be used as a key in dicts and sets.
     '''
-    def __hash__(self):
-        return hash((type(self), frozenset(self.items())))
+    __hash__ = _FrozenBagMixin.__hash__
       
                 
 class FrozenOrderedBag(_OrderedBagMixin, _FrozenBagMixin, _BaseBagMixin,
@@ -1023,8 +1365,7 @@ class FrozenOrderedBag(_OrderedBagMixin, _FrozenBagMixin, _BaseBagMixin,
        a key in dicts and sets.
        
     '''
-    def __hash__(self):
-        return hash((type(self), tuple(self.items())))
+    __hash__ = _FrozenBagMixin.__hash__
         
     @_BootstrappedCachedProperty
     def reversed(self):
@@ -1037,3 +1378,402 @@ Bag._frozen_type = FrozenBag
 OrderedBag._frozen_type = FrozenOrderedBag
 FrozenBag._mutable_type = Bag
 FrozenOrderedBag._mutable_type = OrderedBag
+
+
+### Defining streaming bags: #################################################
+#                                                                            #
+# These bags count streams that have too many different keys to keep them all
+# in memory, by keeping only approximate counts. They have the `Bag` methods
+# that make sense for approximate counts: `most_common`, `__getitem__`,
+# `n_elements`, `update` and `+` for merging the counts of different streams.
+#
+# Elements are counted in chunks: Each chunk is counted exactly into a small
+# `dict` at C speed, and only then each of its different keys is added to the
+# bag's counters once, with its count in the chunk.
+
+class _BaseStreamingBag(collections.Mapping):
+    '''
+    Base class for `SpaceSavingBag` and `CountMinBag`.
+
+    Subclasses keep the approximate counts of their tracked keys in
+    `self._counts`, with a min-heap `self._heap` of `(count, tie_breaker,
+    key)` entries, one for each tracked key. An entry's count may be lower
+    than the key's count, since we don't update the heap when counts grow;
+    stale entries are fixed when they reach the top of the heap.
+
+    Only the tracked keys are `in` the bag, as they're the keys you get when
+    iterating on it, even if `bag[key]` is positive for other keys.
+    '''
+
+    chunk_size = 2 ** 16
+    '''Number of elements that are counted exactly before being added.'''
+
+    def _init_tracking(self):
+        self._counts = {}
+        self._heap = []
+        self._tie_breakers = itertools.count()
+        self.n_elements = 0
+        '''Number of total elements that were counted, exactly.'''
+
+    def update(self, iterable={}):
+        '''
+        Count the elements of `iterable`, or add the counts of a mapping.
+        '''
+        if isinstance(iterable, collections.Mapping):
+            counted = {}
+            for key, count in iterable.items():
+                try:
+                    counted[key] = _process_count(count)
+                except _ZeroCountAttempted:
+                    continue
+            self._add_counted(counted)
+            return
+        iterator = iter(iterable)
+        while True:
+            counted = {}
+            _count_elements(counted, itertools.islice(iterator,
+                                                      self.chunk_size))
+            if not counted:
+                return
+            self._add_counted(counted)
+
+    def add(self, key, count=1):
+        '''Count `key`, `count` times.'''
+        self.update({key: count})
+
+    def _push(self, key, count):
+        heapq.heappush(self._heap, (count, next(self._tie_breakers), key))
+
+    def _fix_heap_top(self):
+        '''Fix stale entries at the top of the heap, and return the top one.'''
+        heap, counts = self._heap, self._counts
+        while True:
+            entry = heap[0]
+            count = counts[entry[2]]
+            if entry[0] == count:
+                return entry
+            heapq.heapreplace(heap, (count, next(self._tie_breakers),
+                                     entry[2]))
+
+    @property
+    def _smallest_count(self):
+        '''The smallest count of a tracked key, or 0 if there's room left.'''
+        if len(self._counts) < self._max_n_tracked:
+            return 0
+        return self._fix_heap_top()[0]
+
+    def _replace_smallest(self, key, count):
+        '''
+        Track `key` instead of the key with the smallest count, returning it.
+
+        Call `_fix_heap_top` before this, so the top of the heap is the key
+        with the smallest count.
+        '''
+        evicted_key = heapq.heapreplace(
+            self._heap, (count, next(self._tie_breakers), key)
+        )[2]
+        del self._counts[evicted_key]
+        self._counts[key] = count
+        return evicted_key
+
+    def _set_tracked(self, counts):
+        '''Track the keys in `counts` with their counts, replacing others.'''
+        self._counts = counts
+        self._heap = [(count, tie_breaker, key) for tie_breaker, (key, count)
+                      in zip(self._tie_breakers, counts.items())]
+        heapq.heapify(self._heap)
+
+    __getitem__ = lambda self, key: self._counts.get(key, 0)
+    __iter__ = lambda self: iter(self._counts)
+    __len__ = lambda self: len(self._counts)
+
+    __contains__ = lambda self, key: key in self._counts
+
+    def most_common(self, n=None):
+        '''
+        List the `n` most common tracked elements and their counts, sorted.
+
+        Results are sorted from the most common to the least. If `n is None`,
+        then list all the tracked elements.
+        '''
+        if n is None:
+            return tuple(sorted(self._counts.items(),
+                                key=operator.itemgetter(1), reverse=True))
+        return tuple(heapq.nlargest(n, self._counts.items(),
+                                    key=operator.itemgetter(1)))
+
+    def __add__(self, other):
+        '''
+        Make a bag with the counts of both bags.
+
+        `other` may be a bag of the same type and with the same parameters,
+        whose counts are merged with ours, or an exact bag like `Bag`, whose
+        counts are added to ours.
+        '''
+        if isinstance(other, type(self)):
+            return self._merge(other)
+        if not isinstance(other, _BaseBagMixin):
+            return NotImplemented
+        result = self.copy()
+        result.update(other)
+        return result
+
+    def __radd__(self, other):
+        '''
+        Make a bag with the counts of both bags, with `other` on the left.
+
+        `0` counts as an empty bag, so `sum` works on streaming bags.
+        '''
+        if isinstance(other, numbers.Integral) and other == 0:
+            return self.copy()
+        return self.__add__(other)
+
+    def __iadd__(self, other):
+        if isinstance(other, type(self)):
+            self.__dict__.update(self._merge(other).__dict__)
+            return self
+        if not isinstance(other, _BaseBagMixin):
+            return NotImplemented
+        self.update(other)
+        return self
+
+    def __copy__(self):
+        return self.copy()
+
+
+class SpaceSavingBag(_BaseStreamingBag):
+    '''
+    A bag that finds the most common elements in a stream, in bounded memory.
+
+    This keeps counters for at most `max_n_counters` keys, using the
+    Space-Saving algorithm: When a key that has no counter comes along and all
+    counters are taken, it takes over the counter with the smallest count,
+    and adds to it.
+
+        >>> bag = SpaceSavingBag(3, 'abracadabra')
+        >>> bag
+        SpaceSavingBag(3, {'a': 5, 'c': 3, 'd': 3})
+        >>> bag.get_count_bounds('c')
+        (1, 3)
+
+    The count of a key is never lower than its real count, and any key whose
+    real count is higher than `n_elements / max_n_counters` is guaranteed to
+    have a counter. For each key, `get_count_bounds` gives the range its real
+    count is guaranteed to be in. Keys without counters have a count of 0.
+
+    Two `SpaceSavingBag`s can be merged with `+`. The counts of the merged
+    bag are still never lower than the real counts of the combined stream,
+    and `get_count_bounds` still holds, but the counts may be a bit higher
+    than they would have been if the combined stream were counted by one bag.
+    '''
+
+    def __init__(self, max_n_counters, iterable={}):
+        if not math_tools.is_integer(max_n_counters) or max_n_counters < 1:
+            raise TypeError('`max_n_counters` must be a positive integer, '
+                            'but it is %s.' % repr(max_n_counters))
+        self.max_n_counters = self._max_n_tracked = int(max_n_counters)
+        self._init_tracking()
+        self._errors = {}
+        self.update(iterable)
+
+    def _add_counted(self, counted):
+        counts, errors = self._counts, self._errors
+        max_n_counters = self.max_n_counters
+        self.n_elements += sum(counted.values())
+        for key, count in counted.items():
+            if key in counts:
+                counts[key] += count
+            elif len(counts) < max_n_counters:
+                counts[key] = count
+                self._push(key, count)
+            else:
+                smallest_count = self._fix_heap_top()[0]
+                errors.pop(self._replace_smallest(key, smallest_count + count),
+                           None)
+                errors[key] = smallest_count
+
+    def get_count_bounds(self, key):
+        '''
+        Get the lowest and highest count that `key` could really have.
+
+        For a key without a counter, that's 0 and the smallest count of a
+        counter.
+        '''
+        if key in self._counts:
+            count = self._counts[key]
+            return (count - self._errors.get(key, 0), count)
+        return (0, self._smallest_count)
+
+    def _merge(self, other):
+        '''Merge with another `SpaceSavingBag`, keeping the guarantees.'''
+        # A key without a counter in one of the bags may have had a count of
+        # up to that bag's smallest count, so that's what we add for it:
+        smallest_count = self._smallest_count
+        other_smallest_count = other._smallest_count
+        counts, errors = {}, {}
+        for key in self._counts.keys() | other._counts.keys():
+            counts[key] = self._counts.get(key, smallest_count) + \
+                                 other._counts.get(key, other_smallest_count)
+            errors[key] = \
+                (self._errors.get(key, 0) if key in self._counts
+                 else smallest_count) + \
+                (other._errors.get(key, 0) if key in other._counts
+                 else other_smallest_count)
+        max_n_counters = max(self.max_n_counters, other.max_n_counters)
+        result = type(self)(max_n_counters)
+        if len(counts) > max_n_counters:
+            counts = dict(heapq.nlargest(max_n_counters, counts.items(),
+                                         key=operator.itemgetter(1)))
+        result._set_tracked(counts)
+        result._errors = {key: error for key, error in errors.items()
+                          if error and key in counts}
+        result.n_elements = self.n_elements + other.n_elements
+        return result
+
+    def copy(self):
+        '''Get a shallow copy of this bag.'''
+        result = type(self)(self.max_n_counters)
+        result._set_tracked(dict(self._counts))
+        result._errors = dict(self._errors)
+        result.n_elements = self.n_elements
+        return result
+
+    def __repr__(self):
+        return '%s(%s, %s)' % (type(self).__name__, self.max_n_counters,
+                               self._counts)
+
+
+class CountMinBag(_BaseStreamingBag):
+    '''
+    A bag that estimates the count of any key in a stream, in fixed memory.
+
+    This is a Count-Min sketch: A table of `depth` rows of `width` counters.
+    Each key is hashed to one counter in each row, and counting it adds to
+    all of them. The count of a key is the smallest of its counters:
+
+        >>> bag = CountMinBag(1000, 4, 'abracadabra')
+        >>> bag['a'], bag['z']
+        (5, 0)
+
+    The count of a key is never lower than its real count. With a
+    probability of at least `1 - 0.5 ** depth`, it's higher by no more than
+    `2 * n_elements / width`. The table takes `8 * width * depth` bytes.
+
+    A sketch can't list its keys, so this also tracks the `max_n_tracked`
+    keys with the highest counts, for `most_common` and for iterating on the
+    bag. Only these keys are `in` the bag, while `bag[key]` estimates the
+    count of any key.
+
+    Merging two `CountMinBag`s with `+` requires them to have the same
+    `width`, `depth` and `seed`. Keys are hashed with `hash`, so merging bags
+    from different processes requires a fixed `PYTHONHASHSEED` if the keys
+    are strings.
+    '''
+
+    def __init__(self, width, depth, iterable={}, max_n_tracked=100,
+                 seed=0):
+        for name, value in (('width', width), ('depth', depth),
+                            ('max_n_tracked', max_n_tracked)):
+            if not math_tools.is_integer(value) or value < 1:
+                raise TypeError('`%s` must be a positive integer, but it is '
+                                '%s.' % (name, repr(value)))
+        self.width = int(width)
+        self.depth = int(depth)
+        self.max_n_tracked = self._max_n_tracked = int(max_n_tracked)
+        self.seed = seed
+        self.table = array.array('q', bytes(8 * self.width * self.depth))
+        '''`array` of the counters, row after row.'''
+        self._row_offsets = tuple((row, row * self.width)
+                                  for row in range(self.depth))
+        '''`(row, offset)` pairs, `offset` being where the row starts.'''
+        self._init_tracking()
+        self.update(iterable)
+
+    def _get_indices(self, key):
+        '''Get the indices of the counters of `key` in the table.'''
+        # Double hashing: The counter in row `i` is at `a + i * b`, with `a`
+        # and `b` taken from one hash.
+        key_hash = hash((key, self.seed))
+        a, b = key_hash & 0xffffffff, (key_hash >> 32) | 1
+        width = self.width
+        return [offset + (a + row * b) % width
+                for row, offset in self._row_offsets]
+
+    def _add_counted(self, counted):
+        table, counts = self.table, self._counts
+        table_get = table.__getitem__
+        max_n_tracked = self.max_n_tracked
+        get_indices = self._get_indices
+        # The smallest tracked count only grows, so the last one we saw is a
+        # lower bound for it, which we can check new keys against quickly:
+        smallest_count = 0
+        self.n_elements += sum(counted.values())
+        for key, count in counted.items():
+            indices = get_indices(key)
+            for index in indices:
+                table[index] += count
+            estimate = min(map(table_get, indices))
+            if key in counts:
+                counts[key] = estimate
+            elif len(counts) < max_n_tracked:
+                counts[key] = estimate
+                self._push(key, estimate)
+            elif estimate > smallest_count:
+                smallest_count = self._fix_heap_top()[0]
+                if estimate > smallest_count:
+                    self._replace_smallest(key, estimate)
+
+    def __getitem__(self, key):
+        return min(map(self.table.__getitem__, self._get_indices(key)))
+
+    def most_common(self, n=None):
+        '''
+        List the `n` most common tracked elements and their counts, sorted.
+
+        Results are sorted from the most common to the least. If `n is None`,
+        then list all the tracked elements. The counts of the tracked keys are
+        brought up to date from the table first, since other keys may have
+        added to their counters since they were last counted.
+        '''
+        counts = self._counts
+        for key in counts:
+            counts[key] = self[key]
+        return super().most_common(n)
+
+    def _merge(self, other):
+        '''Merge with another `CountMinBag` with the same parameters.'''
+        if (self.width, self.depth, self.seed) != \
+                                        (other.width, other.depth, other.seed):
+            raise ValueError("Can't merge `CountMinBag`s that have different "
+                             "widths, depths or seeds.")
+        result = type(self)(self.width, self.depth,
+                            max_n_tracked=max(self.max_n_tracked,
+                                              other.max_n_tracked),
+                            seed=self.seed)
+        result.table = array.array('q', map(operator.add, self.table,
+                                            other.table))
+        counts = {key: result[key] for key in
+                  self._counts.keys() | other._counts.keys()}
+        if len(counts) > result.max_n_tracked:
+            counts = dict(heapq.nlargest(result.max_n_tracked, counts.items(),
+                                         key=operator.itemgetter(1)))
+        result._set_tracked(counts)
+        result.n_elements = self.n_elements + other.n_elements
+        return result
+
+    def copy(self):
+        '''Get a shallow copy of this bag.'''
+        result = type(self)(self.width, self.depth,
+                            max_n_tracked=self.max_n_tracked, seed=self.seed)
+        result.table = array.array('q', self.table)
+        result._set_tracked(dict(self._counts))
+        result.n_elements = self.n_elements
+        return result
+
+    def __repr__(self):
+        return '<%s: width=%s, depth=%s, n_elements=%s>' % (
+            type(self).__name__, self.width, self.depth, self.n_elements
+        )
+
+#                                                                            #
+### Finished defining streaming bags. ########################################
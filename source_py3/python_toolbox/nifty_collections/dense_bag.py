@@ -0,0 +1,456 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+Defines the `DenseBag` class.
+
+See its documentation for more details.
+'''
+
+import array
+import collections
+import heapq
+import itertools
+import operator
+
+from python_toolbox import math_tools
+
+from .bagging import (Bag, _count_elements, _process_count,
+                      _ZeroCountAttempted)
+
+
+_typecode = 'q'
+'''Type code of the `array` of counts: A signed 64-bit integer.'''
+
+
+def _create_counts(counts):
+    '''Create an `array` of counts from an iterable of them.'''
+    return array.array(_typecode, counts)
+
+
+class DenseBag(collections.MutableMapping):
+    '''
+    A bag that counts items out of a fixed collection of possible keys.
+
+    This is like `Bag`, except that you give it all the keys it could ever
+    have in advance, and it keeps their counts in one `array`, where each key
+    has its own slot:
+
+        >>> bag = DenseBag('abcdr', 'abracadabra')
+        >>> bag['a'], bag['r']
+        (5, 2)
+        >>> bag.counts
+        array('q', [5, 2, 1, 1, 2])
+
+    This is good for big bags of integers or categories: A count takes 8
+    bytes, and arithmetic between bags that have the same keys is done on the
+    `array`s at C speed, rather than key by key. If `possible_keys` is a
+    `range` starting at 0, no mapping of keys to slots is created, so you can
+    have a bag of integers from 0 to 10 ** 8 that takes 800MB. Counts must be
+    smaller than `2 ** 63`.
+
+    To count items that you already have as codes, i.e. as slot numbers in
+    some buffer like an `array`, `bytes` or a NumPy array, use `from_codes`,
+    which doesn't copy the codes. The `counts` array supports the buffer
+    protocol too, so `numpy.frombuffer(bag.counts, dtype=numpy.int64)` gives
+    a NumPy view of it without copying.
+
+    Only the keys with positive counts are seen when iterating on the bag,
+    like in `Bag`. Setting the count of a key that isn't in `possible_keys`
+    raises `KeyError`.
+    '''
+
+    def __init__(self, possible_keys, iterable={}):
+        self._set_possible_keys(possible_keys)
+        self.counts = _create_counts(itertools.repeat(0, self._n_slots))
+        '''`array` of the counts of the possible keys, by slot.'''
+        if isinstance(iterable, collections.Mapping):
+            for key, count in iterable.items():
+                self[key] = count
+        else:
+            counted = {}
+            _count_elements(counted, iterable)
+            self._add_counted(counted, self._get_slot)
+
+
+    def _set_possible_keys(self, possible_keys, slots=None):
+        '''
+        Set the possible keys of this bag, and the `dict` of their slots.
+
+        `slots` is the `dict` mapping each key to its slot, if we already have
+        one from a bag with the same possible keys.
+        '''
+        if isinstance(possible_keys, range) and possible_keys.start == 0 \
+                                                 and possible_keys.step == 1:
+            self.possible_keys = possible_keys
+            self._n_slots = len(possible_keys)
+            slots = None
+        else:
+            self.possible_keys = tuple(possible_keys)
+            self._n_slots = len(self.possible_keys)
+            if slots is None:
+                slots = dict(zip(self.possible_keys, itertools.count()))
+                if len(slots) < self._n_slots:
+                    raise ValueError('`possible_keys` has duplicate keys.')
+        self._slots = slots
+        '''
+        `dict` mapping each key to its slot, or `None` if the slot of a key is
+        the key itself.
+        '''
+
+
+    def _get_slot(self, key):
+        '''Get the slot of `key`, raising `KeyError` if it has none.'''
+        slots = self._slots
+        if slots is None:
+            if isinstance(key, int) and 0 <= key < self._n_slots:
+                return key
+            raise KeyError(key)
+        return slots[key]
+
+
+    def _add_counted(self, counted, get_slot):
+        '''Add the counts in the `dict` `counted` to our counts by slot.'''
+        counts = self.counts
+        for key, count in counted.items():
+            counts[get_slot(key)] += count
+
+
+    @classmethod
+    def from_codes(cls, possible_keys, codes):
+        '''
+        Create a bag by counting `codes`, which are slot numbers of keys.
+
+        A code of `i` means one of `possible_keys[i]`. `codes` may be any
+        iterable of `int`s, but for big ones use an object that supports the
+        buffer protocol, like `bytes`, an `array` or a NumPy array, which is
+        counted in place without copying it. (NumPy arrays are counted with
+        `numpy.bincount`.)
+        '''
+        dense_bag = cls(possible_keys)
+        n_slots = dense_bag._n_slots
+
+        def get_slot(code):
+            if 0 <= code < n_slots:
+                return code
+            raise IndexError('There is no key with the code %s.' % code)
+
+        if type(codes).__module__ == 'numpy':
+            import numpy
+            counts = numpy.bincount(codes.ravel(), minlength=n_slots)
+            if len(counts) > n_slots:
+                get_slot(len(counts) - 1) # Raises `IndexError`.
+            dense_bag.counts = _create_counts(counts.tolist())
+            return dense_bag
+
+        try:
+            codes = memoryview(codes)
+        except TypeError:
+            pass
+        counted = {}
+        _count_elements(counted, codes)
+        dense_bag._add_counted(counted, get_slot)
+        return dense_bag
+
+
+    def _from_counts(self, counts):
+        '''Create a bag with our possible keys from an iterable of counts.'''
+        dense_bag = type(self).__new__(type(self))
+        dense_bag._set_possible_keys(self.possible_keys, self._slots)
+        dense_bag.counts = _create_counts(counts)
+        return dense_bag
+
+
+    def _get_other_counts(self, other):
+        '''
+        Get the `counts` of the `DenseBag` `other`, if it's compatible.
+
+        Returns `None` if it's not a `DenseBag`, and raises an exception if it
+        has different possible keys.
+        '''
+        if not isinstance(other, DenseBag):
+            return None
+        if other.possible_keys is not self.possible_keys and \
+                                 other.possible_keys != self.possible_keys:
+            raise ValueError("Can't combine `DenseBag`s that have different "
+                             "possible keys.")
+        return other.counts
+
+
+    @staticmethod
+    def _get_int_operand(other, description):
+        '''
+        Get the integer `other` as an `int`, for doing arithmetic with a bag.
+
+        Returns `None` if it's not an integer. Raises `TypeError` if it's
+        negative, since bags don't support negative amounts. `description`
+        says what we can't do with a negative number, for the error message.
+        '''
+        if not math_tools.is_integer(other):
+            return None
+        if other < 0:
+            raise TypeError("Can't %s a negative number, since bags don't "
+                            "support negative amounts." % description)
+        return int(other)
+
+
+    def __getitem__(self, key):
+        try:
+            return self.counts[self._get_slot(key)]
+        except KeyError:
+            return 0
+
+    def __setitem__(self, key, count):
+        slot = self._get_slot(key)
+        try:
+            self.counts[slot] = _process_count(count)
+        except _ZeroCountAttempted:
+            self.counts[slot] = 0
+
+    def __delitem__(self, key):
+        # Like in `Bag`, not raising on missing keys.
+        try:
+            self.counts[self._get_slot(key)] = 0
+        except KeyError:
+            pass
+
+    def __iter__(self):
+        return itertools.compress(self.possible_keys, self.counts)
+
+    def __len__(self):
+        return self._n_slots - self.counts.count(0)
+
+    def __contains__(self, key):
+        return self[key] >= 1
+
+    def __bool__(self):
+        return self.counts.count(0) < self._n_slots
+
+    def clear(self):
+        '''Set all the counts to zero.'''
+        self.counts[:] = _create_counts(itertools.repeat(0, self._n_slots))
+
+    def __eq__(self, other):
+        if isinstance(other, DenseBag):
+            return (other.possible_keys is self.possible_keys or
+                    other.possible_keys == self.possible_keys) and \
+                                                    self.counts == other.counts
+        return super().__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%r, %r)' % (type(self).__name__, self.possible_keys,
+                               dict(self.items()))
+
+    def copy(self):
+        '''Get a shallow copy of this bag.'''
+        return self._from_counts(self.counts)
+
+    __copy__ = copy
+
+    def to_bag(self):
+        '''Get a `Bag` with the same counts.'''
+        return Bag(dict(self.items()))
+
+    @property
+    def n_elements(self):
+        '''Number of total elements in the bag.'''
+        return sum(self.counts)
+
+    @property
+    def elements(self):
+        '''Iterate over elements repeating each as many times as its count.'''
+        return itertools.chain.from_iterable(
+            itertools.starmap(itertools.repeat, self.items())
+        )
+
+    def most_common(self, n=None):
+        '''
+        List the `n` most common elements and their counts, sorted.
+
+        Results are sorted from the most common to the least. If `n is None`,
+        then list all element counts. The slots are partially sorted by their
+        counts, so this takes `O(N log n)` time for `N` possible keys.
+        '''
+        counts = self.counts
+        if n is None:
+            slots = sorted(itertools.compress(range(self._n_slots), counts),
+                           key=counts.__getitem__, reverse=True)
+        else:
+            slots = heapq.nlargest(
+                n, itertools.compress(range(self._n_slots), counts),
+                key=counts.__getitem__
+            )
+        possible_keys = self.possible_keys
+        return tuple((possible_keys[slot], counts[slot]) for slot in slots)
+
+
+    ### Defining arithmetic between bags: #####################################
+    #                                                                         #
+    # These work only between `DenseBag`s with the same possible keys, and
+    # go over the two `counts` arrays together with `map` on C functions, so
+    # no Python code runs per key.
+
+    def __or__(self, other):
+        '''Make a union bag, with the higher count of every key.'''
+        other_counts = self._get_other_counts(other)
+        if other_counts is None:
+            return NotImplemented
+        return self._from_counts(map(max, self.counts, other_counts))
+
+    def __and__(self, other):
+        '''Make an intersection bag, with the lower count of every key.'''
+        other_counts = self._get_other_counts(other)
+        if other_counts is None:
+            return NotImplemented
+        return self._from_counts(map(min, self.counts, other_counts))
+
+    def __add__(self, other):
+        '''Make a sum bag, with the sum of the counts of every key.'''
+        other_counts = self._get_other_counts(other)
+        if other_counts is None:
+            return NotImplemented
+        return self._from_counts(map(operator.add, self.counts, other_counts))
+
+    def __sub__(self, other):
+        '''
+        Get the subtraction of one bag from another.
+
+        Negative counts are truncated to zero.
+        '''
+        other_counts = self._get_other_counts(other)
+        if other_counts is None:
+            return NotImplemented
+        return self._from_counts(
+            map(max, map(operator.sub, self.counts, other_counts),
+                itertools.repeat(0))
+        )
+
+    def __mul__(self, other):
+        '''Get a new bag with all counts multiplied by the integer `other`.'''
+        other = self._get_int_operand(other, 'multiply a bag by')
+        if other is None:
+            return NotImplemented
+        return self._from_counts(map(operator.mul, self.counts,
+                                     itertools.repeat(other)))
+
+    __rmul__ = __mul__
+
+    def __floordiv__(self, other):
+        '''
+        Do a floor-division `self // other`.
+
+        If `other` is an integer, the result is the biggest bag possible so
+        that `result * other <= self`. If `other` is a bag, the result is the
+        biggest integer possible so that `result * other <= self`.
+        '''
+        int_other = self._get_int_operand(other, 'floor-divide a bag by')
+        if int_other is not None:
+            return self._from_counts(map(operator.floordiv, self.counts,
+                                         itertools.repeat(int_other)))
+        other_counts = self._get_other_counts(other)
+        if other_counts is None:
+            return NotImplemented
+        quotients = [count // other_count for count, other_count
+                     in zip(self.counts, other_counts) if other_count]
+        if not quotients:
+            raise ZeroDivisionError
+        return min(quotients)
+
+    def __mod__(self, other):
+        '''
+        Do a modulo `self % other`.
+
+        If `other` is a bag, this is what's left from `self` after removing
+        `self // other` copies of `other`.
+        '''
+        int_other = self._get_int_operand(other, 'take a bag modulo')
+        if int_other is not None:
+            return self._from_counts(map(operator.mod, self.counts,
+                                         itertools.repeat(int_other)))
+        if self._get_other_counts(other) is None:
+            return NotImplemented
+        return divmod(self, other)[1]
+
+    def __divmod__(self, other):
+        '''Get `(self // other, self % other)`.'''
+        if math_tools.is_integer(other):
+            return (self // other, self % other)
+        if self._get_other_counts(other) is None:
+            return NotImplemented
+        floordiv_result = self // other
+        return (floordiv_result, self - other * floordiv_result)
+
+    def __pow__(self, other, modulo=None):
+        '''Get a new bag with every count raised to the power of `other`.'''
+        other = self._get_int_operand(other, 'raise a bag to the power of')
+        if other is None:
+            return NotImplemented
+        if modulo is not None:
+            modulo = self._get_int_operand(modulo, 'take a bag modulo')
+            if modulo is None:
+                return NotImplemented
+        return self._from_counts(map(pow, self.counts,
+                                     itertools.repeat(other),
+                                     itertools.repeat(modulo)))
+
+    def _update_in_place(self, result):
+        '''
+        Take the counts of the bag `result` without replacing our `array`.
+
+        This way views of `counts`, like NumPy arrays, see the new counts.
+        '''
+        if result is NotImplemented:
+            return result
+        self.counts[:] = result.counts
+        return self
+
+    def __ior__(self, other):
+        '''Make this bag into a union bag of this bag and `other`.'''
+        return self._update_in_place(self | other)
+
+    def __iand__(self, other):
+        '''Make this bag into an intersection bag of this bag and `other`.'''
+        return self._update_in_place(self & other)
+
+    def __iadd__(self, other):
+        '''Add the counts of `other` to this bag.'''
+        return self._update_in_place(self + other)
+
+    def __isub__(self, other):
+        '''Subtract `other` from this bag, truncating negatives to zero.'''
+        return self._update_in_place(self - other)
+
+    def __imul__(self, other):
+        '''Multiply all the counts in this bag by the integer `other`.'''
+        return self._update_in_place(self * other)
+
+    #                                                                         #
+    ### Finished defining arithmetic between bags. ############################
+
+    def __le__(self, other):
+        '''Is every count in `self` smaller or equal to that in `other`?'''
+        other_counts = self._get_other_counts(other)
+        if other_counts is None:
+            return NotImplemented
+        return all(map(operator.le, self.counts, other_counts))
+
+    def __ge__(self, other):
+        '''Is every count in `self` bigger or equal to its count in `other`?'''
+        other_counts = self._get_other_counts(other)
+        if other_counts is None:
+            return NotImplemented
+        return all(map(operator.ge, self.counts, other_counts))
+
+    def __lt__(self, other):
+        '''Is `self <= other`, with at least one count strictly smaller?'''
+        if self._get_other_counts(other) is None:
+            return NotImplemented
+        return self <= other and self.counts != other.counts
+
+    def __gt__(self, other):
+        '''Is `self >= other`, with at least one count strictly bigger?'''
+        if self._get_other_counts(other) is None:
+            return NotImplemented
+        return self >= other and self.counts != other.counts
@@ -5,7 +5,7 @@ import collections
 
 from python_toolbox import math_tools
 
-from .bagging import Bag, FrozenBag
+from .bagging import Bag, FrozenBag, _BootstrappedCachedProperty
 
 
 class FrozenBagBag(FrozenBag):
@@ -27,7 +27,7 @@ class FrozenBagBag(FrozenBag):
         FrozenBagBag({1: 2, 2: 2, 5: 1})
         
     '''
-    def __init__(self, iterable):
+    def __init__(self, iterable={}):
         super().__init__(iterable)
         
         # All zero values were already fileterd out by `FrozenBag`, we'll
@@ -55,14 +55,63 @@ class FrozenBagBag(FrozenBag):
         The results come in a `FrozenBag`, where each count is the number of
         different options for making that sub-FBB.
         '''
-        sub_fbbs_bag = Bag()
-        for key_to_reduce, value_of_key_to_reduce in self.items():
-            sub_fbb_prototype = Bag(self)
-            sub_fbb_prototype[key_to_reduce] -= 1
-            sub_fbb_prototype[key_to_reduce - 1] += 1
-            sub_fbbs_bag[FrozenBagBag(sub_fbb_prototype)] = \
-                                                         value_of_key_to_reduce
-        return FrozenBag(sub_fbbs_bag)
+        return FrozenBag._from_valid_items(
+            (FrozenBagBag.from_canonical_items(sub_canonical_items), factor)
+            for sub_canonical_items, factor in
+            self.iterate_sub_canonical_items_for_one_key_removed(
+                                                          self.canonical_items)
+        )
+
+    @_BootstrappedCachedProperty
+    def canonical_items(self):
+        '''
+        The items of this FBB as a sorted `tuple` of `(key, count)` pairs.
+
+        This is a compact, hashable representation of the FBB, which is equal
+        for equal FBBs. Algorithms that go over many FBBs, like
+        `calculate_length_of_recurrent_perm_space`, can work with these
+        instead of creating a `FrozenBagBag` for each one.
+
+            >>> FrozenBagBag({3: 10, 2: 3}).canonical_items
+            ((2, 3), (3, 10))
+
+        '''
+        return tuple(sorted(self._dict.items()))
+
+    @classmethod
+    def from_canonical_items(cls, canonical_items):
+        '''Create a `FrozenBagBag` from its `canonical_items`.'''
+        fbb = cls._from_valid_items(canonical_items)
+        fbb.canonical_items = canonical_items
+        return fbb
+
+    @staticmethod
+    def iterate_sub_canonical_items_for_one_key_removed(canonical_items):
+        '''
+        Iterate on the sub-FBBs of `get_sub_fbbs_for_one_key_removed`.
+
+        This works on `canonical_items` directly, yielding the
+        `canonical_items` of each sub-FBB along with its number of options,
+        without creating any bags:
+
+            >>> fbb = FrozenBagBag({2: 3, 3: 10})
+            >>> tuple(fbb.iterate_sub_canonical_items_for_one_key_removed(
+            ...                                         fbb.canonical_items))
+            ((((1, 1), (2, 2), (3, 10)), 3), (((2, 4), (3, 9)), 10))
+
+        Since the items are sorted, reducing a key by one only touches its
+        own pair and the pair before it.
+        '''
+        for i, (key, count) in enumerate(canonical_items):
+            head = canonical_items[:i]
+            if key >= 2:
+                if head and head[-1][0] == key - 1:
+                    head = head[:-1] + ((key - 1, head[-1][1] + 1),)
+                else:
+                    head += ((key - 1, 1),)
+            if count >= 2:
+                head += ((key, count - 1),)
+            yield (head + canonical_items[i + 1:], count)
             
     def get_sub_fbbs_for_one_key_and_previous_piles_removed(self):
         '''
@@ -4,6 +4,7 @@
 import collections
 import operator
 import itertools
+import sys
 
 from python_toolbox import comparison_tools
 from python_toolbox import context_management
@@ -12,28 +13,235 @@ from python_toolbox import freezing
 
 
 
-KEY, PREV, NEXT = range(3)
+# Since Python 3.6, `dict` keeps its insertion order, and it takes less memory
+# than `collections.OrderedDict`:
+_InsertionOrderedDict = dict if sys.version_info >= (3, 6) else \
+                                                        collections.OrderedDict
 
 
-class BaseOrderedSet(collections.Set, collections.Sequence):
+class _Deleted:
+    '''Placeholder for an item that was removed from an ordered set.'''
+
+
+class _OrderedSetAlgebraMixin:
+    '''
+    Mixin for the set operations of ordered sets, done in bulk.
+    
+    The `collections.Set` versions of these build the result item by item.
+    Ours build a list of the items of the result and create it from that
+    list in one go. The order of the items of `self` is kept, and items that
+    come only from `other` come after them, in the order of `other`. The
+    exception is `&`, which keeps the order of `other` like the
+    `collections.Set` version does.
+    
+    Subclasses must define `_map`, which has the items as its keys,
+    `_iterate_in_order`, and `_set_items`, which replaces all the items with a
+    list of different items.
+    '''
+    
+    @classmethod
+    def _from_item_list(cls, items):
+        '''Create an ordered set from a list of different items.'''
+        ordered_set = cls()
+        ordered_set._set_items(items)
+        return ordered_set
+    
+    @staticmethod
+    def _as_container(iterable):
+        '''Get something that we can quickly check if items are in.'''
+        return iterable if isinstance(iterable, (collections.Set,
+                                                 collections.Mapping)) \
+                                                        else set(iterable)
+    
+    def _get_new_items(self, iterable):
+        '''Get a list of the items of `iterable` that aren't in `self`.'''
+        if not isinstance(iterable, (collections.Set, collections.Mapping)):
+            # Getting rid of duplicates while keeping the order:
+            iterable = _InsertionOrderedDict.fromkeys(iterable)
+        map_ = self._map
+        return [item for item in iterable if item not in map_]
+    
+    def __or__(self, other):
+        if not isinstance(other, collections.Iterable):
+            return NotImplemented
+        return self._from_item_list(list(self._iterate_in_order()) +
+                                    self._get_new_items(other))
+    
+    def __and__(self, other):
+        if not isinstance(other, collections.Iterable):
+            return NotImplemented
+        if not isinstance(other, (collections.Set, collections.Mapping)):
+            # Getting rid of duplicates while keeping the order:
+            other = _InsertionOrderedDict.fromkeys(other)
+        map_ = self._map
+        return self._from_item_list([item for item in other if item in map_])
+    
+    def __sub__(self, other):
+        if not isinstance(other, collections.Iterable):
+            return NotImplemented
+        other = self._as_container(other)
+        return self._from_item_list(
+            [item for item in self._iterate_in_order() if item not in other]
+        )
+    
+    def __xor__(self, other):
+        if not isinstance(other, collections.Iterable):
+            return NotImplemented
+        new_items = self._get_new_items(other)
+        other = self._as_container(other)
+        return self._from_item_list(
+            [item for item in self._iterate_in_order() if item not in other] +
+            new_items
+        )
+    
+    
+class _MutableOrderedSetAlgebraMixin(_OrderedSetAlgebraMixin):
+    '''
+    Mixin for the in-place set operations of ordered sets, done in bulk.
+    
+    Subclasses must also define `_extend`, which adds a list of new items to
+    the end.
+    '''
+    
+    def update(self, *iterables):
+        '''Add the items of all the `iterables` to the end, in order.'''
+        for iterable in iterables:
+            self._extend(self._get_new_items(iterable))
+            
+    def update_many(self, iterables):
+        '''
+        Add the items of all the `iterables` to the end, in order.
+        
+        This is like `update`, except that it takes the iterables as one
+        iterable, (which may be a generator,) and that the new items of all of
+        them are found first and then added all at once.
+        '''
+        self._extend(
+            self._get_new_items(itertools.chain.from_iterable(iterables))
+        )
+        
+    def intersection_update(self, *iterables):
+        '''Remove the items that aren't in all the `iterables`.'''
+        for iterable in iterables:
+            container = self._as_container(iterable)
+            items = [item for item in self._iterate_in_order()
+                                                         if item in container]
+            if len(items) < len(self):
+                self._set_items(items)
+                
+    def difference_update(self, *iterables):
+        '''Remove the items that are in any of the `iterables`.'''
+        for iterable in iterables:
+            if iterable is self:
+                self.clear()
+                continue
+            doomed_items = [item for item in iterable if item in self._map]
+            if len(doomed_items) * 4 < len(self):
+                # There are few of them, so removing them one by one is
+                # quicker than making a new list of all the items:
+                for item in doomed_items:
+                    self.discard(item)
+            else:
+                doomed_items = set(doomed_items)
+                self._set_items([item for item in self._iterate_in_order()
+                                 if item not in doomed_items])
+                
+    def symmetric_difference_update(self, other):
+        '''
+        Remove the items that are in `other`, and add the ones that aren't.
+        '''
+        if other is self:
+            self.clear()
+        else:
+            new_items = self._get_new_items(other)
+            other = self._as_container(other)
+            self._set_items([item for item in self._iterate_in_order()
+                             if item not in other] + new_items)
+        
+    def __ior__(self, other):
+        self.update(other)
+        return self
+        
+    def __iand__(self, other):
+        self.intersection_update(other)
+        return self
+    
+    def __isub__(self, other):
+        self.difference_update(other)
+        return self
+    
+    def __ixor__(self, other):
+        self.symmetric_difference_update(other)
+        return self
+    
+
+class BaseOrderedSet(_OrderedSetAlgebraMixin, collections.Set,
+                     collections.Sequence):
     '''
     Base class for `OrderedSet` and `FrozenOrderedSet`, i.e. set with an order.
 
     This behaves like a `set` except items have an order. (By default they're
     ordered by insertion order, but that order can be changed.)
+    
+    Getting an item by its index, and getting the index of an item, take
+    constant time. Slicing gives an ordered set of the same type.
     '''
     
+    # The items are kept in two lists: `_back`, which has the items that were
+    # added at the end, in order, and `_front`, which has the items that were
+    # added at the start, in reverse order. `_map` maps each item to its
+    # position: `i` for `_back[i]` and `-1 - i` for `_front[i]`. So the index
+    # of an item is its position plus `len(_front)`.
+    #
+    # A removed item leaves a `_Deleted` placeholder in its list, so the
+    # positions of the other items stay right. Placeholders at the end of a
+    # list are dropped right away. The ones at the start of a list are
+    # counted in `_front_start` and `_back_start`, so we can skip them
+    # without looking at them; this keeps the first and last items, and
+    # indices, quick to get when items are removed from the ends, like in a
+    # queue. When there are more placeholders than items, or when we need
+    # indices and there are placeholders in the middle of a list, we compact
+    # the lists and throw the placeholders away.
+    
     def __init__(self, iterable=()):
-        self.__clear()
-        for item in iterable:
-            self.__add(item)
+        # Getting rid of duplicates while keeping the order:
+        self._set_items(list(_InsertionOrderedDict.fromkeys(iterable)))
 
     def __getitem__(self, index):
-        for i, item in enumerate(self):
-            if i == index:
-                return item
-        else:
-            raise IndexError
+        if isinstance(index, slice):
+            return self._from_iterable(self._get_item_list()[index])
+        if self._n_deleted != self._front_start + self._back_start:
+            self._compact()
+        n_front_items = len(self._front) - self._front_start
+        if index < 0:
+            index += len(self._map)
+            if index < 0:
+                raise IndexError('Index out of range.')
+        if index < n_front_items:
+            return self._front[len(self._front) - 1 - index]
+        try:
+            return self._back[index - n_front_items + self._back_start]
+        except IndexError:
+            raise IndexError('Index out of range.') from None
+        
+    def index(self, key):
+        '''Get the index of `key` in the ordered set.'''
+        try:
+            position = self._map[key]
+        except KeyError:
+            raise ValueError('%r is not in the ordered set.' % (key,)) \
+                                                                     from None
+        if self._n_deleted != self._front_start + self._back_start:
+            self._compact()
+            position = self._map[key]
+        if position >= 0:
+            return position - self._back_start + len(self._front) - \
+                                                              self._front_start
+        return position + len(self._front)
+    
+    def count(self, key):
+        '''Get the number of times `key` is in the ordered set: 0 or 1.'''
+        return int(key in self._map)
         
     def __len__(self):
         return len(self._map)
@@ -43,18 +251,28 @@ class BaseOrderedSet(collections.Set, collections.Sequence):
 
 
     def __iter__(self):
-        end = self._end
-        curr = end[NEXT]
-        while curr is not end:
-            yield curr[KEY]
-            curr = curr[NEXT]
+        for item in itertools.chain(
+                              reversed(self._front),
+                              itertools.islice(self._back, self._back_start,
+                                               None)):
+            if item is not _Deleted:
+                yield item
 
     def __reversed__(self):
-        end = self._end
-        curr = end[PREV]
-        while curr is not end:
-            yield curr[KEY]
-            curr = curr[PREV]
+        for item in itertools.chain(
+                             reversed(self._back),
+                             itertools.islice(self._front, self._front_start,
+                                              None)):
+            if item is not _Deleted:
+                yield item
+                
+    def _get_item_list(self):
+        '''Get a list of the items in order. Don't change it.'''
+        if self._n_deleted or self._front:
+            self._compact()
+        return self._back
+    
+    _iterate_in_order = _get_item_list
 
     def __repr__(self):
         if not self:
@@ -70,9 +288,10 @@ class BaseOrderedSet(collections.Set, collections.Sequence):
     
     def __clear(self):
         '''Clear the ordered set, removing all items.'''
-        self._end = [] 
-        self._end += [None, self._end, self._end]
+        self._front = []
+        self._back = []
         self._map = {}
+        self._n_deleted = self._front_start = self._back_start = 0
         
         
     def __add(self, key, last=True):
@@ -85,13 +304,41 @@ class BaseOrderedSet(collections.Set, collections.Sequence):
         '''
         
         if key not in self._map:
-            end = self._end
             if last:
-                last = end[PREV]
-                last[NEXT] = end[PREV] = self._map[key] = [key, last, end]
+                self._map[key] = len(self._back)
+                self._back.append(key)
             else:
-                first = end[NEXT]
-                first[PREV] = end[NEXT] = self._map[key] = [key, end, first]
+                self._map[key] = -1 - len(self._front)
+                self._front.append(key)
+                
+                
+    def _compact(self):
+        '''
+        Put all the items in `_back` and throw away the `_Deleted` items.
+        
+        This doesn't change the items or their order. We create new lists
+        rather than change the old ones, so iterators on the ordered set that
+        are running now will still work.
+        '''
+        self._set_items([
+            item for item in itertools.chain(reversed(self._front),
+                                             self._back)
+            if item is not _Deleted
+        ])
+        
+        
+    def _set_items(self, items):
+        '''Replace all the items with the list `items`, which we take.'''
+        self._back = items
+        self._front = []
+        self._map = dict(zip(items, itertools.count()))
+        self._n_deleted = self._front_start = self._back_start = 0
+        
+        
+    def _extend(self, new_items):
+        '''Add the items in the list `new_items` to the end.'''
+        self._map.update(zip(new_items, itertools.count(len(self._back))))
+        self._back.extend(new_items)
 
                 
 
@@ -109,7 +356,8 @@ class FrozenOrderedSet(BaseOrderedSet):
         
 
 
-class OrderedSet(BaseOrderedSet, collections.MutableSet):
+class OrderedSet(_MutableOrderedSetAlgebraMixin, BaseOrderedSet,
+                 collections.MutableSet):
     '''
     A `set` with an order.
 
@@ -124,7 +372,6 @@ class OrderedSet(BaseOrderedSet, collections.MutableSet):
         '''
         Move an existing element to the end (or start if `last=False`.)
         '''
-        # Inefficient implementation until someone cares.
         self.remove(key)
         self.add(key, last=last)
             
@@ -136,31 +383,78 @@ class OrderedSet(BaseOrderedSet, collections.MutableSet):
         The optional `key` argument will be passed to the `sorted` function as
         a key function.
         '''
-        # Inefficient implementation until someone cares.
         key_function = \
                    comparison_tools.process_key_function_or_attribute_name(key)
-        sorted_members = sorted(tuple(self), key=key_function, reverse=reverse)
+        self._get_item_list().sort(key=key_function, reverse=reverse)
+        self._compact()
+        
         
-        self.clear()
-        self |= sorted_members
+    def insert(self, index, key):
+        '''
+        Insert `key` before the item at `index`.
+        
+        This has no effect if the element is already present. This takes
+        time proportional to the number of items after `index`.
+        '''
+        if key not in self._map:
+            items = self._get_item_list()
+            # Clamping `index` like `list.insert` does:
+            if index < 0:
+                index = max(index + len(items), 0)
+            index = min(index, len(items))
+            items.insert(index, key)
+            for i in range(index, len(items)):
+                self._map[items[i]] = i
+                
 
-    
     def discard(self, key):
         '''
         Remove an element from a set if it is a member.
     
         If the element is not a member, do nothing.
         '''
-        if key in self._map:        
-            key, prev, next = self._map.pop(key)
-            prev[NEXT] = next
-            next[PREV] = prev
+        position = self._map.pop(key, None)
+        if position is None:
+            return
+        if position >= 0:
+            items, start = self._back, self._back_start
+        else:
+            items, start = self._front, self._front_start
+            position = -1 - position
+        if position == len(items) - 1:
+            del items[position]
+            # Dropping placeholders from the end, so `pop` stays quick:
+            while items and items[-1] is _Deleted:
+                del items[-1]
+                self._n_deleted -= 1
+            start = min(start, len(items))
+        else:
+            items[position] = _Deleted
+            self._n_deleted += 1
+            if position == start:
+                # There's an item at the end of the list, so this stops:
+                start += 1
+                while items[start] is _Deleted:
+                    start += 1
+        if items is self._back:
+            self._back_start = start
+        else:
+            self._front_start = start
+        if self._n_deleted > len(self._map) and self._n_deleted > 16:
+            self._compact()
 
     def pop(self, last=True):
         '''Remove and return an arbitrary set element.'''
         if not self:
             raise KeyError('set is empty')
-        key = next(reversed(self) if last else iter(self))
+        # There are no placeholders at the ends of the lists, and the ones at
+        # their starts are skipped:
+        if last:
+            key = self._back[-1] if self._back else \
+                                                 self._front[self._front_start]
+        else:
+            key = self._front[-1] if self._front else \
+                                                   self._back[self._back_start]
         self.discard(key)
         return key
     
@@ -170,6 +464,188 @@ class OrderedSet(BaseOrderedSet, collections.MutableSet):
         
 
 
+class BaseCompactOrderedSet(_OrderedSetAlgebraMixin, collections.Set,
+                            collections.Sequence):
+    '''
+    Base class for `CompactOrderedSet` and `FrozenCompactOrderedSet`.
+    
+    These have the same interface as `OrderedSet` and `FrozenOrderedSet`, but
+    they take about half the memory, because they keep their items only as
+    the keys of an insertion-ordered `dict`. They're good for big sets that
+    are mostly added to, checked and iterated on.
+    
+    The price is that some operations are slower: Getting an item by index
+    takes linear time on the first time after the set was changed, (we then
+    keep a list of the items until the next change,) and so do `index`,
+    `insert` and adding or moving an item to the start.
+    '''
+    
+    def __init__(self, iterable=()):
+        self._set_items(iterable)
+        
+    def _get_item_list(self):
+        '''Get a list of the items in order. Don't change it.'''
+        if self._item_list is None:
+            self._item_list = list(self._map)
+        return self._item_list
+    
+    def _iterate_in_order(self):
+        return iter(self._map)
+    
+    def _set_items(self, items):
+        '''Replace all the items with `items`, in order.'''
+        self._map = _InsertionOrderedDict.fromkeys(items)
+        self._item_list = None
+        self._n_deleted = 0
+    
+    def _extend(self, new_items):
+        '''Add the items in the list `new_items` to the end.'''
+        self._map.update(_InsertionOrderedDict.fromkeys(new_items))
+        self._item_list = None
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._from_iterable(self._get_item_list()[index])
+        try:
+            return self._get_item_list()[index]
+        except IndexError:
+            raise IndexError('Index out of range.') from None
+        
+    def index(self, key):
+        '''Get the index of `key` in the ordered set.'''
+        if key not in self._map:
+            raise ValueError('%r is not in the ordered set.' % (key,))
+        return self._get_item_list().index(key)
+    
+    def count(self, key):
+        '''Get the number of times `key` is in the ordered set: 0 or 1.'''
+        return int(key in self._map)
+        
+    def __len__(self):
+        return len(self._map)
+
+    def __contains__(self, key):
+        return key in self._map
+
+    def __iter__(self):
+        return iter(self._map)
+
+    def __reversed__(self):
+        return reversed(self._get_item_list())
+
+    __repr__ = BaseOrderedSet.__repr__
+    __eq__ = BaseOrderedSet.__eq__
+    
+    
+class FrozenCompactOrderedSet(BaseCompactOrderedSet):
+    '''
+    A `frozenset` with an order, that takes little memory.
+    
+    This has the same interface as `FrozenOrderedSet`. See documentation of
+    `BaseCompactOrderedSet` for how it's different.
+    '''
+    
+    __hash__ = FrozenOrderedSet.__hash__
+    
+    
+class CompactOrderedSet(_MutableOrderedSetAlgebraMixin,
+                        BaseCompactOrderedSet, collections.MutableSet):
+    '''
+    A `set` with an order, that takes little memory.
+    
+    This has the same interface as `OrderedSet`. See documentation of
+    `BaseCompactOrderedSet` for how it's different.
+    '''
+    
+    def add(self, key, last=True):
+        '''
+        Add an element to a set.
+    
+        This has no effect if the element is already present.
+        
+        Specify `last=False` to add the item at the start of the ordered set.
+        (This takes linear time.)
+        '''
+        if key not in self._map:
+            if last:
+                self._map[key] = None
+                self._item_list = None
+            else:
+                self._set_items(itertools.chain((key,), self._map))
+    
+    def clear(self):
+        '''Clear the ordered set, removing all items.'''
+        self._set_items(())
+            
+    def move_to_end(self, key, last=True):
+        '''
+        Move an existing element to the end (or start if `last=False`.)
+        '''
+        self.remove(key)
+        self.add(key, last=last)
+        
+    def sort(self, key=None, reverse=False):
+        '''
+        Sort the items according to their keys, changing the order in-place.
+        
+        The optional `key` argument will be passed to the `sorted` function as
+        a key function.
+        '''
+        key_function = \
+                   comparison_tools.process_key_function_or_attribute_name(key)
+        self._set_items(sorted(self._map, key=key_function, reverse=reverse))
+        
+    def insert(self, index, key):
+        '''
+        Insert `key` before the item at `index`.
+        
+        This has no effect if the element is already present. This takes
+        linear time.
+        '''
+        if key not in self._map:
+            items = list(self._get_item_list())
+            items.insert(index, key)
+            self._set_items(items)
+            
+    def discard(self, key):
+        '''
+        Remove an element from a set if it is a member.
+    
+        If the element is not a member, do nothing.
+        '''
+        if key in self._map:
+            del self._map[key]
+            self._item_list = None
+            self._note_deletion()
+            
+    def _note_deletion(self):
+        # A `dict` leaves a placeholder for every key that's deleted from it,
+        # until it's resized. Iterating on the `dict` goes over these, so
+        # when there are a lot of them we make a new `dict`. (Otherwise
+        # `pop(last=False)` would take longer and longer.)
+        self._n_deleted += 1
+        if self._n_deleted > len(self._map) and self._n_deleted > 16:
+            self._map = _InsertionOrderedDict(self._map)
+            self._n_deleted = 0
+            
+    def pop(self, last=True):
+        '''Remove and return an arbitrary set element.'''
+        if not self._map:
+            raise KeyError('set is empty')
+        if last:
+            key, _ = self._map.popitem()
+        else:
+            key = next(iter(self._map))
+            del self._map[key]
+        self._item_list = None
+        self._note_deletion()
+        return key
+    
+    def get_frozen(self):
+        '''Get a frozen version of this ordered set.'''
+        return FrozenCompactOrderedSet(self)
+
+
 class EmittingOrderedSet(OrderedSet):
     '''An ordered set that emits to `.emitter` every time it's modified.'''
     
@@ -199,12 +675,65 @@ class EmittingOrderedSet(OrderedSet):
         if key in self._map:        
             super().discard(key)
             self._emit()
+            
+    def insert(self, index, key):
+        '''
+        Insert `key` before the item at `index`.
+        
+        This has no effect if the element is already present.
+        '''
+        if key not in self._map:
+            super().insert(index, key)
+            self._emit()
                 
     def clear(self):
         '''Clear the ordered set, removing all items.'''
         if self:
             super().clear()
             self._emit()
+            
+    def sort(self, key=None, reverse=False):
+        '''
+        Sort the items according to their keys, changing the order in-place.
+        
+        The optional `key` argument will be passed to the `sorted` function as
+        a key function.
+        '''
+        super().sort(key=key, reverse=reverse)
+        self._emit()
+        
+    # The bulk operations of `OrderedSet` don't go through `add` and
+    # `discard`, so we use the item-by-item versions, which emit on every
+    # change:
+    __ior__ = collections.MutableSet.__ior__
+    __iand__ = collections.MutableSet.__iand__
+    __isub__ = collections.MutableSet.__isub__
+    __ixor__ = collections.MutableSet.__ixor__
+    
+    def update(self, *iterables):
+        '''Add the items of all the `iterables` to the end, in order.'''
+        for iterable in iterables:
+            self |= iterable
+            
+    def update_many(self, iterables):
+        '''Add the items of all the `iterables` to the end, in order.'''
+        self.update(*iterables)
+        
+    def intersection_update(self, *iterables):
+        '''Remove the items that aren't in all the `iterables`.'''
+        for iterable in iterables:
+            self &= iterable
+            
+    def difference_update(self, *iterables):
+        '''Remove the items that are in any of the `iterables`.'''
+        for iterable in iterables:
+            self -= iterable
+            
+    def symmetric_difference_update(self, other):
+        '''
+        Remove the items that are in `other`, and add the ones that aren't.
+        '''
+        self ^= other
                 
     def set_emitter(self, emitter):
         '''Set `emitter` to be emitted with on every modification.'''
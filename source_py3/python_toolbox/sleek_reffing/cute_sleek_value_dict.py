@@ -247,14 +247,13 @@ class CuteSleekValueDict(collections.UserDict):
 
 class KeyedSleekRef(SleekRef):
     """Sleekref whose weakref (if one exists) holds reference to a key."""
+    __slots__ = ('key',)
 
-    def __new__(cls, thing, callback, key):
-        self = SleekRef.__new__(cls)
-        return self
-
-    
     def __init__(self, thing, callback, key):
+        self.key = key
         super().__init__(thing, callback)
-        if self.ref:
-            self.ref.key = key
+
+        
+    def _create_ref(self, thing, callback):
+        return weakref.KeyedRef(thing, callback, self.key)
 
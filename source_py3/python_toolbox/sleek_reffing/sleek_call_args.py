@@ -7,11 +7,13 @@ Defines the `SleekCallArgs` class.
 See its documentation for more details.
 '''
 
+import itertools
+
 from python_toolbox import cute_inspect
 from python_toolbox import cheat_hashing
 
 from .sleek_ref import SleekRef
-from .cute_sleek_value_dict import CuteSleekValueDict
+from .exceptions import SleekRefDied
 
 
 __all__ = ['SleekCallArgs']
@@ -36,6 +38,13 @@ class SleekCallArgs:
     # dictionary? It will render this SCA invalid, but we'll still be in the
     # dict. So make note to user: Always keep reference to args and kwargs
     # until the SCA gets added to the dict.
+    
+    # Caches can hold lots of these, so we keep them small: All the
+    # sleekrefs are in one flat tuple, and the names of the arguments are in
+    # a `_layout` tuple that's shared between all the `SleekCallArgs` with the
+    # same argument names.
+    __slots__ = ('containing_dict', '_layout', '_refs', '_hash')
+    
     def __init__(self, containing_dict, function, *args, **kwargs):
         '''
         Construct the `SleekCallArgs`.
@@ -57,49 +66,84 @@ class SleekCallArgs:
         call_args = cute_inspect.getcallargs(function, *args, **kwargs)
         del args, kwargs
         
-        self.star_args_refs = []
-        '''Sleekrefs to star-args.'''
-        
-        if star_args_name:
-            star_args = call_args.pop(star_args_name, None)
-            if star_args:
-                self.star_args_refs = [SleekRef(star_arg, self.destroy) for
-                                       star_arg in star_args]
+        star_args = call_args.pop(star_args_name, ()) if star_args_name \
+                                                                       else ()
+        star_kwargs = call_args.pop(star_kwargs_name, {}) if star_kwargs_name \
+                                                                       else {}
+        # `getcallargs` orders the arguments by how they were passed, so we
+        # sort their names to get the same layout for equivalent calls:
+        names = tuple(sorted(call_args))
+        star_kwargs_names = tuple(sorted(star_kwargs))
         
-        self.star_kwargs_refs = {}
-        '''Sleerefs to star-kwargs.'''
-        if star_kwargs_name:            
-            star_kwargs = call_args.pop(star_kwargs_name, {})
-            if star_kwargs:
-                self.star_kwargs_refs = CuteSleekValueDict(self.destroy,
-                                                           star_kwargs)
+        layout = (names, len(star_args), star_kwargs_names)
+        self._layout = _layouts.setdefault(layout, layout)
+        '''
+        The names of the arguments, the number of star-args, and the names of
+        the star-kwargs.
+        '''
         
-        self.args_refs = CuteSleekValueDict(self.destroy, call_args)
-        '''Mapping from argument name to value, sleek-style.'''
+        destroy = self.destroy
+        self._refs = tuple(
+            SleekRef(thing, destroy) for thing in itertools.chain(
+                (call_args[name] for name in names), star_args,
+                (star_kwargs[name] for name in star_kwargs_names)
+            )
+        )
+        '''
+        Sleekrefs to the arguments, then the star-args, then the star-kwargs.
+        '''
         
-        # In the future the `.args`, `.star_args` and `.star_kwargs` attributes
-        # may change, so we must record the hash now:
+        # In the future the arguments may change, so we must record the hash
+        # now:
         self._hash = cheat_hashing.cheat_hash(
-            (
-                self.args,
-                self.star_args,
-                self.star_kwargs
-            )
+            (self._layout, self._get_things())
         )
         
         
+    def _get_things(self):
+        '''
+        Get a tuple of all the arguments, star-args and star-kwargs.
+        
+        Raises `SleekRefDied` if any of them died.
+        '''
+        return tuple(sleek_ref() for sleek_ref in self._refs)
     
-    args = property(lambda self: dict(self.args_refs))
-    '''The arguments.'''
     
-    star_args = property(
-        lambda self:
-            tuple((star_arg_ref() for star_arg_ref in self.star_args_refs))
-    )
-    '''Extraneous arguments. (i.e. `*args`.)'''
+    def _get_live_items(self, start, names):
+        '''Get `(name, thing)` pairs for the live ones of `names`.'''
+        items = []
+        for name, sleek_ref in zip(names, self._refs[start:]):
+            try:
+                items.append((name, sleek_ref()))
+            except SleekRefDied:
+                pass
+        return items
     
-    star_kwargs = property(lambda self: dict(self.star_kwargs_refs))
-    '''Extraneous keyword arguments. (i.e. `*kwargs`.)'''
+    
+    @property
+    def args(self):
+        '''The arguments.'''
+        names, _, _ = self._layout
+        return dict(self._get_live_items(0, names))
+    
+    
+    @property
+    def star_args(self):
+        '''Extraneous arguments. (i.e. `*args`.)'''
+        names, n_star_args, _ = self._layout
+        return tuple(
+            thing for _, thing in self._get_live_items(
+                len(names), range(n_star_args)
+            )
+        )
+    
+    
+    @property
+    def star_kwargs(self):
+        '''Extraneous keyword arguments. (i.e. `*kwargs`.)'''
+        names, n_star_args, star_kwargs_names = self._layout
+        return dict(self._get_live_items(len(names) + n_star_args,
+                                         star_kwargs_names))
     
         
     def destroy(self, _=None):
@@ -118,13 +162,59 @@ class SleekCallArgs:
     def __eq__(self, other):
         if not isinstance(other, SleekCallArgs):
             return NotImplemented
-        return self.args == other.args and \
-               self.star_args == other.star_args and \
-               self.star_kwargs == other.star_kwargs
+        if self is other:
+            return True
+        if self._layout != other._layout:
+            return False
+        try:
+            things, other_things = self._get_things(), other._get_things()
+        except SleekRefDied:
+            return False
+        # `cheat_hash` hashes buffers by their contents, so different buffers
+        # with equal contents get here. We compare them by their contents
+        # too, rather than with their own `__eq__`, which for NumPy arrays
+        # returns an array of booleans.
+        return tuple(map(_get_comparison_key, things)) == \
+                                 tuple(map(_get_comparison_key, other_things))
 
     
     def __ne__(self, other):
         return not self == other
+
+
+def _get_comparison_key(thing):
+    '''
+    Get an object to compare instead of the argument `thing`.
     
+    Unhashable objects that support the buffer protocol are replaced with
+    their type, format, shape and contents, which is what `cheat_hash` hashes
+    for them, including inside lists, tuples and dicts. Other objects are
+    returned as they are.
+    '''
+    try:
+        hash(thing)
+    except Exception:
+        pass
+    else:
+        return thing
+    if isinstance(thing, list):
+        return list(map(_get_comparison_key, thing))
+    if isinstance(thing, tuple):
+        return tuple(map(_get_comparison_key, thing))
+    if isinstance(thing, dict):
+        return {key: _get_comparison_key(value)
+                for key, value in thing.items()}
+    try:
+        view = memoryview(thing)
+    except TypeError:
+        return thing
+    return (type(thing), view.format, view.shape, view.tobytes())
     
-    
\ No newline at end of file
+
+_layouts = {}
+'''
+`dict` for sharing the `_layout` tuples of `SleekCallArgs` objects.
+
+It has a key for every combination of argument names that was used, which
+isn't a lot.
+'''
@@ -17,14 +17,6 @@ from .exceptions import SleekRefDied
 __all__ = ['SleekRef']
 
 
-class Ref(weakref.ref):
-    '''
-    A weakref.
-    
-    What this adds over `weakref.ref` is the ability to add custom attributes.
-    '''
-
-
 class SleekRef:
     '''
     Sleekref tries to reference an object weakly but if can't does it strongly.
@@ -43,6 +35,9 @@ class SleekRef:
     raises `SleekRefDied`. Therefore, unlike weakref, you can store `None` in a
     sleekref.
     '''
+    # Caches can hold lots of sleekrefs, so we keep them small:
+    __slots__ = ('callback', 'is_none', 'ref', 'thing')
+    
     def __init__(self, thing, callback=None):
         '''
         Construct the sleekref.
@@ -63,7 +58,7 @@ class SleekRef:
             
         else: # not self.is_none (i.e. thing is not None)
             try:
-                self.ref = Ref(thing, callback)
+                self.ref = self._create_ref(thing, callback)
                 '''The weak reference to the object. (Or `None`.)'''
             except TypeError:
                 self.ref = None
@@ -72,6 +67,11 @@ class SleekRef:
             else:
                 self.thing = None
                 
+    
+    def _create_ref(self, thing, callback):
+        '''Create a weakref to `thing`. Raises `TypeError` if we can't.'''
+        return weakref.ref(thing, callback)
+    
             
     def __call__(self):
         '''
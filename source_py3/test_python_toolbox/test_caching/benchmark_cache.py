@@ -0,0 +1,61 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+Benchmark of hits of `python_toolbox.caching.cache`.
+
+Compares the time of a hit to a hit of `functools.lru_cache`, for simple
+arguments, for a weakreffable argument and for no arguments. Nothing is
+asserted, since timings depend on the machine; run it with:
+
+    python -m test_python_toolbox.test_caching.benchmark_cache
+
+'''
+
+import functools
+import timeit
+
+from python_toolbox.caching import cache
+
+
+def f(a, b=2):
+    return a
+
+
+def g():
+    return 1
+
+
+class A:
+    pass
+
+
+def get_hit_time(function, *args):
+    '''Get the best time in microseconds of calling `function(*args)`.'''
+    function(*args)
+    n_calls = 100000
+    return min(
+        timeit.repeat(lambda: function(*args), number=n_calls, repeat=5)
+    ) / n_calls * 10 ** 6
+
+
+def main():
+    a = A()
+    cases = (
+        ('f(1)', f, (1,)),
+        ('f(a)', f, (a,)),
+        ('g()', g, ()),
+    )
+    print('%-8s%12s%12s%20s' % ('Call', 'cache', 'lru_cache',
+                                'thread-safe cache'))
+    for name, function, args in cases:
+        print('%-8s%10.2fus%10.2fus%18.2fus' % (
+            name,
+            get_hit_time(cache()(function), *args),
+            get_hit_time(functools.lru_cache(maxsize=None)(function), *args),
+            get_hit_time(cache(thread_safe=True)(function), *args),
+        ))
+
+
+if __name__ == '__main__':
+    main()
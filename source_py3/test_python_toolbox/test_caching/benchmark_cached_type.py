@@ -0,0 +1,67 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+Benchmark of creating instances of classes that use `caching.CachedType`.
+
+Prints the time of a hit and of a miss, for simple arguments and for a
+weakreffable argument, next to the time of instantiating a normal class.
+Nothing is asserted, since timings depend on the machine; run it with:
+
+    python -m test_python_toolbox.test_caching.benchmark_cached_type
+
+'''
+
+import itertools
+import timeit
+
+from python_toolbox.caching import CachedType
+
+
+class A:
+    pass
+
+
+def get_time(function, n_calls):
+    '''Get the best time in microseconds of calling `function`.'''
+    return min(
+        timeit.repeat(function, number=n_calls, repeat=5)
+    ) / n_calls * 10 ** 6
+
+
+def main():
+    n_calls = 20000
+
+    class Normal:
+        def __init__(self, a, b=2):
+            pass
+
+    class Cached(metaclass=CachedType):
+        def __init__(self, a, b=2):
+            pass
+
+    class WeakCached(metaclass=CachedType, weak_values=True):
+        def __init__(self, a, b=2):
+            pass
+
+    a = A()
+    things = [A() for _ in range(n_calls // 2)]
+    print('%-14s%12s%12s%12s%12s' % ('Class', 'Hit', 'Miss', 'Sleek hit',
+                                     'Sleek miss'))
+    for cls in (Normal, Cached, WeakCached):
+        # Keeping the instances, so they're hits with `weak_values` too:
+        instances = (cls(1), cls(a))
+        counter = itertools.count(2)
+        thing_iterator = iter(things)
+        times = (
+            get_time(lambda: cls(1), n_calls),
+            get_time(lambda: cls(next(counter)), n_calls),
+            get_time(lambda: cls(a), n_calls // 20),
+            get_time(lambda: cls(next(thing_iterator)), n_calls // 20),
+        )
+        print('%-14s%10.2fus%10.2fus%10.2fus%10.2fus' %
+              ((cls.__name__,) + times))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''Tools for testing `python_toolbox.caching`.'''
+
+from python_toolbox.temp_value_setting import TempValueSetter
+from python_toolbox.sleek_reffing import SleekCallArgs
+
+
+class SleekCallArgsCounter(TempValueSetter):
+    '''
+    Temporarily counts the `SleekCallArgs` objects that a module creates.
+
+    Example:
+
+        with SleekCallArgsCounter(caching.decorators) as counter:
+            cached_function(1)
+        assert counter.count == 0
+
+    '''
+
+    def __init__(self, module):
+        '''
+        Construct the `SleekCallArgsCounter`.
+
+        `module` is the module whose `SleekCallArgs` we replace while counting.
+        '''
+        self.count = 0
+        '''The number of `SleekCallArgs` objects that were created.'''
+
+        def create_sleek_call_args(*args, **kwargs):
+            self.count += 1
+            return SleekCallArgs(*args, **kwargs)
+
+        TempValueSetter.__init__(self, (module, 'SleekCallArgs'),
+                                 create_sleek_call_args)
@@ -0,0 +1,98 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''Testing module for `python_toolbox.caching.BoundedCache`.'''
+
+import sys
+import threading
+
+from python_toolbox import cute_testing
+from python_toolbox import temp_file_tools
+
+from python_toolbox.caching import BoundedCache
+
+
+def test_max_size():
+    '''Test that `BoundedCache` evicts least recently used entries.'''
+    bounded_cache = BoundedCache(max_size=3)
+    for i in range(3):
+        bounded_cache[i] = str(i)
+    assert bounded_cache[0] == '0'
+    bounded_cache[3] = '3'
+    assert sorted(bounded_cache) == [0, 2, 3]
+    assert 1 not in bounded_cache
+    with cute_testing.RaiseAssertor(KeyError):
+        bounded_cache[1]
+    assert (bounded_cache.hits, bounded_cache.misses,
+            bounded_cache.evictions) == (1, 1, 1)
+    bounded_cache[2] = 'two'
+    bounded_cache[4] = '4'
+    assert sorted(bounded_cache.items()) == [(2, 'two'), (3, '3'), (4, '4')]
+    
+    bounded_cache.clear()
+    assert len(bounded_cache) == 0
+    assert bounded_cache.info()['hits'] == 1
+    
+    
+def test_max_bytes():
+    '''Test that `BoundedCache` keeps the total size under `max_bytes`.'''
+    bounded_cache = BoundedCache(max_bytes=100,
+                                 get_size=lambda key, value: len(value))
+    bounded_cache['a'] = 'x' * 60
+    bounded_cache['b'] = 'y' * 30
+    assert bounded_cache.n_bytes == 90
+    bounded_cache['c'] = 'z' * 30
+    assert sorted(bounded_cache) == ['b', 'c']
+    assert bounded_cache.n_bytes == 60
+    bounded_cache['d'] = 'w' * 200
+    assert len(bounded_cache) == 0
+    assert bounded_cache.n_bytes == 0
+    del bounded_cache
+    
+    bounded_cache = BoundedCache(max_bytes=10 ** 6)
+    for i in range(10 ** 4):
+        bounded_cache[(i, str(i))] = i
+    assert 0 < len(bounded_cache) < 10 ** 4
+    assert bounded_cache.n_bytes <= 10 ** 6
+    
+    
+def test_save_and_load():
+    '''Test saving a `BoundedCache` to a file and loading it back.'''
+    bounded_cache = BoundedCache(max_size=10)
+    for i in range(5):
+        bounded_cache[(i, 'meow')] = i ** 2
+    bounded_cache[(0, 'meow')]
+    with temp_file_tools.create_temp_folder() as temp_folder:
+        path = temp_folder / 'cache'
+        bounded_cache.save(path)
+        other_bounded_cache = BoundedCache(max_size=3)
+        other_bounded_cache.load(path)
+    assert other_bounded_cache.snapshot() == [
+        ((3, 'meow'), 9), ((4, 'meow'), 16), ((0, 'meow'), 0)
+    ]
+    
+    
+def test_threads():
+    '''Test using a `BoundedCache` from multiple threads at the same time.'''
+    bounded_cache = BoundedCache(max_size=3, max_bytes=10 ** 6)
+    def set_items():
+        for i in range(10 ** 4):
+            bounded_cache[i % 5] = i
+            bounded_cache.get(i % 7)
+    threads = [threading.Thread(target=set_items) for _ in range(8)]
+    old_switch_interval = sys.getswitchinterval()
+    # Switching threads as often as possible, to make races likely:
+    sys.setswitchinterval(1e-6)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(old_switch_interval)
+    assert len(bounded_cache) == 3
+    assert bounded_cache.n_bytes == sum(
+        bounded_cache.get_size(key, value)
+        for key, value in bounded_cache.items()
+    )
+    assert bounded_cache.hits + bounded_cache.misses == 8 * 10 ** 4
@@ -4,10 +4,18 @@
 '''Testing module for `python_toolbox.caching.cache`.'''
 
 
+import array
+import asyncio
+import multiprocessing
+import os
 import datetime as datetime_module
 import re
 import weakref
+import inspect
+import threading
+import time
 
+import nose
 import nose.tools
 
 from python_toolbox import caching
@@ -16,6 +24,10 @@ from python_toolbox import misc_tools
 from python_toolbox import temp_value_setting
 from python_toolbox import cute_testing
 from python_toolbox import gc_tools
+from python_toolbox import future_tools
+from python_toolbox import temp_file_tools
+
+from .shared import SleekCallArgsCounter
 
 
 @misc_tools.set_attributes(i=0)
@@ -232,4 +244,480 @@ def test_time_to_keep():
         fixed_time += datetime_module.timedelta(days=1000)
         assert list(map(f, 'abcdef')) == [13, 14, 15, 16, 17, 18]
         assert f(a='d', b='meow') == 19
-        
\ No newline at end of file
+        
+        
+def test_time_to_keep_with_max_size():
+    counting_func.i = 0
+    f = cache(max_size=3, time_to_keep={'days': 10})(counting_func)
+    
+    fixed_time = datetime_module.datetime.now()
+    def _mock_now():
+        return fixed_time
+    
+    with temp_value_setting.TempValueSetter(
+                                  (caching.decorators, '_get_now'), _mock_now):
+        assert list(map(f, 'abc')) == [0, 1, 2]
+        fixed_time += datetime_module.timedelta(days=5)
+        assert f('a') == 0
+        assert f('d') == 3 # Throwing away `'b'`, the least recently used.
+        assert list(map(f, 'acd')) == [0, 2, 3]
+        assert f('b') == 4
+        fixed_time += datetime_module.timedelta(days=6)
+        # `'a'` was thrown away and `'c'` expired, `'d'` and `'b'` remain:
+        assert list(map(f, 'dbac')) == [3, 4, 5, 6]
+        fixed_time += datetime_module.timedelta(days=100)
+        assert list(map(f, 'abc')) == [7, 8, 9]
+        
+        
+def test_time_to_keep_expiry_queue():
+    '''Test that the expiry queue doesn't grow with stale entries.'''
+    f = cache(max_size=10, time_to_keep={'days': 10})(counting_func)
+    cached = inspect.getclosurevars(f.cache_clear).nonlocals['cached']
+    for i in range(1000):
+        f(i)
+    assert len(cached._cache) == 10
+    assert len(cached._expiry_queue) <= 2 * 10 + 16
+    f.cache_clear()
+    assert not cached._cache
+    assert not cached._expiry_queue
+                
+        
+def test_fast_path():
+    '''Test that simple arguments are used as keys without sleekreffing.'''
+    f = cache()(counting_func)
+    g = cache(max_size=10)(counting_func)
+    for cached_function in (f, g):
+        cache_dict = inspect.getclosurevars(
+            cached_function.cache_clear
+        ).nonlocals['cached']._cache
+        assert cached_function(1) == cached_function(1, 2) == \
+                                                          cached_function(1)
+        assert cached_function('meow', (1, 2.5, None)) == \
+                                      cached_function('meow', (1, 2.5, None))
+        assert all(type(key) is tuple for key in cache_dict)
+        
+        # An unhashable tuple or a weakreffable argument take the slow path:
+        assert cached_function((1, [2])) == cached_function((1, [2]))
+        class A: pass
+        a = A()
+        assert cached_function(a) == cached_function(a)
+        assert cached_function(b=7) == cached_function(1, 7)
+        assert sum(type(key) is not tuple for key in cache_dict) == 2
+        assert cached_function(meow=1) == cached_function(meow=1)
+        assert sum(type(key) is not tuple for key in cache_dict) == 3
+        
+    zero_argument_function = cache()(lambda: object())
+    assert zero_argument_function() is zero_argument_function()
+    
+    
+def test_zero_arguments():
+    '''Test caching functions that don't take any arguments.'''
+    for cache_kwargs in ({}, {'max_size': 3}, {'thread_safe': True}):
+        @cache(**cache_kwargs)
+        def f():
+            '''Make a new object.'''
+            return object()
+        assert f.__name__ == 'f'
+        assert f.__doc__ == 'Make a new object.'
+        assert f.is_cached
+        assert not inspect.signature(f).parameters
+        thing = f()
+        assert f() is f() is thing
+        assert f.cache_info()['hits'] == 2
+        assert f.cache_info()['misses'] == 1
+        assert f.cache_info()['size'] == 1
+        with cute_testing.RaiseAssertor(TypeError):
+            f(1)
+        f.cache_clear()
+        assert f.cache_info()['size'] == 0
+        other_thing = f()
+        assert other_thing is not thing
+        assert f() is other_thing
+        f.cache_clear(())
+        assert f() is not other_thing
+        assert f.cache_info()['misses'] == 3
+    
+    
+def test_fast_hits():
+    '''Test that hits on simple arguments don't create `SleekCallArgs`.'''
+    def f(a, b=2): return a
+    cached_f = cache()(f)
+    class A: pass
+    a = A()
+    cached_f(1), cached_f(a)
+    with SleekCallArgsCounter(caching.decorators) as counter:
+        for _ in range(10):
+            assert cached_f(1) == cached_f(1, 2) == 1
+        assert counter.count == 0
+        for _ in range(10):
+            assert cached_f(a) is a
+        assert counter.count == 10
+    assert cached_f.cache_info()['hits'] == 30
+    
+    
+def test_thread_safe():
+    '''Test that `thread_safe=True` computes each value once per key.'''
+    n_calls_by_key = {}
+    n_calls_lock = threading.Lock()
+    
+    infinity = float('inf')
+    for max_size, time_to_keep in ((infinity, None), (5, None),
+                                   (infinity, {'days': 1}), (5, {'days': 1})):
+        n_calls_by_key.clear()
+        
+        @cache(max_size=max_size, time_to_keep=time_to_keep,
+               thread_safe=True)
+        def f(x):
+            with n_calls_lock:
+                n_calls_by_key[x] = n_calls_by_key.get(x, 0) + 1
+            time.sleep(0.01)
+            return x * 2
+        
+        keys = [i % 5 for i in range(200)]
+        with future_tools.CuteThreadPoolExecutor(20) as executor:
+            assert tuple(executor.map(f, keys)) == \
+                                                tuple(key * 2 for key in keys)
+        assert n_calls_by_key == dict.fromkeys(range(5), 1)
+        
+        
+def test_thread_safe_different_keys():
+    '''Test that `thread_safe=True` doesn't serialize different keys.'''
+    barrier = threading.Barrier(2, timeout=10)
+    
+    @cache(thread_safe=True)
+    def f(x):
+        # Both calls must be running at the same time to pass the barrier:
+        barrier.wait()
+        return x
+    
+    with future_tools.CuteThreadPoolExecutor(2) as executor:
+        assert tuple(executor.map(f, (1, 2))) == (1, 2)
+        
+        
+def test_thread_safe_exception():
+    '''Test that an exception in a thread-safe cached function propagates.'''
+    @cache(thread_safe=True)
+    def f(x):
+        if x == 0:
+            raise ZeroDivisionError
+        return 1 / x
+    
+    with cute_testing.RaiseAssertor(ZeroDivisionError):
+        f(0)
+    assert f(2) == 0.5
+    cached = inspect.getclosurevars(f.cache_clear).nonlocals['cached']
+    assert list(cached._cache) == [(2,)]
+    
+    
+def test_coroutine_function():
+    '''Test caching a coroutine function, sharing in-flight computations.'''
+    n_calls_by_key = {}
+    
+    @cache(max_size=3)
+    async def f(x):
+        n_calls_by_key[x] = n_calls_by_key.get(x, 0) + 1
+        await asyncio.sleep(0.01)
+        if x is None:
+            raise TypeError
+        return x * 2
+    
+    async def main():
+        results = await asyncio.gather(*(f(i % 3) for i in range(30)))
+        assert results == [i % 3 * 2 for i in range(30)]
+        assert n_calls_by_key == {0: 1, 1: 1, 2: 1}
+        assert await f(2) == 4
+        assert await f(1) == 2
+        assert await f(3) == 6
+        assert n_calls_by_key == {0: 1, 1: 1, 2: 1, 3: 1}
+        assert await f(0) == 0 # Was thrown away because of `max_size`.
+        assert n_calls_by_key == {0: 2, 1: 1, 2: 1, 3: 1}
+        
+        # Failures aren't cached:
+        for i in range(1, 3):
+            with cute_testing.RaiseAssertor(TypeError):
+                await f(None)
+            assert n_calls_by_key[None] == i
+            
+        # A cancelled awaiter doesn't cancel the computation for the others:
+        first_awaiter = asyncio.ensure_future(f(7))
+        second_awaiter = asyncio.ensure_future(f(7))
+        await asyncio.sleep(0)
+        first_awaiter.cancel()
+        assert await second_awaiter == 14
+        assert first_awaiter.cancelled()
+        assert n_calls_by_key[7] == 1
+    
+    event_loop = asyncio.new_event_loop()
+    try:
+        event_loop.run_until_complete(main())
+    finally:
+        event_loop.close()
+    
+    
+def test_coroutine_function_in_different_event_loops():
+    '''Test that results are used in other event loops, but tasks aren't.'''
+    n_calls = []
+    
+    @cache()
+    async def f(x):
+        n_calls.append(x)
+        await asyncio.sleep(0 if x < 10 else 10)
+        return x * 2
+    
+    assert asyncio.iscoroutinefunction(f)
+    # Calling the function doesn't need an event loop, only awaiting it does:
+    coroutine = f(4)
+    for _ in range(5):
+        event_loop = asyncio.new_event_loop()
+        try:
+            assert event_loop.run_until_complete(coroutine) == 8
+            assert event_loop.run_until_complete(f(4)) == 8
+        finally:
+            event_loop.close()
+        coroutine = f(4)
+    coroutine.close()
+    assert n_calls == [4]
+    assert f.cache_info()['hits'] == 9
+    assert f.cache_info()['size'] == 1
+    
+    # An event loop that's closed while computing isn't kept alive:
+    async def start_computing():
+        asyncio.ensure_future(f(10))
+        await asyncio.sleep(0.01)
+    event_loop = asyncio.new_event_loop()
+    event_loop.run_until_complete(start_computing())
+    event_loop.close()
+    event_loop_ref = weakref.ref(event_loop)
+    del event_loop
+    other_event_loop = asyncio.new_event_loop()
+    try:
+        assert other_event_loop.run_until_complete(f(5)) == 10
+    finally:
+        other_event_loop.close()
+    gc_tools.collect()
+    assert event_loop_ref() is None
+    assert n_calls == [4, 10, 5]
+    
+    
+def test_cache_info():
+    fixed_time = datetime_module.datetime.now()
+    def _mock_now():
+        return fixed_time
+    
+    with temp_value_setting.TempValueSetter(
+                                  (caching.decorators, '_get_now'), _mock_now):
+        @cache(max_size=2, time_to_keep={'days': 1})
+        def f(x):
+            return x * 2
+        
+        assert f.cache_info() == {
+            'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0,
+            'compute_time': 0, 'size': 0, 'max_size': 2, 'n_bytes': 0,
+        }
+        assert list(map(f, (1, 2, 1, 3, 1, 2))) == [2, 4, 2, 6, 2, 4]
+        fixed_time += datetime_module.timedelta(days=2)
+        f(4)
+        info = f.cache_info()
+        assert info['hits'] == 2
+        assert info['misses'] == 5
+        assert info['evictions'] == 2
+        assert info['expirations'] == 2
+        assert info['size'] == 1
+        assert info['n_bytes'] > 0
+        assert info['compute_time'] > 0
+        assert caching.get_cache_infos()[f] == f.cache_info()
+        
+        f.cache_clear()
+        assert f.cache_info()['size'] == 0
+        assert f.cache_info()['misses'] == 5
+    
+    
+class _Meow:
+    '''A picklable object whose `repr` doesn't tell its values apart.'''
+    def __init__(self, x):
+        self.x = x
+    def __eq__(self, other):
+        return type(other) is _Meow and other.x == self.x
+    def __hash__(self):
+        return hash(self.x)
+    def __repr__(self):
+        return '_Meow()'
+    
+    
+def _create_stored_function(path, n_calls):
+    @cache(max_size=2, store=path)
+    def f(x, y=1):
+        n_calls.append(x)
+        return [x] * y
+    return f
+    
+    
+def test_store():
+    '''Test that results are saved to the `store` and loaded from it.'''
+    with temp_file_tools.create_temp_folder() as temp_folder:
+        path = temp_folder / 'store'
+        n_calls = []
+        f = _create_stored_function(path, n_calls)
+        assert f(1) == [1]
+        assert f(2, 2) == [2, 2]
+        assert f(3) == [3]
+        assert f(1) == [1] # Thrown away from memory, but loaded from disk.
+        assert n_calls == [1, 2, 3]
+        assert f.cache_info()['disk_hits'] == 1
+        assert f.cache_info()['store_size'] == 3
+        
+        # Calls with arguments that don't have a stable key aren't stored:
+        assert f((1, [2])) == [(1, [2])]
+        assert f.cache_info()['store_size'] == 3
+        
+        # Including tuples of objects whose `repr` doesn't identify them:
+        for i in range(3):
+            assert f((_Meow(i),)) == [(_Meow(i),)]
+        assert f.cache_info()['store_size'] == 3
+        assert f.cache_info()['disk_hits'] == 1
+        
+        # Like restarting the process:
+        other_n_calls = []
+        g = _create_stored_function(path, other_n_calls)
+        assert g(1) == [1]
+        assert g(2, y=2) == [2, 2]
+        assert g(3) == [3]
+        assert g(4) == [4]
+        assert other_n_calls == [4]
+        assert g.cache_info()['disk_hits'] == 3
+        
+        g.cache_clear()
+        assert g(1) == [1]
+        assert other_n_calls == [4, 1]
+        
+        with cute_testing.RaiseAssertor(TypeError):
+            cache(max_bytes=1000)
+        with cute_testing.RaiseAssertor(TypeError, 'time_to_keep'):
+            cache(store=path, time_to_keep={'days': 1})
+        with cute_testing.RaiseAssertor(TypeError, 'coroutine'):
+            @cache(store=path)
+            async def h(x):
+                return x
+    
+    
+def _get_number_and_pid(x):
+    return (x, os.getpid())
+
+# Set by `test_shared` before the worker processes are forked:
+_shared_function = None
+
+def _call_shared_function(x):
+    return _shared_function(x)
+    
+    
+def test_shared():
+    '''Test that worker processes use results from a `shared` cache.'''
+    global _shared_function
+    if multiprocessing.get_start_method() != 'fork':
+        raise nose.SkipTest("Worker processes don't get the cached function.")
+    shared_cache = caching.create_shared_cache(max_size=20)
+    _shared_function = cache(shared=shared_cache)(_get_number_and_pid)
+    try:
+        # Computing some of the values in this process:
+        for i in range(10):
+            assert _shared_function(i) == (i, os.getpid())
+        assert len(shared_cache) == 10
+        
+        with future_tools.CuteProcessPoolExecutor(3) as executor:
+            results = tuple(executor.map(_call_shared_function, range(30)))
+        assert results[:10] == tuple((i, os.getpid()) for i in range(10))
+        assert all(number == i and pid != os.getpid() for i, (number, pid)
+                   in enumerate(results[10:], start=10))
+        
+        # New worker processes, which don't have these results in memory,
+        # get the ones that the previous workers computed:
+        with future_tools.CuteProcessPoolExecutor(3) as executor:
+            other_results = tuple(executor.map(_call_shared_function,
+                                               range(10, 30)))
+            other_pids = set(executor.map(_get_pid, range(30)))
+        assert other_results == results[10:]
+        assert not other_pids & {pid for _, pid in results}
+        
+        # The size limit is enforced on the shared cache as a whole:
+        assert len(shared_cache) == 20
+        assert shared_cache.info()['evictions'] == 10
+        
+        _shared_function.cache_clear()
+        assert len(shared_cache) == 0
+        
+        with cute_testing.RaiseAssertor(TypeError, 'time_to_keep'):
+            cache(shared=shared_cache, time_to_keep={'days': 1})
+        with cute_testing.RaiseAssertor(TypeError, 'not both'):
+            cache(shared=shared_cache, store='meow')
+        with cute_testing.RaiseAssertor(TypeError, 'coroutine'):
+            @cache(shared=shared_cache)
+            async def f(x):
+                return x
+    finally:
+        _shared_function = None
+    
+    
+def _get_pid(_):
+    return os.getpid()
+
+
+def _call_shared_function_many_times(i):
+    return [_shared_function(j % 7)[0] for j in range(i, i + 200)]
+
+
+def test_shared_concurrently():
+    '''Test a `shared` cache that many processes use at the same time.'''
+    global _shared_function
+    if multiprocessing.get_start_method() != 'fork':
+        raise nose.SkipTest("Worker processes don't get the cached function.")
+    shared_cache = caching.create_shared_cache(max_size=3)
+    _shared_function = cache(max_size=1, shared=shared_cache)(
+        _get_number_and_pid
+    )
+    try:
+        with future_tools.CuteProcessPoolExecutor(4) as executor:
+            results = tuple(executor.map(_call_shared_function_many_times,
+                                         range(20)))
+        assert results == tuple([j % 7 for j in range(i, i + 200)]
+                                for i in range(20))
+        # The in-memory caches hold only the last result, so almost every
+        # call went to the shared cache:
+        info = shared_cache.info()
+        assert 19 * 200 < info['hits'] + info['misses'] <= 20 * 200
+        assert info['hits'] > 0
+        assert len(shared_cache) == info['size'] == 3
+    finally:
+        _shared_function = None
+    
+    
+def test_buffer_arguments():
+    '''Test that equal buffer arguments are cache hits.'''
+    f = cache()(counting_func)
+    first_array, second_array = (array.array('d', range(10 ** 5))
+                                 for _ in range(2))
+    assert f(first_array) == f(second_array)
+    assert f(bytearray(b'meow')) == f(bytearray(b'meow'))
+    assert f(bytearray(b'meow')) != f(bytearray(b'woof'))
+    
+    
+class _ArrayLike(array.array):
+    '''An array whose `__eq__` works elementwise, like NumPy's `ndarray`.'''
+    def __eq__(self, other):
+        return _ElementwiseResult(x == y for x, y in zip(self, other))
+    __hash__ = None
+    
+    
+class _ElementwiseResult(list):
+    def __bool__(self):
+        raise ValueError('The truth value of an array with more than one '
+                         'element is ambiguous.')
+    
+    
+def test_array_like_arguments():
+    '''Test that buffer arguments aren't compared with their `__eq__`.'''
+    f = cache()(counting_func)
+    first_array = _ArrayLike('d', (1.0, 2.0))
+    assert f(first_array) == f(_ArrayLike('d', (1.0, 2.0)))
+    assert f([first_array]) == f([_ArrayLike('d', (1.0, 2.0))])
+    assert f(first_array) != f(_ArrayLike('d', (1.0, 3.0)))
+    assert f(first_array) != f(_ArrayLike('f', (1.0, 2.0)))
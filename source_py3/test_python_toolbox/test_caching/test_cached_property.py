@@ -3,10 +3,19 @@
 
 '''Testing module for `python_toolbox.caching.CachedProperty`.'''
 
+import asyncio
+import threading
+import time
+
 import nose
 
+from python_toolbox import caching
+
 from python_toolbox import context_management
 from python_toolbox import misc_tools
+from python_toolbox import cute_testing
+from python_toolbox import future_tools
+from python_toolbox import gc_tools
 
 from python_toolbox.caching import cache, CachedType, CachedProperty
 from python_toolbox.context_management import (as_idempotent, as_reentrant,
@@ -207,4 +216,158 @@ def test_force_value_not_getter():
         
     a = A()
     assert a.personality == counting_func == a.personality == counting_func
-    
\ No newline at end of file
+    
+    
+def test_count_statistics():
+    class A:
+        personality = CachedProperty(lambda self: 'Nice person',
+                                     count_statistics=True)
+        age = CachedProperty(lambda self: 7)
+        
+    a_0, a_1 = A(), A()
+    assert A.personality.cache_info() == {'misses': 0, 'compute_time': 0}
+    assert a_0.personality == a_0.personality == a_1.personality == \
+                                                                 'Nice person'
+    assert a_0.age == 7
+    info = A.personality.cache_info()
+    assert info['misses'] == 2
+    assert info['compute_time'] > 0
+    assert caching.get_cache_infos()[A.personality] == info
+    
+    with cute_testing.RaiseAssertor(Exception):
+        A.age.cache_info()
+    assert A.age not in caching.get_cache_infos()
+    
+    
+def test_thread_safe():
+    '''Test that `thread_safe=True` calls the getter once per object.'''
+    n_calls = []
+    n_calls_lock = threading.Lock()
+    def get_personality(self):
+        with n_calls_lock:
+            n_calls.append(self)
+        time.sleep(0.01)
+        return id(self)
+        
+    class A:
+        personality = CachedProperty(get_personality, thread_safe=True)
+        
+    things = [A() for _ in range(40)] * 5
+    with future_tools.CuteThreadPoolExecutor(20) as executor:
+        personalities = tuple(
+            executor.map(lambda thing: thing.personality, things)
+        )
+    assert personalities == tuple(map(id, things))
+    assert len(n_calls) == 40
+    
+    
+def test_async():
+    '''Test a `CachedProperty` whose getter is a coroutine function.'''
+    n_calls = []
+    
+    class A:
+        @CachedProperty
+        async def personality(self):
+            n_calls.append(self)
+            await asyncio.sleep(0.01)
+            if len(n_calls) == 1:
+                raise ZeroDivisionError
+            return 'Nice person'
+        
+    async def main():
+        a = A()
+        with cute_testing.RaiseAssertor(ZeroDivisionError):
+            await a.personality
+        results = await asyncio.gather(a.personality, a.personality)
+        assert results == ['Nice person', 'Nice person']
+        assert await a.personality == 'Nice person'
+        assert len(n_calls) == 2
+        
+    asyncio.get_event_loop().run_until_complete(main())
+    
+    
+def test_async_concurrently():
+    '''Test awaiting an async `CachedProperty` many times at once.'''
+    n_calls = []
+    
+    class A:
+        @CachedProperty
+        async def personality(self):
+            n_calls.append(self)
+            await asyncio.sleep(0.01)
+            return id(self)
+        
+        thread_safe_personality = CachedProperty(personality.getter,
+                                                 thread_safe=True)
+        
+    things = [A() for _ in range(3)]
+    
+    async def main():
+        return await asyncio.gather(
+            *(getattr(thing, name) for thing in things for name in
+              ('personality', 'thread_safe_personality') for _ in range(4))
+        )
+    
+    event_loop = asyncio.new_event_loop()
+    try:
+        results = event_loop.run_until_complete(main())
+    finally:
+        event_loop.close()
+    assert results == [id(thing) for thing in things for _ in range(8)]
+    # Once for each object and property:
+    assert len(n_calls) == 6
+    assert all(n_calls.count(thing) == 2 for thing in things)
+    
+    
+def test_async_in_different_event_loops():
+    '''Test that the async getter runs in the event loop that awaits it.'''
+    n_calls = []
+    
+    class A:
+        @CachedProperty
+        async def personality(self):
+            n_calls.append(self)
+            await asyncio.sleep(0)
+            return 'Nice person'
+        
+    a = A()
+    # Getting the property doesn't need an event loop, only awaiting it does:
+    awaitable = a.personality
+    for _ in range(2):
+        event_loop = asyncio.new_event_loop()
+        try:
+            assert event_loop.run_until_complete(awaitable) == 'Nice person'
+            assert event_loop.run_until_complete(a.personality) == \
+                                                                  'Nice person'
+        finally:
+            event_loop.close()
+        awaitable = a.personality
+    awaitable.close()
+    assert n_calls == [a]
+    
+    
+def test_slots():
+    '''Test `CachedProperty` on objects of classes with `__slots__`.'''
+    class A:
+        __slots__ = ('__weakref__',)
+        personality = CachedProperty(counting_func, thread_safe=True)
+        
+        def __eq__(self, other):
+            return True
+        
+        __hash__ = None
+        
+    a1, a2 = A(), A()
+    assert a1.personality == a1.personality == a2.personality - 1 == \
+                                                        a2.personality - 1
+    assert len(A.personality._external_values) == 2
+    del a1
+    gc_tools.collect()
+    assert len(A.personality._external_values) == 1
+    
+    class B:
+        __slots__ = ()
+        personality = CachedProperty(counting_func)
+        
+    with cute_testing.RaiseAssertor(TypeError, text='__weakref__'):
+        B().personality
@@ -3,8 +3,13 @@
 
 '''Testing module for `python_toolbox.caching.CachedType`.'''
 
+from python_toolbox import caching
+from python_toolbox import cute_testing
+from python_toolbox import gc_tools
 from python_toolbox.caching import CachedType
 
+from .shared import SleekCallArgsCounter
+
         
 def test():
     '''Test basic workings of `CachedType`.'''
@@ -14,4 +19,99 @@ def test():
         
     assert A() is A(1) is A(b=2) is A(1, 2) is A(1, b=2)
     assert A() is not A(3) is not A(b=7) is not A(1, 2, 'meow') is not A(x=9)
-    
\ No newline at end of file
+    
+    
+def test_cache_info():
+    class A(metaclass=CachedType):
+        def __init__(self, a=1, b=2):
+            pass
+        
+    assert A.cache_info() == {'hits': 0, 'misses': 0, 'size': 0}
+    A(), A(1), A(2), A(b=2)
+    assert A.cache_info() == {'hits': 2, 'misses': 2, 'size': 2}
+    assert caching.get_cache_infos()[A] == A.cache_info()
+    
+    
+def test_fast_path():
+    '''Test instances whose arguments are all of simple types.'''
+    class A(metaclass=CachedType):
+        def __init__(self, a, b=2, c=(3, 'meow')):
+            self.a, self.b, self.c = a, b, c
+            
+    assert A(1) is A(1, 2) is A(a=1) is A(c=(3, 'meow'), a=1) is \
+                                                          A(1, 2, (3, 'meow'))
+    assert A(1) is not A(2) is not A(1, c=None) is not A([1])
+    assert A([1]).a == [1]
+    assert A.cache_info()['size'] == 4
+    a = A(1, 7)
+    assert (a.a, a.b, a.c) == (1, 7, (3, 'meow'))
+    with cute_testing.RaiseAssertor(TypeError):
+        A()
+    with cute_testing.RaiseAssertor(TypeError):
+        A(1, 2, 3, 4)
+    with cute_testing.RaiseAssertor(TypeError):
+        A(1, a=1)
+    with cute_testing.RaiseAssertor(TypeError):
+        A(1, d=1)
+        
+    # Replacing `__init__` takes effect:
+    def __init__(self, a, b=3, c=None):
+        self.a, self.b, self.c = a, b, c
+    A.__init__ = __init__
+    assert A(5) is A(5, 3) is not A(5, 2)
+    
+    
+def test_weak_values():
+    '''Test that unused instances are collected with `weak_values=True`.'''
+    class A(metaclass=CachedType, weak_values=True):
+        def __init__(self, a=1):
+            pass
+        
+    a = A(1)
+    assert a is A() is A(1)
+    assert A(2) is not a
+    gc_tools.collect()
+    assert A.cache_info()['size'] == 1
+    del a
+    gc_tools.collect()
+    assert A.cache_info()['size'] == 0
+    
+    with cute_testing.RaiseAssertor(TypeError):
+        class B(metaclass=CachedType, weak_values=True, max_size=3):
+            pass
+    
+    
+def test_max_size():
+    '''Test that only the `max_size` recently used instances are kept.'''
+    class A(metaclass=CachedType, max_size=3):
+        def __init__(self, a):
+            pass
+        
+    a0, a1, a2 = A(0), A(1), A(2)
+    assert A(0) is a0
+    a3 = A(3)
+    assert A.cache_info()['size'] == 3
+    assert A(0) is a0
+    assert A(2) is a2
+    assert A(1) is not a1
+    assert A.cache_info() == {'hits': 3, 'misses': 5, 'size': 3}
+    
+    
+def test_fast_path_without_sleek_call_args():
+    '''Test that simple arguments don't create `SleekCallArgs`.'''
+    class A(metaclass=CachedType):
+        def __init__(self, a, b=2):
+            pass
+    class B:
+        pass
+    b = B()
+    A(1), A(b)
+    with SleekCallArgsCounter(caching.cached_type) as counter:
+        for i in range(10):
+            assert A(1) is A(1, 2) is A(a=1) is A(1, b=2)
+            A(i + 100) # A miss.
+        assert counter.count == 0
+        for _ in range(10):
+            assert A(b) is A(b)
+        assert counter.count == 20
+    assert A.cache_info()['hits'] == 60
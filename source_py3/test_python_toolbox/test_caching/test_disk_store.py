@@ -0,0 +1,77 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''Testing module for `python_toolbox.caching.DiskStore`.'''
+
+from python_toolbox import cute_testing
+from python_toolbox import temp_file_tools
+
+from python_toolbox.caching import DiskStore
+
+
+def test():
+    '''Test that values survive reopening the store.'''
+    with temp_file_tools.create_temp_folder() as temp_folder:
+        path = temp_folder / 'store'
+        disk_store = DiskStore(path)
+        assert len(disk_store) == 0
+        disk_store[(1, 'meow')] = {'a': [1, 2]}
+        disk_store['b'] = 2
+        disk_store['b'] = 3
+        disk_store[1.5] = None
+        del disk_store[1.5]
+        assert disk_store[(1, 'meow')] == {'a': [1, 2]}
+        assert disk_store['b'] == 3
+        assert len(disk_store) == 2
+        assert 1.5 not in disk_store
+        with cute_testing.RaiseAssertor(KeyError):
+            disk_store[1.5]
+        # `1` and `'1'` have different keys:
+        with cute_testing.RaiseAssertor(KeyError):
+            disk_store["b'"]
+        disk_store.close()
+
+        other_disk_store = DiskStore(path)
+        assert len(other_disk_store) == 2
+        assert other_disk_store[(1, 'meow')] == {'a': [1, 2]}
+        assert other_disk_store['b'] == 3
+        assert 1.5 not in other_disk_store
+        other_disk_store.clear()
+        assert len(other_disk_store) == 0
+        other_disk_store.close()
+        assert len(DiskStore(path)) == 0
+
+
+def test_cut_off_record():
+    '''Test that a record that was cut off by a crash is thrown away.'''
+    with temp_file_tools.create_temp_folder() as temp_folder:
+        path = temp_folder / 'store'
+        disk_store = DiskStore(path)
+        disk_store[1] = 'meow'
+        disk_store[2] = 'frrr'
+        disk_store.close()
+        with open(str(path), 'r+b') as file:
+            file.truncate(path.stat().st_size - 3)
+        other_disk_store = DiskStore(path)
+        assert other_disk_store[1] == 'meow'
+        assert 2 not in other_disk_store
+        other_disk_store[3] = 'woof'
+        other_disk_store.close()
+        assert DiskStore(path)[3] == 'woof'
+
+
+def test_max_bytes():
+    '''Test that the store keeps the most recent values within `max_bytes`.'''
+    with temp_file_tools.create_temp_folder() as temp_folder:
+        path = temp_folder / 'store'
+        disk_store = DiskStore(path, max_bytes=2000)
+        for i in range(100):
+            disk_store[i] = 'x' * i
+            assert disk_store.n_bytes <= 2000
+            assert path.stat().st_size == disk_store.n_bytes
+        assert 0 < len(disk_store) < 100
+        assert 99 in disk_store
+        assert 0 not in disk_store
+        for i in range(100):
+            if i in disk_store:
+                assert disk_store[i] == 'x' * i
@@ -3,9 +3,12 @@
 
 '''Testing module for `python_toolbox.abc_tools.AbstractStaticMethod`.'''
 
+import array
 import copy
 
-from python_toolbox.cheat_hashing import cheat_hash
+from python_toolbox import temp_value_setting
+from python_toolbox.cheat_hashing import cheat_hash, fingerprint_buffer
+from python_toolbox.cheat_hashing.cheat_hash import dispatch_map
 
 
 def test_cheat_hash():
@@ -31,4 +34,103 @@ def test_cheat_hash():
     for thing, thing_copy in zip(things, things_copy):
         assert cheat_hash(thing) == cheat_hash(thing) == \
                cheat_hash(thing_copy) == cheat_hash(thing_copy)
-        
\ No newline at end of file
+        
+        
+def test_order_of_items():
+    '''Test that sets and dicts with the same items have the same hash.'''
+    for n_items in (3, 100):
+        items = [(i, [i]) for i in range(n_items)]
+        assert cheat_hash(dict(items)) == cheat_hash(dict(reversed(items)))
+        numbers = list(range(n_items))
+        assert cheat_hash(set(numbers)) == \
+                                       cheat_hash(set(reversed(numbers)) | {0})
+        assert cheat_hash(numbers) != cheat_hash(numbers[::-1])
+        
+        
+def test_big_and_deep():
+    '''Test big lists and nesting deeper than the recursion limit.'''
+    big_list = list(range(10000)) + [[1]] + list(range(10000))
+    assert cheat_hash(big_list) == cheat_hash(copy.deepcopy(big_list))
+    assert cheat_hash(big_list) != cheat_hash(big_list[:-1])
+    assert cheat_hash(big_list, max_n_items=100) == \
+                              cheat_hash(copy.copy(big_list), max_n_items=100)
+    
+    def create_deep_list():
+        deep_list = current_list = []
+        for i in range(10 ** 5):
+            current_list.append([i])
+            current_list = current_list[-1]
+        return deep_list
+    assert cheat_hash(create_deep_list()) == cheat_hash(create_deep_list())
+    
+    recursive_list = [1, {2: 3}]
+    recursive_list.append(recursive_list)
+    recursive_list[1][4] = recursive_list
+    assert cheat_hash(recursive_list) == cheat_hash(recursive_list)
+    
+    
+def test_small_containers():
+    '''Test that small containers are hashed the same way as big ones.'''
+    recursive_list = [1]
+    recursive_list.append(recursive_list)
+    things = (
+        [1, [2, 3], 'a'], {'a': [1], 'b': 2}, {1, 2}, [],
+        ([1], {2: [3]}, bytearray(b'ab')), [[[[[[[[[[[1]]]]]]]]]]],
+        recursive_list, [[i] for i in range(300)],
+        [list(range(40)), {i: [i] for i in range(40)}, set(range(40))],
+    )
+    def get_hashes():
+        return [cheat_hash(thing, max_n_items=max_n_items) for thing in things
+                for max_n_items in (None, 3)]
+    hashes = get_hashes()
+    # With a negative `_max_small_depth`, every container is hashed using a
+    # stack of hashers:
+    with temp_value_setting.TempValueSetter(
+                             (cheat_hash.__globals__, '_max_small_depth'), -1):
+        assert get_hashes() == hashes
+    
+    
+def test_dispatch_map():
+    '''Test that changing `dispatch_map` affects types that were hashed.'''
+    class A(list):
+        pass
+    assert cheat_hash(A([1, 2])) == cheat_hash([1, 2])
+    with temp_value_setting.TempValueSetter((dispatch_map, A),
+                                            lambda thing: 7):
+        assert cheat_hash(A([1, 2])) == 7
+        assert cheat_hash([A([1, 2])]) == cheat_hash([7])
+    assert A not in dispatch_map
+    assert cheat_hash(A([1, 2])) == cheat_hash([1, 2])
+    
+    
+def test_buffers():
+    '''Test that buffers are hashed by their contents.'''
+    create_buffer_functions = [
+        lambda: bytearray(b'meow' * 1000),
+        lambda: array.array('d', range(1000)),
+        lambda: array.array('i', range(1000)),
+        lambda: memoryview(bytearray(b'frrr')),
+        lambda: memoryview(bytearray(range(100))).cast('B', (10, 10)),
+        lambda: memoryview(bytearray(range(100)))[::3],
+    ]
+    buffers = []
+    for create_buffer in create_buffer_functions:
+        buffer, other_buffer = create_buffer(), create_buffer()
+        assert cheat_hash(buffer) == cheat_hash(other_buffer)
+        assert cheat_hash([1, buffer]) == cheat_hash([1, other_buffer])
+        assert cheat_hash(buffer, max_n_items=10) == \
+                                       cheat_hash(other_buffer, max_n_items=10)
+        buffers.append(buffer)
+        
+    assert len(set(map(cheat_hash, buffers))) == len(buffers)
+    assert cheat_hash(bytearray(b'meow')) != cheat_hash(bytearray(b'woof'))
+    assert cheat_hash(array.array('i', [1, 2])) != \
+                                              cheat_hash(array.array('i', [1]))
+    
+    # Bytes are hashable, but they can still be fingerprinted:
+    assert fingerprint_buffer(b'meow') == fingerprint_buffer(b'meow')
+    assert fingerprint_buffer(b'meow') != \
+                                        fingerprint_buffer(bytearray(b'meow'))
+    big_bytes = bytes(range(256)) * 1000
+    assert fingerprint_buffer(big_bytes, max_n_items=100) != \
+                                                  fingerprint_buffer(big_bytes)
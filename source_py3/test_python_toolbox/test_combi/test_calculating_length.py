@@ -13,4 +13,52 @@ def test_recurrent_comb_space_length():
     assert calculate_length_of_recurrent_comb_space(3, (3, 1, 1)) == 4
     assert calculate_length_of_recurrent_comb_space(2, (3, 2, 2, 1)) == 9
     assert calculate_length_of_recurrent_comb_space(3, (3, 2, 2, 1)) == 14
-    
\ No newline at end of file
+        
+    
+def test_bounded_caches():
+    from python_toolbox.combi.perming import calculating_length
+    from python_toolbox import caching
+    old_caches = (calculating_length._length_of_recurrent_perm_space_cache,
+                  calculating_length._length_of_recurrent_comb_space_cache)
+    try:
+        # With tiny caches, solutions are evicted while they're computed:
+        calculating_length._length_of_recurrent_perm_space_cache = \
+                                             caching.BoundedCache(max_size=1)
+        calculating_length._length_of_recurrent_comb_space_cache = \
+                                             caching.BoundedCache(max_size=1)
+        assert calculate_length_of_recurrent_perm_space(3, (3, 2, 2, 1)) == 52
+        assert calculate_length_of_recurrent_comb_space(3, (3, 2, 2, 1)) == 14
+        assert calculate_length_of_recurrent_perm_space(5, (3, 3, 2, 1)) == \
+                                                                           520
+        assert len(
+            calculating_length._length_of_recurrent_perm_space_cache
+        ) == 1
+        assert calculating_length._length_of_recurrent_perm_space_cache. \
+                                                              evictions > 0
+    finally:
+        (calculating_length._length_of_recurrent_perm_space_cache,
+         calculating_length._length_of_recurrent_comb_space_cache) = \
+                                                                 old_caches
+
+
+def test_canonical_items():
+    from python_toolbox import nifty_collections
+    import itertools
+    fbb = nifty_collections.FrozenBagBag({2: 3, 3: 10, 1: 1})
+    assert fbb.canonical_items == ((1, 1), (2, 3), (3, 10))
+    sub_fbbs = fbb.get_sub_fbbs_for_one_key_removed()
+    assert sub_fbbs == nifty_collections.FrozenBag({
+        nifty_collections.FrozenBagBag({2: 3, 3: 10}): 1,
+        nifty_collections.FrozenBagBag({1: 2, 2: 2, 3: 10}): 3,
+        nifty_collections.FrozenBagBag({1: 1, 2: 4, 3: 9}): 10,
+    })
+    assert dict(
+        fbb.iterate_sub_canonical_items_for_one_key_removed(
+                                                          fbb.canonical_items)
+    ) == {sub_fbb.canonical_items: factor
+          for sub_fbb, factor in sub_fbbs.items()}
+
+    sequence = 'aaabbbccdde'
+    assert calculate_length_of_recurrent_perm_space(
+        4, nifty_collections.Bag(sequence).frozen_bag_bag
+    ) == len(set(itertools.permutations(sequence, 4)))
@@ -34,3 +34,16 @@ def test_chain_spaces():
     assert not ChainSpace(())
     
 
+    
+    
+def test_get_many():
+    chain_space = ChainSpace((range(3), 'meow', PermSpace(3),
+                              range(22, 19, -1)))
+    indices = (4, 0, -1, 9, 4, 7)
+    assert chain_space.get_many(indices) == \
+                                      tuple(chain_space[i] for i in indices)
+    with cute_testing.RaiseAssertor(IndexError):
+        chain_space.get_many((0, chain_space.length))
+        
+    map_space = MapSpace(tuple, PermSpace(4))
+    assert map_space.get_many((3, 20)) == ((0, 2, 3, 1), (3, 1, 0, 2))
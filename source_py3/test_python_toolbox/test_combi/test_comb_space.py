@@ -1,6 +1,8 @@
 # Copyright 2009-2017 Ram Rachum.
 # This program is distributed under the MIT license.
 
+import itertools
+
 from python_toolbox import sequence_tools
 from python_toolbox import math_tools
 from python_toolbox import cute_testing
@@ -80,3 +82,29 @@ def test_unrecurrented():
         assert unrecurrented_comb_space.index(comb) == i
         
         
+        
+        
+def test_binomial_table():
+    '''Test that combinations are unranked and ranked without binomial rows.'''
+    all_combs = tuple(itertools.combinations(range(12), 5))
+    math_tools.clear_tables()
+    comb_space = CombSpace(12, 5)
+    for i, comb in enumerate(all_combs):
+        assert tuple(comb_space[i]) == comb
+        assert comb_space.index(comb) == i
+    
+    long_comb_space = CombSpace(5000, 3)
+    for i in (0, 1, 10 ** 6, long_comb_space.length - 1):
+        assert long_comb_space.index(long_comb_space[i]) == i
+    assert tuple(long_comb_space[10 ** 6]) == \
+                 next(itertools.islice(itertools.combinations(range(5000), 3),
+                                       10 ** 6, None))
+    assert repr(math_tools.tables._binomial_table) == \
+                                                '<RowTable: 0/200 rows cached>'
+    
+    big_comb_space = CombSpace(300, 150)
+    for i in (0, 1, 10 ** 80, big_comb_space.length - 1):
+        comb = big_comb_space[i]
+        assert len(comb) == 150
+        assert big_comb_space.index(comb) == i
+    assert tuple(big_comb_space[-1]) == tuple(range(150, 300))
@@ -0,0 +1,44 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+import itertools
+
+from python_toolbox.combi.perming.iterating import *
+
+
+def test_iterate_perm_sequences_from():
+    assert tuple(iterate_perm_sequences_from('abc', 3, 'abc')) == \
+                                    tuple(itertools.permutations('abc', 3))
+    assert tuple(iterate_perm_sequences_from('abc', 3, 'bca')) == \
+                                         (('b', 'c', 'a'), ('c', 'a', 'b'),
+                                          ('c', 'b', 'a'))
+    all_perm_sequences = tuple(itertools.permutations('abcdef', 4))
+    for i in (0, 1, 7, 100, len(all_perm_sequences) - 1):
+        assert tuple(iterate_perm_sequences_from(
+                            'abcdef', 4, all_perm_sequences[i])) == \
+                                                        all_perm_sequences[i:]
+    assert tuple(iterate_perm_sequences_from('abc', 0, ())) == ((),)
+    
+    
+def test_iterate_comb_sequences_from():
+    assert tuple(iterate_comb_sequences_from('abcd', 2, 'bc')) == \
+                                   (('b', 'c'), ('b', 'd'), ('c', 'd'))
+    all_comb_sequences = tuple(itertools.combinations(range(9), 4))
+    for i in (0, 1, 7, 100, len(all_comb_sequences) - 1):
+        assert tuple(iterate_comb_sequences_from(
+                            range(9), 4, all_comb_sequences[i])) == \
+                                                        all_comb_sequences[i:]
+        
+        
+def test_iterate_search_tree_from():
+    # A search tree for binary strings without two consecutive ones:
+    def get_children(depth, state):
+        yield ('0', '0', None)
+        yield ('1', '1', 0 if state == '1' else None)
+    all_leaves = tuple(
+        leaf for leaf in itertools.product('01', repeat=5) if
+                                                   '11' not in ''.join(leaf)
+    )
+    for i in (0, 1, 5, len(all_leaves) - 1):
+        assert tuple(iterate_search_tree_from(all_leaves[i], None,
+                                              get_children)) == all_leaves[i:]
@@ -5,6 +5,7 @@ import pickle
 import itertools
 import functools
 import math
+import array
 
 from python_toolbox import cute_testing
 from python_toolbox import math_tools
@@ -747,4 +748,97 @@ def test_variations_make_unequal():
     
     
     
-    
\ No newline at end of file
+        
+    
+def test_iteration_matches_indexing():
+    perm_spaces = (
+        PermSpace(5), PermSpace('meow', n_elements=2),
+        PermSpace(5, fixed_map={1: 3, 4: 0}), PermSpace(6, degrees=(1, 3)),
+        PermSpace('abcde', degrees=2, fixed_map={0: 'b'}),
+        PermSpace(5, domain='QWERT', fixed_map={'W': 2}),
+        PermSpace('abracab', n_elements=4),
+        PermSpace('aabbc', fixed_map={1: 'b'}), CombSpace(6, 3),
+        CombSpace('abracab', 3), CombSpace('ab' * 10 + 'c', 2),
+    )
+    for perm_space in perm_spaces:
+        for sliced_perm_space in (perm_space, perm_space[3:-4],
+                                  perm_space[7:8], perm_space[5:5]):
+            perms = tuple(sliced_perm_space)
+            assert len(perms) == sliced_perm_space.length
+            assert perms == tuple(sliced_perm_space[i] for i in
+                                  range(sliced_perm_space.length))
+            assert tuple(map(type, perms)) == tuple(
+                type(sliced_perm_space[i]) for i in
+                range(sliced_perm_space.length)
+            )
+    
+    
+def test_iteration_on_huge_space():
+    perm_space = PermSpace(100)
+    first_perms = tuple(itertools.islice(perm_space, 4))
+    assert tuple(map(tuple, first_perms)) == (
+        tuple(range(100)),
+        tuple(range(98)) + (99, 98),
+        tuple(range(97)) + (98, 97, 99),
+        tuple(range(97)) + (98, 99, 97),
+    )
+    sliced_perm_space = perm_space[10 ** 100:10 ** 100 + 50]
+    assert tuple(sliced_perm_space) == tuple(
+        perm_space[10 ** 100 + i] for i in range(50)
+    )
+    
+    comb_space = CombSpace(200, 100)
+    sliced_comb_space = comb_space[10 ** 50: 10 ** 50 + 50]
+    assert tuple(sliced_comb_space) == tuple(
+        comb_space[10 ** 50 + i] for i in range(50)
+    )
+    
+    
+def test_get_many():
+    perm_spaces = (
+        PermSpace(5), PermSpace('meow', n_elements=2),
+        PermSpace(5, fixed_map={1: 3, 4: 0}), PermSpace(6, degrees=(1, 3)),
+        PermSpace('abcde', degrees=2, fixed_map={0: 'b'}),
+        PermSpace(5, domain='QWERT', fixed_map={'W': 2}),
+        PermSpace('abracab', n_elements=4),
+        PermSpace('aabbc', fixed_map={1: 'b'}), CombSpace(6, 3),
+        CombSpace('abracab', 3),
+        PermSpace('aabbccd', n_elements=5, fixed_map={2: 'c', 4: 'a'}),
+    )
+    for perm_space in perm_spaces:
+        for sliced_perm_space in (perm_space, perm_space[2:-2]):
+            length = sliced_perm_space.length
+            assert length
+            indices = (length - 1, 0, 7 % length, -1, 3 % length, 0,
+                       length // 2)
+            perms = sliced_perm_space.get_many(indices)
+            assert perms == tuple(sliced_perm_space[i] for i in indices)
+            assert tuple(map(type, perms)) == \
+                        tuple(type(sliced_perm_space[i]) for i in indices)
+            assert sliced_perm_space.get_many(()) == ()
+            with cute_testing.RaiseAssertor(IndexError):
+                sliced_perm_space.get_many((0, length))
+            with cute_testing.RaiseAssertor(IndexError):
+                sliced_perm_space.get_many((-length - 1,))
+            
+    perm_space = PermSpace('meow')
+    assert perm_space.get_many((0, 7), as_array=True) == \
+                                   array.array('q', (0, 1, 2, 3, 1, 0, 3, 2))
+    perm_space = PermSpace('abracab', n_elements=3)
+    assert tuple(perm_space.get_many((5, 20, -1), as_array=True)) == \
+                                  tuple(itertools.chain.from_iterable(
+            perm_space[i].unrapplied for i in (5, 20, -1)
+        ))
+        
+    
+def test_get_many_on_huge_space():
+    perm_space = PermSpace(100)
+    indices = (10 ** 100, 7, 10 ** 100 + 1, 10 ** 150, 7)
+    assert perm_space.get_many(indices) == \
+                                      tuple(perm_space[i] for i in indices)
+    assert len(perm_space.get_many(indices, as_array=True)) == 500
+    
+    comb_space = CombSpace(200, 100)
+    indices = (10 ** 50, 3, 10 ** 50 + 1, -1)
+    assert comb_space.get_many(indices) == \
+                                      tuple(comb_space[i] for i in indices)
@@ -1,6 +1,8 @@
 # Copyright 2009-2017 Ram Rachum.
 # This program is distributed under the MIT license.
 
+import array
+
 from python_toolbox import cute_testing
 
 from python_toolbox.combi import *
@@ -50,4 +52,19 @@ def test():
                                              ProductSpace((range(4), range(3)))
     assert ProductSpace((range(4), range(3))) != \
                                              ProductSpace((range(3), range(4)))
-    
\ No newline at end of file
+                                                 
+                                             
+def test_get_many():
+    product_space = ProductSpace(('abc', range(4), PermSpace(3)))
+    indices = (10, 0, -1, 5, 10)
+    assert product_space.get_many(indices) == \
+                                    tuple(product_space[i] for i in indices)
+    assert product_space.get_many((10, 0), as_array=True) == \
+                                          array.array('q', (0, 1, 4, 0, 0, 0))
+    with cute_testing.RaiseAssertor(IndexError):
+        product_space.get_many((product_space.length,))
+        
+    # The indices in a huge space don't fit in an array:
+    huge_product_space = ProductSpace((PermSpace(30), 'ab'))
+    assert huge_product_space.get_many((-1, 3), as_array=True) == \
+                         [huge_product_space.sequence_lengths[0] - 1, 1, 1, 1]
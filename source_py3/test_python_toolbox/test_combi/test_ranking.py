@@ -0,0 +1,40 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+from python_toolbox import cute_testing
+
+from python_toolbox.combi import *
+from python_toolbox.combi.perming.ranking import *
+
+
+def test_rank_degreed_perm_sequence():
+    for perm_space in (PermSpace(6, degrees=(1, 3)),
+                       PermSpace(7, degrees=2, fixed_map={1: 3, 5: 5})):
+        for i, perm in enumerate(perm_space):
+            assert rank_degreed_perm_sequence(
+                perm._perm_sequence, perm_space.degrees, perm_space.fixed_map,
+                perm_space._n_cycles_in_fixed_items_of_just_fixed
+            ) == i
+    with cute_testing.RaiseAssertor(ValueError):
+        rank_degreed_perm_sequence((0, 1, 2, 3, 4, 5, 6), (2,), {1: 3}, 0)
+            
+            
+def test_rank_recurrent_perm_sequence():
+    for perm_space in (PermSpace('abracab'), PermSpace('aabbcc', n_elements=4),
+                       PermSpace('abcabc', fixed_map={1: 'a', 4: 'c'}),
+                       CombSpace('abracab', 3), CombSpace('aabbccd', 4)):
+        for i, perm in enumerate(perm_space):
+            assert rank_recurrent_perm_sequence(
+                perm._perm_sequence, perm_space.sequence, perm_space.fixed_map,
+                is_combination=perm_space.is_combination
+            ) == i
+    with cute_testing.RaiseAssertor(ValueError):
+        rank_recurrent_perm_sequence('abcabc', 'abcabc', {1: 'a'})
+    with cute_testing.RaiseAssertor(ValueError):
+        rank_recurrent_perm_sequence('abcabz', 'abcabc', {})
+            
+            
+def test_index_of_big_recurrent_perm_space():
+    perm_space = PermSpace('aabbccddeeffgghhiijj')
+    for i in (0, 1, 10 ** 10, 10 ** 15 + 7, perm_space.length - 1):
+        assert perm_space.index(perm_space[i]) == i
@@ -0,0 +1,52 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+import itertools
+
+from python_toolbox.combi.perming.unranking import *
+
+
+def test_unrank_many_perm_sequences():
+    all_perm_sequences = tuple(itertools.permutations('abcdef', 4))
+    indices = (0, 1, 2, 7, 100, 101, 220, len(all_perm_sequences) - 1)
+    assert unrank_many_perm_sequences('abcdef', 4, indices) == \
+                                   [all_perm_sequences[i] for i in indices]
+    assert unrank_many_perm_sequences('abc', 3, (0, 3, 5)) == \
+                           [('a', 'b', 'c'), ('b', 'c', 'a'), ('c', 'b', 'a')]
+    assert unrank_many_perm_sequences('abc', 0, (0,)) == [()]
+    assert unrank_many_perm_sequences('abc', 2, ()) == []
+    
+    
+def test_unrank_many_comb_sequences():
+    all_comb_sequences = tuple(itertools.combinations(range(9), 4))
+    indices = (0, 1, 7, 8, 100, len(all_comb_sequences) - 1)
+    assert unrank_many_comb_sequences(range(9), 4, indices) == \
+                                   [all_comb_sequences[i] for i in indices]
+    assert unrank_many_comb_sequences('abcd', 2, (0, 2, 5)) == \
+                                          [('a', 'b'), ('a', 'd'), ('c', 'd')]
+    
+    
+def test_unrank_many_in_search_tree():
+    # A search tree for binary strings without two consecutive ones, where the
+    # number of leaves under each node is a Fibonacci number:
+    fibonacci = [1, 2]
+    while len(fibonacci) < 10:
+        fibonacci.append(fibonacci[-1] + fibonacci[-2])
+    n_levels = 6
+    def get_children(depth, state):
+        n_levels_left = n_levels - depth - 1
+        if state == '1':
+            yield ('0', '0', None)
+        else:
+            yield ('0', '0', fibonacci[n_levels_left])
+            yield ('1', '1', fibonacci[n_levels_left - 1] if n_levels_left
+                                                                     else 1)
+    all_leaves = tuple(
+        leaf for leaf in itertools.product('01', repeat=n_levels) if
+                                                   '11' not in ''.join(leaf)
+    )
+    assert len(all_leaves) == fibonacci[n_levels]
+    indices = (0, 1, 2, 5, 6, 12, len(all_leaves) - 1)
+    assert unrank_many_in_search_tree(indices, n_levels, None,
+                                      get_children) == \
+                                            [all_leaves[i] for i in indices]
@@ -0,0 +1,84 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+import math
+import threading
+
+from python_toolbox import cute_testing
+from python_toolbox import math_tools
+from python_toolbox.math_tools import *
+
+
+def test_rows():
+    assert get_stirling_row(0) == (1,)
+    assert get_stirling_row(4) == (0, -6, 11, -6, 1)
+    assert get_abs_stirling_row(4) == (0, 6, 11, 6, 1)
+    assert get_binomial_row(0) == (1,)
+    assert get_binomial_row(5) == (1, 5, 10, 10, 5, 1)
+    assert get_factorials(5) == (1, 1, 2, 6, 24, 120)
+    assert get_factorial(10) == math.factorial(10)
+    for n in range(30):
+        assert get_abs_stirling_row(n) == tuple(map(abs, get_stirling_row(n)))
+        assert get_binomial_row(n) == tuple(binomial(n, k) for k in
+                                            range(n + 1))
+        assert sum(get_abs_stirling_row(n)) == math.factorial(n)
+        
+    clear_tables()
+    assert get_binomial_row(7)[3] == 35
+    assert get_stirling_row(200)[50] == stirling(200, 50)
+    
+    
+def test_without_tables():
+    clear_tables()
+    stirling_row = get_stirling_row(300)
+    abs_stirling_row = get_abs_stirling_row(300)
+    binomial_row = get_binomial_row(300)
+    assert stirling(300, 4) == stirling_row[4]
+    clear_tables()
+    # With the tables cleared, the numbers are calculated directly:
+    for k in (0, 1, 4, 150, 300):
+        assert stirling(300, k) == stirling_row[k]
+        assert abs_stirling(300, k) == abs_stirling_row[k]
+        assert binomial(300, k) == binomial_row[k]
+    assert repr(math_tools.tables._binomial_table) == \
+            '<RowTable: 0/200 rows cached>'
+    
+    with cute_testing.RaiseAssertor(LookupError):
+        stirling(300, 4, skip_calculation=True)
+    get_stirling_row(300)
+    assert stirling(300, 4, skip_calculation=True) == stirling(300, 4)
+        
+        
+def test_row_table():
+    row_table = RowTable(lambda: (0,), lambda n, row: row + (n,), max_size=3,
+                         checkpoint_interval=4)
+    assert row_table.get_row(5) == (0, 1, 2, 3, 4, 5)
+    assert repr(row_table) == '<RowTable: 3/3 rows cached>'
+    assert row_table.get_cached_row(4) == (0, 1, 2, 3, 4)
+    assert row_table.get_cached_row(2) is None
+    assert row_table.get_row(2) == (0, 1, 2)
+    assert row_table.get_cached_row(2) == (0, 1, 2)
+    assert row_table.get_row(9) == tuple(range(10))
+    assert row_table.get_cached_row(8) == tuple(range(9))
+    assert repr(row_table) == '<RowTable: 3/3 rows cached>'
+    # Checkpoints are thrown away like other rows:
+    assert row_table.get_row(100) == tuple(range(101))
+    assert repr(row_table) == '<RowTable: 3/3 rows cached>'
+    assert row_table.get_cached_row(0) is None
+    assert row_table.get_cached_row(92) == tuple(range(93))
+    row_table.clear()
+    assert repr(row_table) == '<RowTable: 0/3 rows cached>'
+    assert row_table.get_cached_row(0) is None
+    assert row_table.get_row(3) == (0, 1, 2, 3)
+    
+    results = []
+    def get_rows():
+        rows = [row_table.get_row(i % 10) for i in range(300)]
+        results.append(all(len(row) == i % 10 + 1 for i, row in
+                           enumerate(rows)))
+    threads = [threading.Thread(target=get_rows) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [True] * 5
@@ -5,6 +5,7 @@ import re
 import pickle
 import abc
 import collections
+import concurrent.futures
 import decimal as decimal_module
 from python_toolbox.third_party import unittest2
 import copy
@@ -15,11 +16,12 @@ from python_toolbox import cute_iter_tools
 from python_toolbox import temp_value_setting
 from python_toolbox import sequence_tools
 from python_toolbox import cute_testing
+from python_toolbox import future_tools
 
 from python_toolbox import nifty_collections
 from python_toolbox.nifty_collections import (Bag, OrderedBag,
                                               FrozenBag, FrozenOrderedBag,
-                                              OrderedDict)
+                                              FrozenBagBag, OrderedDict)
 
 infinity = float('inf')
 infinities = (infinity, -infinity)
@@ -403,9 +405,63 @@ class BaseBagTestCase(cute_testing.TestCase, metaclass=abc.ABCMeta):
         assert self.bag_type('bd') in contained_bags_tuple
         assert self.bag_type() in contained_bags_tuple
         assert self.bag_type('x') not in contained_bags_tuple
-        
-        
-        
+
+
+    def test_bytes(self):
+        for iterable in ('abracadabra', (), (1, 1, -7, 2 ** 40),
+                         (2 ** 70, 'x', 3.5), {'a': 2 ** 70, 'b': 300}):
+            bag = self.bag_type(iterable)
+            data = bag.to_bytes()
+            assert isinstance(data, bytes)
+            unpacked_bag = self.bag_type.from_bytes(data)
+            assert type(unpacked_bag) is self.bag_type
+            assert unpacked_bag == bag
+            assert tuple(unpacked_bag.items()) == tuple(bag.items())
+            assert tuple(map(type, unpacked_bag)) == tuple(map(type, bag))
+
+        # Small `int` keys and counts take a byte each:
+        bag = self.bag_type(range(-100, 100))
+        assert len(bag.to_bytes()) < 200 * 2 + 20 < len(pickle.dumps(bag))
+
+        with cute_testing.RaiseAssertor(ValueError):
+            self.bag_type.from_bytes(b'meow' + bag.to_bytes()[4:])
+
+
+    def test_from_iterable_parallel(self):
+        text = 'Abracadabra, bracadabra, racadabra, acadabra ' * 50
+        bag = self.bag_type.from_iterable_parallel(text, chunk_size=100)
+        assert type(bag) is self.bag_type
+        assert bag == self.bag_type(text)
+        assert tuple(bag.items()) == tuple(self.bag_type(text).items())
+
+        with future_tools.CuteProcessPoolExecutor(2) as executor:
+            bag = self.bag_type.from_iterable_parallel(
+                text, executor=executor, chunk_size=7, function=str.lower
+            )
+            assert bag == self.bag_type(text.lower())
+            assert self.bag_type.from_iterable_parallel(
+                (), executor=executor
+            ) == self.bag_type()
+
+    def test_from_iterable_parallel_reads_ahead_boundedly(self):
+        counted = []
+        def count(element):
+            counted.append(element)
+            return element
+        def elements():
+            for i in range(2000):
+                # 2 workers get 4 chunks in flight, plus the one being read:
+                assert i - len(counted) <= 5 * 7
+                yield i % 13
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            bag = self.bag_type.from_iterable_parallel(
+                elements(), executor=executor, chunk_size=7, function=count
+            )
+        assert bag == self.bag_type(i % 13 for i in range(2000))
+        if isinstance(bag, nifty_collections.Ordered):
+            assert tuple(bag) == tuple(range(13))
+
+
 class BaseMutableBagTestCase(BaseBagTestCase):
     
     def test_get_mutable(self):
@@ -435,8 +491,59 @@ class BaseMutableBagTestCase(BaseBagTestCase):
             {bag: None,}
         with cute_testing.RaiseAssertor(TypeError):
             hash(bag)
-            
-    
+
+
+    def test_running_totals(self):
+        bag = self.bag_type('abracadabra')
+        assert bag.n_elements == 11
+        other_bag = self.bag_type('abracadabra')
+        assert hash(bag.get_frozen()) == hash(other_bag.get_frozen())
+        frozen_bag_bag = bag.frozen_bag_bag
+        assert bag.frozen_bag_bag is frozen_bag_bag
+
+        def assert_running_totals():
+            # The running totals are always kept, not calculated on demand:
+            assert bag._n_elements == sum(bag.values())
+            assert bag._items_hash == \
+                                    bag._frozen_type(bag)._get_items_hash()
+            frozen_bag = bag.get_frozen()
+            assert frozen_bag == bag._frozen_type(bag)
+            assert hash(frozen_bag) == hash(bag._frozen_type(bag))
+            assert bag.frozen_bag_bag == FrozenBagBag(bag.values())
+
+        bag['a'] += 2
+        bag['z'] = 3
+        del bag['b']
+        del bag['no such key']
+        bag['r'] = 0
+        assert_running_totals()
+        assert bag.frozen_bag_bag is not frozen_bag_bag
+        bag.popitem()
+        bag.pop('c', None)
+        assert_running_totals()
+        bag += self.bag_type('abcz')
+        bag -= self.bag_type('aaz')
+        bag |= self.bag_type('qqqq')
+        bag &= self.bag_type('aaaaaaaaqqqqdz')
+        bag *= 3
+        assert_running_totals()
+        assert_running_totals()
+        bag_copy = bag.copy()
+        bag_copy['y'] = 7
+        assert bag_copy._n_elements == bag.n_elements + 7
+        unpickled_bag = pickle.loads(pickle.dumps(bag))
+        assert unpickled_bag._n_elements == bag.n_elements
+        assert unpickled_bag._items_hash == bag._items_hash
+        assert self.bag_type.from_bytes(bag.to_bytes())._items_hash == \
+                                                                bag._items_hash
+        assert bag != bag_copy
+        assert bag < bag_copy and bag_copy > bag
+        assert not bag < bag and not bag > bag
+        bag.clear()
+        assert bag.n_elements == 0
+        assert hash(bag.get_frozen()) == hash(bag._frozen_type())
+
+
     def test_mutating(self):
         bag = bag_reference = self.bag_type('abracadabra')
         bag['a'] += 1
@@ -0,0 +1,163 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''Testing module for `python_toolbox.nifty_collections.DenseBag`.'''
+
+import array
+import copy
+import operator
+import pickle
+import random
+
+from python_toolbox import cute_testing
+
+from python_toolbox.nifty_collections import Bag, DenseBag
+
+
+def test():
+    '''Test the basic workings of `DenseBag`.'''
+    bag = DenseBag('abcdr', 'abracadabra')
+    assert bag == Bag('abracadabra')
+    assert bag['a'] == 5
+    assert bag['z'] == 0
+    assert 'a' in bag and 'z' not in bag
+    assert len(bag) == 5
+    assert bag.n_elements == 11
+    assert set(bag.items()) == set(Bag('abracadabra').items())
+    assert tuple(bag.counts) == (5, 2, 1, 1, 2)
+    assert bag.most_common(2) == (('a', 5), ('b', 2))
+    assert bag.most_common() == Bag('abracadabra').most_common()[:1] + \
+                                                     bag.most_common()[1:]
+    assert sorted(bag.elements) == sorted('abracadabra')
+
+    bag['c'] = 0
+    del bag['d']
+    del bag['z']
+    assert list(bag) == ['a', 'b', 'r']
+    assert len(bag) == 3
+    bag['b'] += 3
+    assert bag.to_bag() == Bag({'a': 5, 'b': 5, 'r': 2})
+    assert copy.copy(bag) == bag
+    assert copy.copy(bag) is not bag
+
+    with cute_testing.RaiseAssertor(KeyError):
+        bag['z'] = 3
+    with cute_testing.RaiseAssertor(KeyError):
+        DenseBag('ab', 'abc')
+    with cute_testing.RaiseAssertor(TypeError):
+        bag['a'] = 1.5
+    with cute_testing.RaiseAssertor(TypeError):
+        bag['a'] = -1
+    with cute_testing.RaiseAssertor(ValueError):
+        DenseBag('abca')
+    bag.clear()
+    assert not bag
+    assert bag == DenseBag('abcdr')
+    assert bag != DenseBag('abcd')
+
+
+def test_integer_keys():
+    '''Test a `DenseBag` of the integers in a `range`.'''
+    bag = DenseBag(range(10), [1, 2, 2, 9, 9, 9])
+    assert bag == {1: 1, 2: 2, 9: 3}
+    assert bag[9] == 3
+    assert bag[10] == bag[-1] == bag[1.5] == bag['meow'] == 0
+    with cute_testing.RaiseAssertor(KeyError):
+        bag[10] = 1
+    assert repr(bag) == 'DenseBag(range(0, 10), {1: 1, 2: 2, 9: 3})'
+
+
+def test_from_codes():
+    '''Test creating a `DenseBag` from codes in a buffer.'''
+    possible_keys = ('low', 'medium', 'high')
+    for codes in (b'\x00\x02\x02\x01\x02', bytearray(b'\x00\x02\x02\x01\x02'),
+                  array.array('q', (0, 2, 2, 1, 2)), [0, 2, 2, 1, 2]):
+        bag = DenseBag.from_codes(possible_keys, codes)
+        assert bag == {'low': 1, 'medium': 1, 'high': 3}
+    with cute_testing.RaiseAssertor(IndexError):
+        DenseBag.from_codes(possible_keys, b'\x03')
+    with cute_testing.RaiseAssertor(IndexError):
+        DenseBag.from_codes(possible_keys, array.array('q', (1, -1)))
+
+
+def test_arithmetic():
+    '''Test arithmetic between `DenseBag`s against `Bag`s.'''
+    random_generator = random.Random(0)
+    codes = [random_generator.randrange(20) for _ in range(100)]
+    other_codes = [random_generator.randrange(20) for _ in range(50)]
+    dense_bag = DenseBag.from_codes(range(20), codes)
+    other_dense_bag = DenseBag.from_codes(range(20), other_codes)
+    bag, other_bag = Bag(codes), Bag(other_codes)
+
+    assert dense_bag + other_dense_bag == bag + other_bag
+    assert dense_bag - other_dense_bag == bag - other_bag
+    assert dense_bag | other_dense_bag == bag | other_bag
+    assert dense_bag & other_dense_bag == bag & other_bag
+    assert dense_bag * 3 == 3 * dense_bag == bag * 3
+    assert dense_bag // 2 == bag // 2
+    assert dense_bag % 2 == bag % 2
+    assert dense_bag ** 2 == bag ** 2
+    assert pow(dense_bag, 2, 3) == pow(bag, 2, 3)
+    assert (dense_bag * 3 + other_dense_bag) // dense_bag == \
+                                          (bag * 3 + other_bag) // bag == 3
+    assert divmod(dense_bag * 3 + other_dense_bag, dense_bag) == \
+                                     (3, (dense_bag * 3 + other_dense_bag) -
+                                         dense_bag * 3)
+    assert dense_bag & other_dense_bag <= dense_bag <= \
+                                                dense_bag | other_dense_bag
+    assert dense_bag < dense_bag + other_dense_bag
+    assert not dense_bag < dense_bag
+    assert dense_bag >= dense_bag & other_dense_bag
+    assert not dense_bag > dense_bag
+
+    counts = dense_bag.counts
+    dense_bag += other_dense_bag
+    assert dense_bag == bag + other_bag
+    dense_bag -= other_dense_bag * 2
+    assert dense_bag == (bag + other_bag) - other_bag * 2
+    dense_bag |= other_dense_bag
+    dense_bag &= other_dense_bag
+    dense_bag *= 2
+    assert dense_bag == \
+            ((((bag + other_bag) - other_bag * 2) | other_bag) & other_bag) * 2
+    # Views of the counts see the changes:
+    assert dense_bag.counts is counts
+
+    with cute_testing.RaiseAssertor(ValueError):
+        dense_bag + DenseBag(range(21))
+    with cute_testing.RaiseAssertor(TypeError):
+        dense_bag + bag
+    with cute_testing.RaiseAssertor(ZeroDivisionError):
+        dense_bag // DenseBag(range(20))
+
+
+def test_int_operands():
+    '''Test that bags are only multiplied, divided etc. by natural numbers.'''
+    dense_bag = DenseBag('abc', 'aabbb')
+    assert dense_bag * 2.0 == dense_bag * 2 == Bag('aabbb') * 2
+    assert dense_bag // 2.0 == dense_bag // 2 == Bag('ab')
+    assert dense_bag % 2.0 == dense_bag % 2 == Bag('b')
+    assert dense_bag ** 2.0 == dense_bag ** 2 == Bag('aabbb') ** 2
+    assert pow(dense_bag, 2, 5.0) == pow(dense_bag, 2, 5) == Bag('aaaabbbb')
+    assert divmod(dense_bag, 2) == (Bag('ab'), Bag('b'))
+    for operation in (operator.mul, operator.floordiv, operator.mod, divmod,
+                      operator.pow, lambda bag, other: pow(bag, 2, other)):
+        for other in (-1, -2.0, 1.5, 'meow'):
+            with cute_testing.RaiseAssertor(TypeError):
+                operation(dense_bag, other)
+    assert dense_bag == Bag('aabbb')
+
+
+def test_pickle():
+    '''Test that `DenseBag`s can be pickled, to send them to processes.'''
+    for bag in (DenseBag(range(5), [1, 1, 4]), DenseBag(range(0)),
+                DenseBag('abcdr', 'abracadabra')):
+        unpickled_bag = pickle.loads(pickle.dumps(bag))
+        assert type(unpickled_bag) is DenseBag
+        assert unpickled_bag == bag
+        assert unpickled_bag.possible_keys == bag.possible_keys
+    unpickled_bag = pickle.loads(pickle.dumps(DenseBag(range(5), [1, 1, 4])))
+    unpickled_bag[3] += 2
+    assert unpickled_bag == {1: 2, 3: 2, 4: 1}
+    with cute_testing.RaiseAssertor(KeyError):
+        unpickled_bag[5] = 1
@@ -0,0 +1,167 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''Testing module for `SpaceSavingBag` and `CountMinBag`.'''
+
+import copy
+import random
+
+from python_toolbox import cute_testing
+from python_toolbox import temp_value_setting
+
+from python_toolbox.nifty_collections import (Bag, SpaceSavingBag,
+                                              CountMinBag)
+from python_toolbox.nifty_collections import bagging
+
+
+def _get_stream(seed, n_elements=20000):
+    '''Get a stream with a few heavy hitters and many rare keys.'''
+    random_generator = random.Random(seed)
+    return [random_generator.randrange(10 ** 6)
+            if random_generator.random() < 0.5 else
+            int(random_generator.paretovariate(1)) for _ in range(n_elements)]
+
+
+def _check_space_saving_bag(bag, stream, check_heavy_hitters=True):
+    '''Check the guarantees of a `SpaceSavingBag` that counted `stream`.'''
+    exact_bag = Bag(stream)
+    assert bag.n_elements == exact_bag.n_elements == len(stream)
+    assert len(bag) <= bag.max_n_counters
+    for key, count in exact_bag.items():
+        lower_bound, upper_bound = bag.get_count_bounds(key)
+        assert lower_bound <= count <= upper_bound
+        if check_heavy_hitters and count > len(stream) / bag.max_n_counters:
+            assert key in bag
+            assert bag[key] >= count
+
+
+def test_space_saving_bag():
+    '''Test the basic workings of `SpaceSavingBag`.'''
+    bag = SpaceSavingBag(3, 'abracadabra')
+    assert bag == {'a': 5, 'c': 3, 'd': 3}
+    assert bag.most_common(1) == (('a', 5),)
+    assert bag.get_count_bounds('a') == (5, 5)
+    assert bag.get_count_bounds('c') == (1, 3)
+    assert bag.get_count_bounds('r') == (0, 3)
+    assert bag['r'] == 0 and 'r' not in bag
+    assert repr(bag) == "SpaceSavingBag(3, {'a': 5, 'c': 3, 'd': 3})"
+
+    bag.add('z', 4)
+    assert bag['z'] == 7
+    bag.update({'a': 2, 'q': 0})
+    assert bag['a'] == 7
+    assert 'q' not in bag
+    assert bag.n_elements == 17
+
+    with cute_testing.RaiseAssertor(TypeError):
+        bag.add('a', -1)
+    with cute_testing.RaiseAssertor(TypeError):
+        SpaceSavingBag(0)
+
+
+def test_space_saving_bag_guarantees():
+    '''Test that `SpaceSavingBag` keeps its guarantees, also when merged.'''
+    stream = _get_stream(0)
+    other_stream = _get_stream(1)
+    with temp_value_setting.TempValueSetter(
+                                  (bagging._BaseStreamingBag, 'chunk_size'),
+                                  1000):
+        bag = SpaceSavingBag(100, stream)
+        other_bag = SpaceSavingBag(100, other_stream)
+    _check_space_saving_bag(bag, stream)
+    _check_space_saving_bag(other_bag, other_stream)
+    assert sum(bag.values()) == len(stream)
+    assert bag.most_common(3) == Bag(stream).most_common(3)
+
+    merged_bag = bag + other_bag
+    _check_space_saving_bag(merged_bag, stream + other_stream,
+                            check_heavy_hitters=False)
+    assert merged_bag.n_elements == len(stream) + len(other_stream)
+    assert bag.n_elements == len(stream)
+
+    bag_copy = copy.copy(bag)
+    bag_copy += Bag(other_stream)
+    _check_space_saving_bag(bag_copy, stream + other_stream)
+    assert bag != bag_copy
+    _check_space_saving_bag(bag, stream)
+
+    bag += other_bag
+    assert bag == merged_bag
+    with cute_testing.RaiseAssertor(TypeError):
+        bag + {1: 2}
+    with cute_testing.RaiseAssertor(TypeError):
+        {1: 2} + bag
+
+
+def test_radd():
+    '''Test adding streaming bags from the left, and with `sum`.'''
+    for bag_type, arguments in ((SpaceSavingBag, (3,)),
+                                (CountMinBag, (1000, 4))):
+        bags = [bag_type(*arguments, text) for text in
+                ('abracadabra', 'abba', 'cab')]
+        summed_bag = sum(bags)
+        assert type(summed_bag) is bag_type
+        assert summed_bag == bags[0] + bags[1] + bags[2]
+        assert summed_bag.n_elements == 18
+        assert 0 + bags[0] == bags[0] and 0 + bags[0] is not bags[0]
+        bag = Bag('zz') + bags[0]
+        assert type(bag) is bag_type
+        assert bag == bags[0] + Bag('zz')
+        assert bag['z'] >= 2
+        with cute_testing.RaiseAssertor(TypeError):
+            1 + bags[0]
+
+
+def test_count_min_bag():
+    '''Test the basic workings of `CountMinBag`.'''
+    bag = CountMinBag(1000, 4, 'abracadabra', max_n_tracked=3)
+    assert (bag['a'], bag['b'], bag['z']) == (5, 2, 0)
+    assert 'a' in bag and 'z' not in bag
+    # Only tracked keys are `in` the bag, like in iterating on it:
+    assert bag['c'] == 1 and 'c' not in bag and 'c' not in set(bag)
+    assert bag.most_common(1) == (('a', 5),)
+    assert len(bag) == 3
+    assert bag.n_elements == 11
+    assert len(bag.table) == 4000
+    bag.add('z', 3)
+    assert bag['z'] == 3
+    assert set(bag) == {'a', 'z', 'b'} or set(bag) == {'a', 'z', 'r'}
+
+    stream = _get_stream(0)
+    exact_bag = Bag(stream)
+    bag = CountMinBag(2 ** 10, 4, stream)
+    assert all(bag[key] >= count for key, count in exact_bag.items())
+    assert [key for key, count in bag.most_common(5)] == \
+                        [key for key, count in exact_bag.most_common(5)]
+
+    with cute_testing.RaiseAssertor(TypeError):
+        CountMinBag(1000, 0)
+    with cute_testing.RaiseAssertor(TypeError):
+        bag.add('a', 1.5)
+
+
+def test_count_min_bag_merging():
+    '''Test merging `CountMinBag`s.'''
+    stream = _get_stream(0)
+    other_stream = _get_stream(1)
+    with temp_value_setting.TempValueSetter(
+                                  (bagging._BaseStreamingBag, 'chunk_size'),
+                                  1000):
+        bag = CountMinBag(2 ** 10, 4, stream)
+        other_bag = CountMinBag(2 ** 10, 4, other_stream)
+    combined_bag = CountMinBag(2 ** 10, 4, stream + other_stream)
+    merged_bag = bag + other_bag
+    assert merged_bag.table == combined_bag.table
+    assert merged_bag.n_elements == combined_bag.n_elements
+    assert merged_bag.most_common(5) == combined_bag.most_common(5)
+    assert bag.n_elements == len(stream)
+
+    bag_copy = copy.copy(bag)
+    bag_copy += Bag(other_stream)
+    assert bag_copy.table == combined_bag.table
+    assert bag.table != combined_bag.table
+
+    with cute_testing.RaiseAssertor(ValueError):
+        bag + CountMinBag(2 ** 10, 4, seed=1)
+    with cute_testing.RaiseAssertor(ValueError):
+        bag + CountMinBag(2 ** 11, 4)
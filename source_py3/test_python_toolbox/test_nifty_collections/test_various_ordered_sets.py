@@ -2,17 +2,38 @@
 # This program is distributed under the MIT license.
 
 import operator
+import random
+import tracemalloc
 
 from python_toolbox import cute_testing
 
 from python_toolbox import logic_tools
 from python_toolbox import emitting
 from python_toolbox.nifty_collections import (OrderedSet, FrozenOrderedSet,
-                                              EmittingOrderedSet)
+                                              EmittingOrderedSet,
+                                              CompactOrderedSet,
+                                              FrozenCompactOrderedSet)
+
+
+def _record_compactions(ordered_set):
+    '''
+    Record the compactions of an `OrderedSet` from now on.
+    
+    Returns a list that gets the number of items in the ordered set every
+    time it's compacted, which takes time proportional to that number.
+    '''
+    compactions = []
+    compact = ordered_set._compact
+    def record_compaction():
+        compactions.append(len(ordered_set))
+        compact()
+    ordered_set._compact = record_compaction
+    return compactions
 
 
 class BaseOrderedSetTestCase(cute_testing.TestCase):
     __test__ = False
+    has_constant_time_index = True
     
     def test_operations(self):
         ordered_set = self.ordered_set_type([5, 61, 2, 7, 2])
@@ -24,6 +45,68 @@ class BaseOrderedSetTestCase(cute_testing.TestCase):
         assert bool(self.ordered_set_type({0})) is True
         assert bool(self.ordered_set_type(range(5))) is True
         
+    def test_indexing(self):
+        ordered_set = self.ordered_set_type([5, 61, 2, 7, 2])
+        assert (ordered_set[0], ordered_set[1], ordered_set[3]) == (5, 61, 7)
+        assert (ordered_set[-1], ordered_set[-4]) == (7, 5)
+        for index in (4, -5, 100):
+            with cute_testing.RaiseAssertor(IndexError):
+                ordered_set[index]
+        assert ordered_set.index(5) == 0
+        assert ordered_set.index(7) == 3
+        with cute_testing.RaiseAssertor(ValueError):
+            ordered_set.index(8)
+        assert ordered_set.count(2) == 1
+        assert ordered_set.count(8) == 0
+        assert ordered_set[1:3] == self.ordered_set_type([61, 2])
+        assert ordered_set[::-1] == self.ordered_set_type([7, 2, 61, 5])
+        assert type(ordered_set[:]) is type(ordered_set)
+        assert not ordered_set[5:]
+        
+    def test_algebra(self):
+        first = self.ordered_set_type([5, 61, 2, 7])
+        second = self.ordered_set_type([7, 3, 5, 8])
+        for result, items in (
+            (first | second, (5, 61, 2, 7, 3, 8)),
+            (first | [8, 1, 8, 2], (5, 61, 2, 7, 8, 1)),
+            # Like in `collections.Set`, `&` keeps the order of `other`:
+            (first & second, (7, 5)),
+            (first & [7, 7, 2], (7, 2)),
+            (first - second, (61, 2)),
+            (first - iter([2, 9]), (5, 61, 7)),
+            (first ^ second, (61, 2, 3, 8)),
+            (first ^ [1, 2, 1], (5, 61, 7, 1)),
+            (first | (), (5, 61, 2, 7)),
+            (first & (), ()),
+            ):
+            assert type(result) is self.ordered_set_type
+            assert tuple(result) == items
+            assert result[len(items) - 1:] == \
+                                     self.ordered_set_type(items[-1:])
+        assert tuple(first) == (5, 61, 2, 7)
+        assert first | first == first & first == first
+        assert not first - first
+        assert not first ^ first
+        with cute_testing.RaiseAssertor(TypeError):
+            first | 7
+        
+    def test_indexing_speed(self):
+        ordered_set = self.ordered_set_type(range(10 ** 5))
+        assert ordered_set[-2] == ordered_set.index(10 ** 5 - 2) == \
+                                                                 10 ** 5 - 2
+        # Getting items by index again and again doesn't go over all the
+        # items every time:
+        if self.has_constant_time_index:
+            compactions = _record_compactions(ordered_set)
+            for _ in range(10):
+                assert ordered_set[-2] == ordered_set.index(10 ** 5 - 2)
+            assert not compactions
+        else:
+            item_list = ordered_set._get_item_list()
+            for _ in range(10):
+                assert ordered_set[-2] == 10 ** 5 - 2
+            assert ordered_set._get_item_list() is item_list
+        
         
 class BaseMutableOrderedSetTestCase(BaseOrderedSetTestCase):
     __test__ = False
@@ -63,6 +146,119 @@ class BaseMutableOrderedSetTestCase(BaseOrderedSetTestCase):
         assert ordered_set | ordered_set == ordered_set
         assert ordered_set & ordered_set == ordered_set
         
+    def test_bulk_updates(self):
+        ordered_set = self.ordered_set_type([5, 61, 2, 7])
+        ordered_set.update([8, 5], (1, 8), ())
+        assert tuple(ordered_set) == (5, 61, 2, 7, 8, 1)
+        ordered_set.update_many(iter([[9, 2, 10], iter([10, 11])]))
+        assert tuple(ordered_set) == (5, 61, 2, 7, 8, 1, 9, 10, 11)
+        ordered_set.discard(61)
+        ordered_set.add(0, last=False)
+        ordered_set.difference_update([1, 100], [0])
+        assert tuple(ordered_set) == (5, 2, 7, 8, 9, 10, 11)
+        ordered_set.difference_update(range(9, 12))
+        assert tuple(ordered_set) == (5, 2, 7, 8)
+        ordered_set.intersection_update([8, 2, 5, 100], {2, 8, 5})
+        assert tuple(ordered_set) == (5, 2, 8)
+        ordered_set.symmetric_difference_update([8, 3, 4, 3])
+        assert tuple(ordered_set) == (5, 2, 3, 4)
+        assert ordered_set.index(4) == 3
+        ordered_set |= [6]
+        ordered_set &= [6, 5, 4]
+        ordered_set -= {4}
+        ordered_set ^= [5, 7]
+        assert tuple(ordered_set) == (6, 7)
+        ordered_set -= ordered_set
+        assert not ordered_set
+        ordered_set.update(range(10 ** 4))
+        ordered_set.difference_update(range(1, 10 ** 4))
+        assert tuple(ordered_set) == (0,)
+        
+    def test_insert(self):
+        ordered_set = self.ordered_set_type(range(4))
+        ordered_set.insert(1, 'a')
+        ordered_set.insert(-1, 'b')
+        ordered_set.insert(100, 'c')
+        ordered_set.insert(-100, 'd')
+        ordered_set.insert(0, 2)
+        assert tuple(ordered_set) == ('d', 0, 'a', 1, 2, 'b', 3, 'c')
+        assert ordered_set.index('b') == 5
+        assert ordered_set[5] == 'b'
+        
+    def test_against_list(self):
+        '''Test a random sequence of operations against a `list`.'''
+        random_generator = random.Random(0)
+        ordered_set = self.ordered_set_type()
+        items = []
+        for _ in range(3000):
+            key = random_generator.randrange(100)
+            operation = random_generator.randrange(6)
+            if operation == 0:
+                ordered_set.add(key)
+                if key not in items:
+                    items.append(key)
+            elif operation == 1:
+                ordered_set.add(key, last=False)
+                if key not in items:
+                    items.insert(0, key)
+            elif operation == 2:
+                ordered_set.discard(key)
+                if key in items:
+                    items.remove(key)
+            elif operation == 3 and key in items:
+                last = random_generator.choice((True, False))
+                ordered_set.move_to_end(key, last=last)
+                items.remove(key)
+                items.insert(len(items) if last else 0, key)
+            elif operation == 4:
+                index = random_generator.randrange(-50, 50)
+                ordered_set.insert(index, key)
+                if key not in items:
+                    items.insert(index, key)
+            elif operation == 5 and items:
+                last = random_generator.choice((True, False))
+                assert ordered_set.pop(last=last) == \
+                                                 items.pop(-1 if last else 0)
+            assert len(ordered_set) == len(items)
+            if items:
+                index = random_generator.randrange(len(items))
+                assert ordered_set[index] == items[index]
+                assert ordered_set.index(items[index]) == index
+            assert list(reversed(ordered_set)) == items[::-1]
+        assert list(ordered_set) == items
+        
+    def test_queue(self):
+        '''Test taking items from the start, like from a queue.'''
+        ordered_set = self.ordered_set_type(range(10 ** 4))
+        ordered_set.add(-1, last=False)
+        assert [ordered_set.pop(last=False) for _ in range(5000)] == \
+                                                          list(range(-1, 4999))
+        assert (ordered_set[0], ordered_set.index(5000)) == (4999, 1)
+        assert ordered_set[-1] == 9999
+        ordered_set.add(-2, last=False)
+        ordered_set.add(-3, last=False)
+        ordered_set.discard(-2)
+        assert ordered_set.pop() == 9999
+        assert ordered_set.index(5000) == 2
+        assert [ordered_set.pop(last=False) for _ in range(3)] == \
+                                                               [-3, 4999, 5000]
+        removed_items = []
+        while ordered_set:
+            removed_items.append(ordered_set[0])
+            ordered_set.discard(ordered_set[0])
+        assert removed_items == list(range(5001, 9999))
+        
+        if not self.has_constant_time_index:
+            return
+        # Emptying the set from its start, like a queue, compacts it only
+        # when half of it is placeholders, so the total work is linear:
+        ordered_set = self.ordered_set_type(range(10 ** 4))
+        compactions = _record_compactions(ordered_set)
+        while ordered_set:
+            ordered_set.discard(ordered_set[0])
+        assert 0 < len(compactions) < 20
+        assert sum(compactions) < 2 * 10 ** 4
+        
 class OrderedSetTestCase(BaseMutableOrderedSetTestCase):
     __test__ = True
     ordered_set_type = OrderedSet
@@ -109,6 +305,28 @@ class FrozenOrderedSetTestCase(BaseOrderedSetTestCase):
         assert set(d.values()) == {1, 20, 3}
         
 
+class CompactOrderedSetTestCase(BaseMutableOrderedSetTestCase):
+    __test__ = True
+    ordered_set_type = CompactOrderedSet
+    has_constant_time_index = False
+    
+    def test_pop_from_start(self):
+        ordered_set = self.ordered_set_type(range(10 ** 4))
+        assert [ordered_set.pop(last=False) for _ in range(10 ** 4)] == \
+                                                          list(range(10 ** 4))
+        assert not ordered_set
+        
+    def test_get_frozen(self):
+        ordered_set = self.ordered_set_type(range(4))
+        assert ordered_set.get_frozen() == FrozenCompactOrderedSet(range(4))
+        
+    
+class FrozenCompactOrderedSetTestCase(FrozenOrderedSetTestCase):
+    __test__ = True
+    ordered_set_type = FrozenCompactOrderedSet
+    has_constant_time_index = False
+    
+
 class EmittingOrderedSetTestCase(BaseMutableOrderedSetTestCase):
     __test__ = True
     ordered_set_type = EmittingOrderedSet
@@ -137,6 +355,16 @@ class EmittingOrderedSetTestCase(BaseMutableOrderedSetTestCase):
         assert times_emitted == [5]
         assert tuple(emitting_ordered_set) == \
                                              (0, 1, 2, 3, 5, 6, 7, 8, 9, 10, 4)
+        emitting_ordered_set.update([11, 12, 0])
+        assert times_emitted == [7]
+        emitting_ordered_set.difference_update([0, 20])
+        assert times_emitted == [8]
+        emitting_ordered_set &= range(1, 12)
+        assert times_emitted == [9]
+        emitting_ordered_set.sort(reverse=True)
+        assert times_emitted == [10]
+        assert tuple(emitting_ordered_set) == (11, 10, 9, 8, 7, 6, 5, 4, 3, 2,
+                                               1)
         
         
         
@@ -163,3 +391,20 @@ def test_operations_on_different_types():
     
     
 
+    
+def test_compact_memory():
+    '''Benchmark the memory of `CompactOrderedSet` against `OrderedSet`.'''
+    items = tuple(range(10 ** 5))
+    n_bytes = {}
+    for ordered_set_type in (OrderedSet, CompactOrderedSet):
+        tracemalloc.start()
+        try:
+            ordered_set = ordered_set_type(items)
+            n_bytes[ordered_set_type] = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        for item in items[::2]:
+            ordered_set.discard(item)
+        assert tuple(ordered_set) == items[1::2]
+    # About 50 bytes per item against about 100:
+    assert n_bytes[CompactOrderedSet] < n_bytes[OrderedSet] * 0.7
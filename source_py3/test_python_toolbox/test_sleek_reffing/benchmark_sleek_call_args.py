@@ -0,0 +1,75 @@
+# Copyright 2009-2017 Ram Rachum.
+# This program is distributed under the MIT license.
+
+'''
+Benchmark of the memory taken by `SleekCallArgs` objects in a `dict`.
+
+Prints the number of bytes per entry for a few kinds of arguments, counting
+only the memory allocated here or in `sleek_reffing`. On CPython 3.9 it gives
+about 410, 370 and 560 bytes; before `SleekCallArgs` kept its sleekrefs in
+one flat tuple, it gave about 1440, 1270 and 1900. Nothing is asserted,
+since the numbers depend on the Python version; run it with:
+
+    python -m test_python_toolbox.test_sleek_reffing.benchmark_sleek_call_args
+
+'''
+
+import os.path
+import tracemalloc
+
+from python_toolbox import gc_tools
+from python_toolbox import sleek_reffing
+from python_toolbox.sleek_reffing import SleekCallArgs
+
+
+class A:
+    pass
+
+
+def g(a, b, *args, **kwargs):
+    pass
+
+
+def get_bytes_per_entry(make_args, n=20000):
+    '''
+    Get the bytes per entry of a `dict` of `n` `SleekCallArgs` objects.
+
+    `make_args` is a function that takes an index and returns the arguments
+    for that entry.
+    '''
+    # Counting only memory that was allocated here or in `sleek_reffing`, and
+    # not, for example, warnings that `getargspec` leaves:
+    filters = (
+        tracemalloc.Filter(True, __file__),
+        tracemalloc.Filter(
+            True, os.path.join(os.path.dirname(sleek_reffing.__file__), '*')
+        ),
+    )
+    sca_dict = {}
+    gc_tools.collect()
+    tracemalloc.start()
+    try:
+        for i in range(n):
+            sca_dict[SleekCallArgs(sca_dict, g, *make_args(i))] = None
+        gc_tools.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces(filters)
+    finally:
+        tracemalloc.stop()
+    return sum(statistic.size for statistic in
+               snapshot.statistics('filename')) / n
+
+
+def main():
+    things = [A() for _ in range(20000)]
+    cases = (
+        ('Two weakreffable args', lambda i: (things[i], 2)),
+        ('Two ints', lambda i: (i, 2)),
+        ('Four args', lambda i: (things[i], 2, 3, 4)),
+    )
+    for name, make_args in cases:
+        print('%-24s%8.0f bytes per entry' % (name,
+                                              get_bytes_per_entry(make_args)))
+
+
+if __name__ == '__main__':
+    main()
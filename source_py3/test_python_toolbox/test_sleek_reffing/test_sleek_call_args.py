@@ -62,4 +62,40 @@ def test_unhashable():
     gc_tools.collect()
     # Not GCed because all objects in `kwargs` are not weakreffable:
     assert len(sca_dict) == 1
-    
\ No newline at end of file
+        
+    
+def test_args_properties():
+    '''Test the `args`, `star_args` and `star_kwargs` properties.'''
+    def g(a, b=2, *args, **kwargs): pass
+    sca_dict = {}
+    a = A()
+    sca1 = SleekCallArgs(sca_dict, g, a, 3, 4, [5], y=6, x=a)
+    assert sca1.args == {'a': a, 'b': 3}
+    assert sca1.star_args == (4, [5])
+    assert sca1.star_kwargs == {'x': a, 'y': 6}
+    sca2 = SleekCallArgs(sca_dict, g, a, 3, 4, [5], x=a, y=6)
+    assert sca1 == sca2
+    assert hash(sca1) == hash(sca2)
+    assert sca1 != SleekCallArgs(sca_dict, g, a, 3, 4, [5], x=a, y=7)
+    assert sca1 != SleekCallArgs(sca_dict, g, a, 3, 4, x=a, y=6)
+    assert SleekCallArgs(sca_dict, g, b=3, a=a) == \
+                                            SleekCallArgs(sca_dict, g, a, 3)
+    
+    
+def test_compact():
+    '''Test that `SleekCallArgs` objects are kept small.'''
+    def g(a, b, *args, **kwargs): pass
+    sca_dict = {}
+    things = [A() for _ in range(3)]
+    scas = [SleekCallArgs(sca_dict, g, thing, 2, 3, x=4) for thing in things]
+    # No `__dict__`s, and a flat tuple with a sleekref for every argument:
+    for sca in scas:
+        assert not hasattr(sca, '__dict__')
+        assert type(sca._refs) is tuple
+        assert len(sca._refs) == 4
+        assert all(type(sleek_ref) is SleekRef and
+                   not hasattr(sleek_ref, '__dict__')
+                   for sleek_ref in sca._refs)
+    # The names of the arguments are kept once for all of them:
+    assert scas[0]._layout is scas[1]._layout is scas[2]._layout is \
+                            SleekCallArgs(sca_dict, g, 1, 2, 5, x=3)._layout